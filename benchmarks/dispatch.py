@@ -0,0 +1,78 @@
+"""Compares matching a message against every behaviour's template with the template index.
+
+The behaviours route on the 'resource' and 'action' metadata fields, like the
+DF's behaviours, plus a few composite templates. No server is needed.
+
+Usage:
+    python benchmarks/dispatch.py [number of messages]
+"""
+
+import sys
+import time
+
+from peak.message import Message
+from peak.template import Template, TemplateIndex
+
+BEHAVIOUR_COUNTS = [4, 16, 64, 256]
+
+
+class Behaviour:
+    def __init__(self, template):
+        self.template = template
+
+    def match(self, message) -> bool:
+        return self.template.match(message) if self.template else True
+
+
+def template(resource: str, action: str = None) -> Template:
+    template = Template()
+    template.set_metadata("resource", resource)
+    if action is not None:
+        template.set_metadata("action", action)
+    return template
+
+
+def behaviours(count: int) -> list:
+    behaviours = [
+        Behaviour(template(f"resource{i // 2}", f"action{i % 2}"))
+        for i in range(count - 2)
+    ]
+    behaviours.append(Behaviour(template("graph") | template("plot")))
+    behaviours.append(Behaviour(template("stats") & ~template("stats", "reset")))
+    return behaviours
+
+
+def messages(count: int, behaviour_count: int) -> list:
+    return [
+        Message(
+            to="df@localhost",
+            metadata={
+                "resource": f"resource{i % (behaviour_count // 2)}",
+                "action": f"action{i % 2}",
+            },
+        )
+        for i in range(count)
+    ]
+
+
+def main(count: int):
+    print(f"{'behaviours':<12}{'linear (us)':>12}{'index (us)':>12}")
+    for behaviour_count in BEHAVIOUR_COUNTS:
+        agent_behaviours = behaviours(behaviour_count)
+        msgs = messages(count, behaviour_count)
+        index = TemplateIndex(agent_behaviours)
+        for msg in msgs[:100]:
+            assert index.match(msg) == [b for b in agent_behaviours if b.match(msg)]
+        start = time.perf_counter()
+        for msg in msgs:
+            [b for b in agent_behaviours if b.match(msg)]
+        linear = (time.perf_counter() - start) / count
+        start = time.perf_counter()
+        for msg in msgs:
+            index.match(msg)
+        indexed = (time.perf_counter() - start) / count
+        print(f"{behaviour_count:<12}{linear * 1e6:>12.1f}{indexed * 1e6:>12.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,42 @@
+"""Measures the import time of PEAK.
+
+Each statement runs in a fresh interpreter. The time of an empty interpreter is
+subtracted. 'eager import' imports every module that the package used to import
+when PEAK was imported, before the imports became lazy.
+
+Usage:
+    python benchmarks/import_time.py [number of runs]
+"""
+
+import subprocess
+import sys
+import time
+
+STATEMENTS = {
+    "import peak": "import peak",
+    "peak CLI (--version)": "import sys; sys.argv = ['peak', '--version']; import peak.main; peak.main._main()",
+    "from peak import Agent": "from peak import Agent",
+    "eager import": "import peak, peak.core, peak.message, peak.template, peak.agents.directory_facilitator.df, peak.agents.sync_agent.sync_agent, peak.agents.synchronizer.synchronizer, peak.behaviours.create_graph",
+}
+
+
+def measure(statement: str, runs: int) -> float:
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-c", statement], check=False, stdout=subprocess.DEVNULL
+        )
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(runs: int):
+    interpreter = measure("pass", runs)
+    print(f"{'statement':<26}{'time (ms)':>10}")
+    for name, statement in STATEMENTS.items():
+        print(f"{name:<26}{(measure(statement, runs) - interpreter) * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
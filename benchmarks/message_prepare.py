@@ -0,0 +1,69 @@
+"""Compares building a clock message with `Message.prepare` and with a prototype.
+
+Each message has the shape of the Synchronizer's clock messages: a body and the
+'sync', 'period' and 'time' metadata, where only the body, the period and the
+time change between messages. No server is needed.
+
+Usage:
+    python benchmarks/message_prepare.py [number of messages]
+"""
+
+import sys
+import time
+
+from aioxmpp import xml
+
+from peak.message import Message, MessagePrototype
+
+GROUP = "group@conference.localhost"
+TIME = "2022-01-01 00:00:00"
+
+
+def with_message(period: int):
+    msg = Message(to=GROUP, body=f"Period {period}")
+    msg.set_metadata("sync", "step")
+    msg.set_metadata("period", str(period))
+    msg.set_metadata("time", TIME)
+    return msg.prepare()
+
+
+def with_prototype(prototype: MessagePrototype):
+    def build(period: int):
+        msg = prototype.message(body=f"Period {period}", period=str(period), time=TIME)
+        return msg.prepare()
+
+    return build
+
+
+def with_prototype_prepare(prototype: MessagePrototype):
+    def build(period: int):
+        metadata = prototype.metadata | {"period": str(period), "time": TIME}
+        return prototype.prepare(prototype.to, None, f"Period {period}", None, metadata)
+
+    return build
+
+
+def measure(build, messages: int) -> float:
+    start = time.perf_counter()
+    for period in range(messages):
+        build(period)
+    return (time.perf_counter() - start) / messages
+
+
+def main(messages: int):
+    prototype = MessagePrototype(to=GROUP, metadata={"sync": "step"})
+    assert xml.serialize_single_xso(with_message(1)) == xml.serialize_single_xso(
+        with_prototype(prototype)(1)
+    )
+    cases = {
+        "Message.prepare": with_message,
+        "prototype.message": with_prototype(prototype),
+        "prototype.prepare": with_prototype_prepare(prototype),
+    }
+    print(f"{'case':<20}{'time (us)':>10}")
+    for name, build in cases.items():
+        print(f"{name:<20}{measure(build, messages) * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -0,0 +1,67 @@
+"""Compares the startup time of the agents' processes for each launcher.
+
+Each process imports the framework and loads the agent's class, the same way
+the bootloader does before connecting the agent to the XMPP server. No server
+is needed.
+
+Usage:
+    python benchmarks/startup.py [number of processes]
+"""
+
+import multiprocessing
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from peak.bootloader import LAUNCHERS, _ReportChannel, get_launcher
+
+AGENT = """
+from peak import Agent
+
+
+class benchmark_agent(Agent):
+    pass
+"""
+
+
+def load_agent(file: Path, launched_at: float, reports: _ReportChannel):
+    from peak.bootloader import _get_class
+
+    _get_class(file)
+    reports.send("startup", time.time() - launched_at)
+
+
+def run(launcher: str, file: Path, processes: int) -> list[float]:
+    context = get_launcher(launcher, [{"file": file}])
+    reports = _ReportChannel(context)
+    procs = []
+    for _ in range(processes):
+        proc = context.Process(target=load_agent, args=(file, time.time(), reports))
+        proc.start()
+        procs.append(proc)
+    times = [reports.recv()[1] for _ in procs]
+    for proc in procs:
+        proc.join()
+    return times
+
+
+def main(processes: int):
+    with tempfile.TemporaryDirectory() as folder:
+        file = Path(folder).joinpath("benchmark_agent.py")
+        file.write_text(AGENT)
+        print(f"{'launcher':<12}{'mean (s)':>10}{'max (s)':>10}{'total (s)':>11}")
+        for launcher in LAUNCHERS:
+            if launcher not in multiprocessing.get_all_start_methods():
+                continue
+            start = time.time()
+            times = run(launcher, file, processes)
+            total = time.time() - start
+            print(
+                f"{launcher:<12}{statistics.mean(times):>10.3f}{max(times):>10.3f}{total:>11.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
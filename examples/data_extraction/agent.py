@@ -1,7 +1,7 @@
 import json
 from random import random
 
-from peak import Agent, CreateGraph, PeriodicBehaviour
+from peak import Agent, CreateGraph, PeriodicBehaviour, UpdateGraph
 
 
 class agent(Agent):
@@ -35,7 +35,8 @@ class agent(Agent):
                 0.373578536,
             ]
             with open("graph_options.json") as file:
-                self.graph = json.load(file)
+                graph = json.load(file)
+            await self.wait_for(CreateGraph("house", graph))
 
         async def run(self) -> None:
             if self.count >= 10:
@@ -48,9 +49,11 @@ class agent(Agent):
                 self.count,
                 self.generation_data[self.count] * 1000 + random() * 100,
             ]
-            self.graph["series"][0]["data"].append(consumption)
-            self.graph["series"][1]["data"].append(generation)
-            self.agent.add_behaviour(CreateGraph("house", self.graph))
+            self.agent.add_behaviour(
+                UpdateGraph(
+                    "house", {"Consumption": [consumption], "Generation": [generation]}
+                )
+            )
             self.count += 1
 
     async def setup(self) -> None:
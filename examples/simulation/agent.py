@@ -6,6 +6,10 @@ from peak import Message, OneShotBehaviour, SyncAgent
 
 
 class agent(SyncAgent):
+    class JoinGroup(OneShotBehaviour):
+        async def run(self) -> None:
+            await self.join_community(settings.sync_group)
+
     class SendMessage(OneShotBehaviour):
         async def run(self) -> None:
             msg = Message()
@@ -17,10 +21,12 @@ class agent(SyncAgent):
                 + str(self.agent.time)
                 + "."
             )
-            await self.send_to_group(msg)
+            await self.send_to_community(msg)
 
     async def setup(self) -> None:
-        await self.join_group(settings.sync_group)
+        self.add_behaviour(self.JoinGroup())
 
-    async def step(self):
+    async def step(self, period, time=None):
+        self.period = period
+        self.time = time
         self.add_behaviour(self.SendMessage())
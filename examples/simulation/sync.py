@@ -10,7 +10,9 @@ from peak import Synchronizer
 
 class sync(Synchronizer):
     async def setup(self) -> None:
-        # n_agents = 3 --> agent + synchronizer + client
+        # n_agents = 2 --> agent + synchronizer
+        # barrier mode: each hour starts as soon as the agent finished the previous
+        # one, and at least 0.5 seconds after it
         await self.sync_group_time(
             settings.sync_group,
             2,
@@ -18,4 +20,6 @@ class sync(Synchronizer):
             datetime(2000, 1, 2),
             timedelta(hours=1),
             0.5,
+            barrier=True,
+            straggler_timeout=5,
         )
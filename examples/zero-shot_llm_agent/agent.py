@@ -7,9 +7,16 @@ model_name = "phi3:mini"
 
 class assistant(Agent):
     class ChatBehaviour(CyclicBehaviour):
+        # answering takes a while, so refuse requests instead of piling them up
+        mailbox_capacity = 10
+        mailbox_overflow = "reject"
+
         async def run(self):
             message = await self.receive()
-            llm_response = ollama.generate(model_name, message.body)
+            # generating blocks, so it runs in a thread to keep the agent responsive
+            llm_response = await self.run_blocking(
+                ollama.generate, model_name, message.body
+            )
             print(llm_response)
             reply = message.make_reply()
             reply.body = llm_response["response"]
@@ -4,16 +4,89 @@ PEAK is a framework for developing communities of heterogeneous agents.
 This communities are multi-agent systems that can coexist and exchange
 resources and information with each other easly.
 
+The agents, behaviours and messages are imported lazily, when first accessed,
+so that importing PEAK (e.g. to run the command line interface) does not load
+SPADE and the XMPP stack until they are needed.
+
 isort: skip_file
 """
 
-from peak.core import *
+import importlib as _importlib
+
 from peak.logging import *
-from peak.message import *
-from peak.template import *
-from peak.agents import *
-from peak.behaviours import *
 
 __author__ = "GECAD"
 __email__ = "brgri@isep.ipp.pt"
 __version__ = "1.2.6"
+
+_LAZY_ATTRIBUTES = {
+    "JID": "peak.core",
+    "Agent": "peak.core",
+    "OneShotBehaviour": "peak.core",
+    "PeriodicBehaviour": "peak.core",
+    "CyclicBehaviour": "peak.core",
+    "FSMBehaviour": "peak.core",
+    "BatchBehaviour": "peak.core",
+    "MessageBase": "peak.message",
+    "Message": "peak.message",
+    "MessagePrototype": "peak.message",
+    "MessageType": "peak.message",
+    "SPADE_X_METADATA": "peak.message",
+    "Template": "peak.template",
+    "blocking": "peak.executors",
+    "configure_executors": "peak.executors",
+    "DF": "peak.agents",
+    "DummyAgent": "peak.agents",
+    "SyncAgent": "peak.agents",
+    "Synchronizer": "peak.agents",
+    "CreateGraph": "peak.behaviours",
+    "JoinCommunity": "peak.behaviours",
+    "LeaveCommunity": "peak.behaviours",
+    "SearchCommunity": "peak.behaviours",
+    "UpdateGraph": "peak.behaviours",
+    # names previously exported by the star imports of the submodules
+    "List": "typing",
+    "Type": "typing",
+    "first_signal": "aioxmpp.callbacks",
+    "logger": "peak.message",
+}
+
+_LAZY_MODULES = {
+    "agents": "peak.agents",
+    "behaviours": "peak.behaviours",
+    "core": "peak.core",
+    "message": "peak.message",
+    "template": "peak.template",
+    "directory_facilitator": "peak.agents.directory_facilitator",
+    "dummy_agent": "peak.agents.dummy_agent",
+    "sync_agent": "peak.agents.sync_agent",
+    "synchronizer": "peak.agents.synchronizer",
+    "create_graph": "peak.behaviours.create_graph",
+    "join_community": "peak.behaviours.join_community",
+    "leave_community": "peak.behaviours.leave_community",
+    "search_community": "peak.behaviours.search_community",
+    "update_graph": "peak.behaviours.update_graph",
+    "aioxmpp": "aioxmpp",
+    "asyncio": "asyncio",
+    "forms_xso": "aioxmpp.forms.xso",
+}
+
+__all__ = [name for name in globals() if not name.startswith("_")] + [
+    *_LAZY_ATTRIBUTES,
+    *_LAZY_MODULES,
+]
+
+
+def __getattr__(name: str):
+    if name in _LAZY_MODULES:
+        value = _importlib.import_module(_LAZY_MODULES[name])
+    elif name in _LAZY_ATTRIBUTES:
+        value = getattr(_importlib.import_module(_LAZY_ATTRIBUTES[name]), name)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES) | set(_LAZY_MODULES))
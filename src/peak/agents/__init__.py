@@ -1,4 +1,33 @@
-from .directory_facilitator.df import DF
-from .dummy_agent.dummy_agent import DummyAgent
-from .sync_agent.sync_agent import SyncAgent
-from .synchronizer.synchronizer import Synchronizer
+import importlib as _importlib
+
+_LAZY_ATTRIBUTES = {
+    "DF": ".directory_facilitator.df",
+    "DummyAgent": ".dummy_agent.dummy_agent",
+    "SyncAgent": ".sync_agent.sync_agent",
+    "Synchronizer": ".synchronizer.synchronizer",
+}
+
+_LAZY_MODULES = (
+    "directory_facilitator",
+    "dummy_agent",
+    "sync_agent",
+    "synchronizer",
+)
+
+__all__ = [*_LAZY_ATTRIBUTES, *_LAZY_MODULES]
+
+
+def __getattr__(name: str):
+    if name in _LAZY_MODULES:
+        value = _importlib.import_module(f".{name}", __name__)
+    elif name in _LAZY_ATTRIBUTES:
+        module = _importlib.import_module(_LAZY_ATTRIBUTES[name], __name__)
+        value = getattr(module, name)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES) | set(_LAZY_MODULES))
@@ -1,3 +1,4 @@
 from .create_graph import CreateGraph
 from .ecosystem_hierarchy import EcosystemHierarchy
 from .search_community import SearchCommunity
+from .update_graph import UpdateGraph
@@ -1,4 +1,4 @@
-import json
+import copy
 
 from peak import CyclicBehaviour, Template, getLogger
 
@@ -19,5 +19,7 @@ class CreateGraph(CyclicBehaviour):
         if msg:
             logger.debug(msg)
             id = msg.get_metadata("id")
-            graph = json.loads(msg.get_metadata("graph"))
+            # the graph is updated in place, the payload may be the sender's graph
+            graph = copy.deepcopy(msg.payload)
             self.agent.dataanalysis_data[id] = graph
+            self.agent.dataanalysis_series.pop(id, None)
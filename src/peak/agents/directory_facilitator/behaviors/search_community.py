@@ -1,5 +1,3 @@
-import json
-
 from peak import CyclicBehaviour, Template, getLogger
 
 logger = getLogger(__name__)
@@ -16,13 +14,12 @@ class SearchCommunity(CyclicBehaviour):
 
     async def run(self) -> None:
         msg = await self.receive(60)
-        if msg and (meta_tags := msg.get_metadata("tags")):
-            tags = json.loads(meta_tags)
+        if msg and (tags := msg.payload):
             communities: set = self.agent.ecosystemhierarchy_data["tags"][tags[0]]
             for tag in tags[1:]:
                 communities = communities.intersection(
                     self.agent.ecosystemhierarchy_data["tags"][tag]
                 )
             res = msg.make_reply()
-            res.set_metadata("communities", json.dumps(list(communities)))
+            res.set_payload(list(communities))
             await self.send(res)
@@ -0,0 +1,43 @@
+from peak import CyclicBehaviour, Template, getLogger
+
+logger = getLogger(__name__)
+
+
+class UpdateGraph(CyclicBehaviour):
+    """Handles the requests to add points to the series of existing graphs.
+
+    The payload of the request maps the name of each series to the list of
+    points to append to it. Only the new points are sent, so the cost of each
+    update does not depend on the size of the graph.
+    """
+
+    async def on_start(self):
+        template = Template()
+        template.set_metadata("resource", "graph")
+        template.set_metadata("action", "update")
+        self.set_template(template)
+
+    async def run(self) -> None:
+        msg = await self.receive(60)
+        if msg:
+            id = msg.get_metadata("id")
+            graph = self.agent.dataanalysis_data.get(id)
+            if graph is None:
+                logger.warning(f"{msg.sender} tried to update unknown graph {id}")
+                return
+            series = self.agent.dataanalysis_series.setdefault(id, {})
+            for name, points in msg.payload.items():
+                if name not in series:
+                    series[name] = self._find_series(graph, name)
+                series[name]["data"].extend(points)
+
+    @staticmethod
+    def _find_series(graph: dict, name: str) -> dict:
+        graph_series = graph.setdefault("series", [])
+        for series in graph_series:
+            if series.get("name") == name:
+                series.setdefault("data", [])
+                return series
+        series = {"name": name, "data": []}
+        graph_series.append(series)
+        return series
@@ -1,9 +1,9 @@
 import aiohttp_cors
-from aioxmpp import JID
 
 from peak import Agent
+from peak.jid_cache import parse_jid
 
-from .behaviors import CreateGraph, EcosystemHierarchy, SearchCommunity
+from .behaviors import CreateGraph, EcosystemHierarchy, SearchCommunity, UpdateGraph
 
 
 class DF(Agent):
@@ -15,9 +15,7 @@ class DF(Agent):
     """
 
     def __init__(self, domain, verify_security, port):
-        super().__init__(
-            JID.fromstr("df@" + domain + "/admin"), verify_security=verify_security
-        )
+        super().__init__(parse_jid(self.name(domain)), verify_security=verify_security)
         self.port = port
 
     @classmethod
@@ -41,11 +39,13 @@ class DF(Agent):
             "tags": {},
         }
         self.dataanalysis_data = dict()
+        self.dataanalysis_series = dict()
         self.group_tags = dict()
 
         self.add_behaviour(EcosystemHierarchy())
         self.add_behaviour(SearchCommunity())
         self.add_behaviour(CreateGraph())
+        self.add_behaviour(UpdateGraph())
 
         # Create routes.
         self.web.add_get("/groups", self.get_groups, template=None)
@@ -69,8 +69,9 @@ class DF(Agent):
             cors.add(route)
 
         # Start web API
-        self.web.start("0.0.0.0", port=self.port)
-        self.logger.info("REST API running on port " + self.port)
+        if self.port is not None:
+            self.web.start("0.0.0.0", port=self.port)
+            self.logger.info(f"REST API running on port {self.port}")
 
     async def get_groups(self, request):
         return {
@@ -1,12 +1,32 @@
+import time as _time
 from datetime import datetime
 
-from peak import CyclicBehaviour
+from peak import CyclicBehaviour, Message
+from peak.agents.synchronizer.behaviors.clock import ACK_TO_METADATA
+from peak.agents.synchronizer.checkpoint import CHECKPOINT_METADATA, RESTORE_METADATA
+from peak.agents.synchronizer.telemetry import LATENCY_METADATA, STEP_TIME_METADATA
 
 
 class StepBehaviour(CyclicBehaviour):
+    """Executes the steps of the agent when the Synchronizer's clock ticks.
+
+    If the step message asks for it ('peak:ack-to' metadata field), the Synchronizer
+    is notified when the step is finished. The acknowledgement reports how long
+    the step took ('peak:step-time') and how long the step message waited before the
+    step started ('peak:latency'), in seconds.
+
+    The behaviour also sends the state of the agent to the Synchronizer when
+    it takes a checkpoint, and restores it when the simulation resumes from a
+    checkpoint (see :meth:`peak.SyncAgent.checkpoint`).
+    """
+
     async def on_start(self):
         self.logger.info("Waiting for simulation to start...")
 
+    async def enqueue(self, message: Message):
+        message.received_at = _time.perf_counter()
+        await super().enqueue(message)
+
     async def run(self):
         msg = await self.receive(10)
         if msg:
@@ -17,8 +37,43 @@ class StepBehaviour(CyclicBehaviour):
                     time = datetime.strptime(
                         msg.get_metadata("time"), "%Y-%m-%d %H:%M:%S"
                     )
+                started = _time.perf_counter()
                 await self.agent.step(period, time)
+                step_time = _time.perf_counter() - started
                 self.logger.info(msg.body)
+                if ack_to := msg.get_metadata(ACK_TO_METADATA):
+                    latency = started - getattr(msg, "received_at", started)
+                    await self.send(
+                        Message(
+                            to=ack_to,
+                            metadata={
+                                "sync": "ack",
+                                "period": str(period),
+                                STEP_TIME_METADATA: f"{step_time:.6f}",
+                                LATENCY_METADATA: f"{latency:.6f}",
+                            },
+                        )
+                    )
+            if msg.get_metadata("sync") == "checkpoint":
+                period = msg.get_metadata(CHECKPOINT_METADATA)
+                state = await self.agent.checkpoint()
+                reply = Message(
+                    to=msg.get_metadata(ACK_TO_METADATA),
+                    metadata={"sync": "ack", CHECKPOINT_METADATA: period},
+                )
+                reply.set_payload(state, self.agent.checkpoint_codec)
+                await self.send(reply)
+                self.logger.info(f"Checkpoint of period {period}")
+            if msg.get_metadata("sync") == "restore":
+                period = msg.get_metadata(RESTORE_METADATA)
+                await self.agent.restore(msg.payload)
+                await self.send(
+                    Message(
+                        to=msg.get_metadata(ACK_TO_METADATA),
+                        metadata={"sync": "ack", RESTORE_METADATA: period},
+                    )
+                )
+                self.logger.info(f"Restored from the checkpoint of period {period}")
             if msg.get_metadata("sync") == "stop":
                 self.logger.info("Simulation ended.")
                 self.kill()
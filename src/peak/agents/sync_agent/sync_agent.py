@@ -1,6 +1,7 @@
 from abc import ABCMeta as _ABCMeta
 from abc import abstractmethod
 from datetime import datetime
+from typing import Any
 
 from aioxmpp import JID
 
@@ -14,32 +15,69 @@ class SyncAgent(Agent, metaclass=_ABCMeta):
 
     Every agent that needs to be synchronized needs
     to extend this class.
+
+    Attributes:
+        checkpoint_codec (str): Codec of the state saved in the checkpoints
+            (see :mod:`peak.codecs`).
     """
 
-    def __init__(self, jid: JID, verify_security: bool = False):
+    checkpoint_codec = "json"
+
+    def __init__(self, jid: JID, cid: int = 0, verify_security: bool = False):
         """Inits the SyncAgent with the JID provided.
 
         Args:
             jid (:obj:`JID`): Agent's XMPP identifier.
+            cid (int, optional): Clone ID.
             verify_security (bool, optional): If True, verifies the SSL certificates.
                 Defaults to False.
         """
-        super().__init__(jid, verify_security)
+        super().__init__(jid, cid, verify_security)
         template_step = Template()
         template_step.set_metadata("sync", "step")
         template_stop = Template()
         template_stop.set_metadata("sync", "stop")
-        template = template_step | template_stop
+        template_checkpoint = Template()
+        template_checkpoint.set_metadata("sync", "checkpoint")
+        template_restore = Template()
+        template_restore.set_metadata("sync", "restore")
+        template = (
+            template_step | template_stop | template_checkpoint | template_restore
+        )
         self.add_behaviour(StepBehaviour(), template)
 
     @abstractmethod
     async def step(self, period: int, time: datetime = None):
         """Executed at each tick of the Synchronizer clock.
 
-        To be implemented by the user.
+        To be implemented by the user. Blocking or CPU-bound steps can be
+        implemented as plain functions decorated with :func:`peak.blocking`,
+        so they run in a thread and the agent keeps responding meanwhile.
 
         Args:
             period (int): Number of the current period.
             time (datetime, optional): Current datetime inside the simulation. It must be
                 configured in the Synchronizer."""
         raise NotImplementedError()
+
+    async def checkpoint(self) -> Any:
+        """Gets the state of the agent, saved in the Synchronizer's checkpoints.
+
+        Executed between two steps when the Synchronizer takes a checkpoint.
+        The state must be encodable with :attr:`checkpoint_codec`. By default
+        the agent has no state.
+
+        Returns:
+            The state of the agent.
+        """
+        return None
+
+    async def restore(self, state: Any):
+        """Restores the state of the agent from a checkpoint.
+
+        Executed before the first step when the simulation resumes from a
+        checkpoint.
+
+        Args:
+            state: State returned by :meth:`checkpoint`.
+        """
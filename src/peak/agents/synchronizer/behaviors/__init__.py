@@ -1,2 +1,4 @@
+from .clock import Clock
 from .datetime_clock import DateTimeClock
 from .periodic_clock import PeriodicClock
+from .relay import Relay
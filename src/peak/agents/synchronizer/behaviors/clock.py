@@ -0,0 +1,369 @@
+import asyncio as _asyncio
+import time
+from abc import ABCMeta as _ABCMeta
+from abc import abstractmethod
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from peak import Message, MessagePrototype, PeriodicBehaviour, Template
+from peak.agents.synchronizer.checkpoint import (
+    CHECKPOINT_METADATA,
+    RESTORE_METADATA,
+    load_checkpoint,
+    save_checkpoint,
+)
+from peak.agents.synchronizer.telemetry import StepSamples, StepTelemetry
+from peak.codecs import CODEC_METADATA
+
+ACK_TO_METADATA = "peak:ack-to"
+
+
+class Clock(PeriodicBehaviour, metaclass=_ABCMeta):
+    """Base class of the clocks of the simulation.
+
+    The clock waits for `n_agents` members in the group and then sends a step
+    message to the group every period until the simulation ends. The clock
+    follows the members that join and leave the group as the group signals
+    them, so the simulation starts as soon as the quorum is reached. If it is
+    not reached within `start_timeout` seconds, the simulation is cancelled and
+    the agents that never showed up are logged.
+
+    In barrier mode the step messages ask the agents to acknowledge the step
+    once they finish it (see :class:`peak.agents.sync_agent.behaviors.StepBehaviour`)
+    and the clock advances as soon as every member of the group acknowledged,
+    so the simulation runs as fast as the agents compute. The period is then
+    the minimum time between steps. Members that do not acknowledge within
+    `straggler_timeout` seconds are logged as stragglers and the clock advances
+    without them.
+
+    The acknowledgements carry the duration of the agents' steps and their
+    receive-to-step latency. The clock keeps the distribution of both for
+    each period, and the stragglers, in its :class:`StepTelemetry`. In
+    fixed-interval mode the agents only acknowledge the steps if `reports` is
+    True, and the acknowledgements that arrive after the next tick are
+    counted as stragglers.
+
+    Every `checkpoint_every` periods the clock asks the agents for their state
+    (see :meth:`peak.SyncAgent.checkpoint`) and, once all of them sent it,
+    writes a checkpoint with the state of the clock and of the agents to
+    `checkpoint_folder`. With `resume`, the clock starts from the latest
+    checkpoint: it sends each agent its state before the first tick and
+    continues from the period (and time) of the checkpoint.
+
+    Attributes:
+        group_jid (str): Group of the agents.
+        n_agents (int): Number of members of the group (the Synchronizer
+            included) required to start.
+        barrier (bool): Whether the clock waits for the acknowledgements.
+        straggler_timeout (float): Seconds to wait for the acknowledgements.
+            None waits forever.
+        start_timeout (float): Seconds to wait for the quorum. None waits
+            forever.
+        agents (list of str): Names of the agents expected in the group. The
+            simulation only starts when all of them are in the group.
+        missing_agents (list of str): Expected agents that were not in the group
+            when the start timeout expired.
+        current_period (int): Number of the current period.
+        reports (bool): Whether the agents report their steps in
+            fixed-interval mode.
+        telemetry (:obj:`StepTelemetry`): Statistics of the periods.
+        samples (:obj:`StepSamples`): Acknowledgements of the current period.
+        checkpoint_every (int): Periods between checkpoints. None takes no
+            checkpoints.
+        checkpoint_folder (str): Folder of the checkpoints.
+        resume (bool): Whether the clock starts from the latest checkpoint.
+    """
+
+    def __init__(
+        self,
+        group_jid: str,
+        n_agents: int,
+        period: float,
+        start_at: datetime = None,
+        *,
+        barrier: bool = False,
+        straggler_timeout: Optional[float] = None,
+        start_timeout: Optional[float] = None,
+        agents: Optional[List[str]] = None,
+        reports: bool = False,
+        checkpoint_every: Optional[int] = None,
+        checkpoint_folder: str = "checkpoints",
+        resume: bool = False,
+    ):
+        super().__init__(period, start_at=start_at)
+        self.group_jid = group_jid
+        self.n_agents = n_agents
+        self.barrier = barrier
+        self.straggler_timeout = straggler_timeout
+        self.start_timeout = start_timeout
+        self.agents = agents or []
+        self.missing_agents: List[str] = []
+        self.current_period = 0
+        self.reports = reports
+        self.telemetry = StepTelemetry()
+        self.samples: Optional[StepSamples] = None
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_folder = checkpoint_folder
+        self.resume = resume
+        self._pending: List[Message] = []
+
+    async def on_start(self):
+        template = Template()
+        template.set_metadata("sync", "ack")
+        self.set_template(template)
+        metadata = {"sync": "step"}
+        if self.barrier or self.reports:
+            metadata[ACK_TO_METADATA] = str(self.agent.jid)
+        self.step_message = MessagePrototype(to=self.group_jid, metadata=metadata)
+        self.stop_message = MessagePrototype(
+            to=self.group_jid, metadata={"sync": "stop"}
+        )
+        self.checkpoint_message = MessagePrototype(
+            to=self.group_jid,
+            metadata={"sync": "checkpoint", ACK_TO_METADATA: str(self.agent.jid)},
+        )
+        await self.join_community(self.group_jid)
+        self.logger.info("Waiting for all agents to enter the group...")
+        if not await self.wait_quorum():
+            await self.send_to_community(self.stop_message.message())
+            self.kill()
+            return
+        if self.resume:
+            await self.restore_checkpoint()
+        self.logger.info("Starting simulation...")
+
+    async def wait_quorum(self) -> bool:
+        """Waits until the expected agents are in the group.
+
+        Returns:
+            False if the start timeout expired first.
+        """
+        room = self.agent.communities.get(self.group_jid)
+        if room is None:
+            self.missing_agents = list(self.agents)
+            self.logger.error(f"Could not join the group {self.group_jid}")
+            return False
+        present = {member.nick for member in room.members}
+        quorum = _asyncio.Event()
+
+        def check():
+            if len(present) >= self.n_agents and present.issuperset(self.agents):
+                quorum.set()
+
+        def joined(member, **kwargs):
+            present.add(member.nick)
+            self.logger.debug(f"{member.nick} entered the group ({len(present)})")
+            check()
+
+        def left(member, **kwargs):
+            present.discard(member.nick)
+            self.logger.debug(f"{member.nick} left the group ({len(present)})")
+            check()
+
+        tokens = room.on_join.connect(joined), room.on_leave.connect(left)
+        check()
+        try:
+            await _asyncio.wait_for(quorum.wait(), self.start_timeout)
+            return True
+        except _asyncio.TimeoutError:
+            self.missing_agents = sorted(set(self.agents) - present)
+            missing = ""
+            if self.missing_agents:
+                missing = f", missing: {', '.join(self.missing_agents)}"
+            self.logger.error(
+                f"Simulation cancelled: {len(present)} of {self.n_agents} agents in the group after {self.start_timeout}s{missing}"
+            )
+            return False
+        finally:
+            room.on_join.disconnect(tokens[0])
+            room.on_leave.disconnect(tokens[1])
+
+    async def run(self):
+        if self.samples is not None and not self.barrier:
+            # acknowledgements of the previous period received until this tick
+            while not self.queue.empty():
+                self._take(self.queue.get_nowait(), self.samples)
+            self.record(self.samples)
+        if self.finished():
+            await self.send_to_community(self.stop_message.message())
+            self.kill()
+            return
+        self.samples = None
+        if self.barrier or self.reports:
+            self.samples = StepSamples(self.current_period, await self._members())
+        await self.send_to_community(self.tick())
+        if self.barrier:
+            await self.wait_acks(self.samples)
+            self.record(self.samples)
+        self.advance()
+        if self.checkpoint_every and self.current_period % self.checkpoint_every == 0:
+            await self.take_checkpoint()
+
+    def state(self) -> dict:
+        """State of the clock, saved in the checkpoints."""
+        return {"period": self.current_period}
+
+    def restore(self, state: dict):
+        """Restores the state of the clock from a checkpoint."""
+        self.current_period = state["period"]
+
+    async def take_checkpoint(self):
+        """Collects the state of the agents and writes a checkpoint.
+
+        The checkpoint is not written if an agent does not send its state
+        within the straggler timeout.
+        """
+        period = str(self.current_period)
+        members = await self._members()
+        await self.send_to_community(
+            self.checkpoint_message.message(**{CHECKPOINT_METADATA: period})
+        )
+        acks = await self._collect(CHECKPOINT_METADATA, period, members)
+        if len(acks) < len(members):
+            missing = sorted(set(members.values()) - set(acks))
+            self.logger.warning(
+                f"Checkpoint of period {period} discarded, missing: {', '.join(missing)}"
+            )
+            return
+        states = {
+            jid: {"codec": msg.get_metadata(CODEC_METADATA), "state": msg.body}
+            for jid, msg in acks.items()
+        }
+        path = save_checkpoint(
+            self.checkpoint_folder, self.group_jid, self.state(), states
+        )
+        self.logger.info(f"Checkpoint of period {period} saved to {path}")
+
+    async def restore_checkpoint(self):
+        """Restores the clock and the agents from the latest checkpoint."""
+        checkpoint = load_checkpoint(self.checkpoint_folder, self.group_jid)
+        if checkpoint is None:
+            self.logger.info("No checkpoint to resume from")
+            return
+        self.restore(checkpoint["clock"])
+        period = str(self.current_period)
+        members = await self._members()
+        states = checkpoint["agents"]
+        for jid in members.values():
+            if jid not in states:
+                self.logger.warning(f"{jid} is not in the checkpoint")
+                continue
+            metadata = {
+                "sync": "restore",
+                RESTORE_METADATA: period,
+                ACK_TO_METADATA: str(self.agent.jid),
+            }
+            if states[jid]["codec"] is not None:
+                metadata[CODEC_METADATA] = states[jid]["codec"]
+            await self.send(
+                Message(to=jid, body=states[jid]["state"], metadata=metadata)
+            )
+        members = {nick: jid for nick, jid in members.items() if jid in states}
+        acks = await self._collect(RESTORE_METADATA, period, members)
+        missing = sorted(set(members.values()) - set(acks))
+        if missing:
+            self.logger.warning(f"Agents not restored: {', '.join(missing)}")
+        self.logger.info(f"Resuming from the checkpoint of period {period}")
+
+    async def _collect(
+        self, kind: str, period: str, members: Dict[str, str]
+    ) -> Dict[str, Message]:
+        """Waits for the acknowledgements of a checkpoint or restore.
+
+        Returns:
+            The acknowledgements by JID.
+        """
+        acks: Dict[str, Message] = {}
+        missing = set(members)
+        # the acknowledgements come from the agents' JIDs, not their nicknames
+        nicks = {jid: nick for nick, jid in members.items()}
+        deadline = None
+        if self.straggler_timeout is not None:
+            deadline = time.monotonic() + self.straggler_timeout
+        while missing:
+            timeout = 1
+            if deadline is not None:
+                timeout = min(timeout, deadline - time.monotonic())
+                if timeout <= 0:
+                    break
+            msg: Message = await self.receive(timeout)
+            if msg is None:
+                missing &= set(await self._members())
+            elif msg.get_metadata(kind) == period:
+                jid = str(msg.sender.bare())
+                missing.discard(nicks.get(jid, msg.sender.localpart))
+                acks[jid] = msg
+            else:
+                self._take(msg, self.samples)
+        return acks
+
+    async def wait_acks(self, samples: StepSamples):
+        """Waits until every member of the group acknowledges the step.
+
+        Other messages received meanwhile are kept in `_pending`.
+
+        Args:
+            samples: Acknowledgements of the step.
+        """
+        deadline = None
+        if self.straggler_timeout is not None:
+            deadline = time.monotonic() + self.straggler_timeout
+        while samples.missing:
+            timeout = 1
+            if deadline is not None:
+                timeout = min(timeout, deadline - time.monotonic())
+                if timeout <= 0:
+                    self.logger.warning(
+                        f"Period {samples.period}: {len(samples.missing)} stragglers ({', '.join(sorted(samples.missing))})"
+                    )
+                    return
+            msg: Message = await self.receive(timeout)
+            if msg is None:
+                # members that left the group are not waited for
+                samples.missing &= set(await self._members())
+            else:
+                self._take(msg, samples)
+
+    def record(self, samples: StepSamples):
+        """Adds the acknowledgements of a period to the telemetry and logs them."""
+        self.logger.info(str(self.telemetry.record(samples)))
+
+    def _take(self, msg: Message, samples: Optional[StepSamples]):
+        if msg.get_metadata("sync") != "ack":
+            # commands of a parent clock, only received (and drained) by relays
+            self._pending.append(msg)
+        elif samples is not None:
+            samples.add(msg)
+        else:
+            self.logger.debug(f"Late acknowledgement from {msg.sender} discarded")
+
+    async def _members(self) -> Dict[str, str]:
+        """JID of the members of the group (but the clock's) by nickname."""
+        members = await self.community_members(self.group_jid)
+        return {
+            member.nick: (
+                str(member.direct_jid.bare())
+                if member.direct_jid is not None
+                else member.nick
+            )
+            for member in members[1:]
+        }
+
+    @abstractmethod
+    def finished(self) -> bool:
+        """Whether the simulation ended."""
+        raise NotImplementedError()
+
+    @abstractmethod
+    def tick(self) -> Message:
+        """Step message of the current period."""
+        raise NotImplementedError()
+
+    @abstractmethod
+    def advance(self):
+        """Moves the clock to the next period."""
+        raise NotImplementedError()
+
+    async def on_end(self):
+        self.logger.info("Ending simulation...")
+        await self.agent.stop()
@@ -1,10 +1,12 @@
-import asyncio as _asyncio
 from datetime import datetime, timedelta
+from typing import List, Optional
 
-from peak import Message, PeriodicBehaviour
+from peak import Message
 
+from .clock import Clock
 
-class DateTimeClock(PeriodicBehaviour):
+
+class DateTimeClock(Clock):
     """Handles the clock of the simulation.
 
     This clock tracks the current date and time of the
@@ -20,37 +22,54 @@ class DateTimeClock(PeriodicBehaviour):
         period_time_simulated: timedelta,
         period_time_real: float,
         start_at: datetime = None,
+        *,
+        barrier: bool = False,
+        straggler_timeout: Optional[float] = None,
+        start_timeout: Optional[float] = None,
+        agents: Optional[List[str]] = None,
+        reports: bool = False,
+        checkpoint_every: Optional[int] = None,
+        checkpoint_folder: str = "checkpoints",
+        resume: bool = False,
     ):
-        super().__init__(period_time_real, start_at=start_at)
-        self.group_jid = jid
-        self.n_agents = n_agents
+        super().__init__(
+            jid,
+            n_agents,
+            period_time_real,
+            start_at=start_at,
+            barrier=barrier,
+            straggler_timeout=straggler_timeout,
+            start_timeout=start_timeout,
+            agents=agents,
+            reports=reports,
+            checkpoint_every=checkpoint_every,
+            checkpoint_folder=checkpoint_folder,
+            resume=resume,
+        )
         self.time = initial_time
         self.end_time = end_time
         self.period_time = period_time_simulated
 
-    async def on_start(self):
-        self.logger.info("Waiting for all agents to enter the group...")
-        while not len(await self.agent.group_members(self.group_jid)) >= self.n_agents:
-            await _asyncio.sleep(1)
-        self.current_period = 0
-        self.logger.info("Starting simulation...")
-
-    async def run(self):
-        msg = Message()
-        msg.to = self.group_jid
-        if self.time >= self.end_time:
-            msg.set_metadata("sync", "stop")
-            self.kill()
-        else:
-            self.logger.info(f"Period {self.current_period} ({self.time})")
-            msg.body = f"Period {self.current_period} ({self.time})"
-            msg.set_metadata("sync", "step")
-            msg.set_metadata("period", str(self.current_period))
-            msg.set_metadata("time", datetime.strftime(self.time, "%Y-%m-%d %H:%M:%S"))
-        await self.send_to_group(msg)
+    def finished(self) -> bool:
+        return self.time >= self.end_time
+
+    def tick(self) -> Message:
+        self.logger.info(f"Period {self.current_period} ({self.time})")
+        return self.step_message.message(
+            body=f"Period {self.current_period} ({self.time})",
+            period=str(self.current_period),
+            time=datetime.strftime(self.time, "%Y-%m-%d %H:%M:%S"),
+        )
+
+    def state(self) -> dict:
+        return super().state() | {
+            "time": datetime.strftime(self.time, "%Y-%m-%d %H:%M:%S")
+        }
+
+    def restore(self, state: dict):
+        super().restore(state)
+        self.time = datetime.strptime(state["time"], "%Y-%m-%d %H:%M:%S")
+
+    def advance(self):
         self.current_period += 1
         self.time += self.period_time
-
-    async def on_end(self):
-        self.logger.info("Ending simulation...")
-        await self.agent.stop()
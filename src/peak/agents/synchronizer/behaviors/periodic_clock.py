@@ -1,9 +1,12 @@
-import asyncio as _asyncio
+from datetime import datetime
+from typing import List, Optional
 
-from peak import Message, PeriodicBehaviour
+from peak import Message
 
+from .clock import Clock
 
-class PeriodicClock(PeriodicBehaviour):
+
+class PeriodicClock(Clock):
     """Handles the clock of the simulation.
 
     This clock tracks the number of the current period
@@ -16,34 +19,41 @@ class PeriodicClock(PeriodicBehaviour):
         n_agents: int,
         periods: int,
         time_per_period: float,
-        start_at=None,
+        start_at: datetime = None,
+        *,
+        barrier: bool = False,
+        straggler_timeout: Optional[float] = None,
+        start_timeout: Optional[float] = None,
+        agents: Optional[List[str]] = None,
+        reports: bool = False,
+        checkpoint_every: Optional[int] = None,
+        checkpoint_folder: str = "checkpoints",
+        resume: bool = False,
     ):
-        super().__init__(time_per_period, start_at=start_at)
-        self.group_jid = group_jid
-        self.n_agents = n_agents
+        super().__init__(
+            group_jid,
+            n_agents,
+            time_per_period,
+            start_at=start_at,
+            barrier=barrier,
+            straggler_timeout=straggler_timeout,
+            start_timeout=start_timeout,
+            agents=agents,
+            reports=reports,
+            checkpoint_every=checkpoint_every,
+            checkpoint_folder=checkpoint_folder,
+            resume=resume,
+        )
         self.periods = periods
 
-    async def on_start(self):
-        self.logger.info("Waiting for all agents to enter the group...")
-        while not len(await self.agent.group_members(self.group_jid)) >= self.n_agents:
-            await _asyncio.sleep(1)
-        self.current_period = 0
-        self.logger.info("Starting simulation...")
-
-    async def run(self):
-        msg = Message()
-        msg.to = self.group_jid
-        if self.current_period >= self.periods:
-            msg.set_metadata("sync", "stop")
-            self.kill()
-        else:
-            self.logger.info(f"Period {self.current_period}")
-            msg.body = f"Period {self.current_period}"
-            msg.set_metadata("sync", "step")
-            msg.set_metadata("period", str(self.current_period))
-        await self.send_to_group(msg)
-        self.current_period += 1
+    def finished(self) -> bool:
+        return self.current_period >= self.periods
 
-    async def on_end(self):
-        self.logger.info("Ending simulation...")
-        await self.agent.stop()
+    def tick(self) -> Message:
+        self.logger.info(f"Period {self.current_period}")
+        return self.step_message.message(
+            body=f"Period {self.current_period}", period=str(self.current_period)
+        )
+
+    def advance(self):
+        self.current_period += 1
@@ -0,0 +1,90 @@
+from typing import Optional
+
+from peak import Message, MessagePrototype, Template
+
+from .clock import ACK_TO_METADATA, Clock
+
+
+class Relay(Clock):
+    """Relays the ticks of a parent clock to a group of agents.
+
+    The relays of a synchronization tree (see
+    :meth:`peak.Synchronizer.sync_group_period`) own part of the agents. A
+    relay waits for its group to be complete before joining the group of its
+    parent, so the top clock only starts when the whole tree is ready. Each
+    step received from the parent is relayed to the group and, if the parent
+    waits for acknowledgements, the relay acknowledges it once all the members
+    of its group did. The parent therefore sees a single acknowledgement for
+    the whole subtree, with the step time and latency of its slowest agent and
+    the number of stragglers in the subtree.
+
+    Attributes:
+        parent_jid (str): Group of the parent clock.
+    """
+
+    def __init__(
+        self,
+        group_jid: str,
+        n_agents: int,
+        parent_jid: str,
+        straggler_timeout: Optional[float] = None,
+        start_timeout: Optional[float] = None,
+    ):
+        super().__init__(
+            group_jid,
+            n_agents,
+            0,
+            barrier=True,
+            straggler_timeout=straggler_timeout,
+            start_timeout=start_timeout,
+        )
+        self.parent_jid = parent_jid
+        self.command: Optional[Message] = None
+
+    async def on_start(self):
+        await super().on_start()
+        if self.is_killed():
+            return
+        self.relay_message = MessagePrototype(
+            to=self.group_jid, metadata={"sync": "step"}
+        )
+        ack = Template()
+        ack.set_metadata("sync", "ack")
+        step = Template()
+        step.set_metadata("sync", "step")
+        stop = Template()
+        stop.set_metadata("sync", "stop")
+        self.set_template(ack | step | stop)
+        await self.join_community(self.parent_jid)
+
+    async def run(self):
+        self.command = self._pending.pop(0) if self._pending else await self.receive(10)
+        if self.command is None or self.command.get_metadata("sync") == "ack":
+            return
+        self.barrier = ACK_TO_METADATA in self.command.metadata
+        if self.command.get_metadata("period") is not None:
+            self.current_period = int(self.command.get_metadata("period"))
+        await super().run()
+        if self.barrier and not self.is_killed():
+            await self.send(
+                Message(
+                    to=self.command.get_metadata(ACK_TO_METADATA),
+                    metadata={"sync": "ack", "period": str(self.current_period)}
+                    | self.samples.summary(),
+                )
+            )
+
+    def finished(self) -> bool:
+        return self.command.get_metadata("sync") == "stop"
+
+    def tick(self) -> Message:
+        prototype = self.step_message if self.barrier else self.relay_message
+        fields = {
+            name: self.command.metadata[name]
+            for name in ("period", "time")
+            if name in self.command.metadata
+        }
+        return prototype.message(body=self.command.body, **fields)
+
+    def advance(self):
+        pass
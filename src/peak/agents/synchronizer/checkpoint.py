@@ -0,0 +1,74 @@
+import json
+import os
+from typing import Dict, Optional
+
+from peak import getLogger
+
+logger = getLogger(__name__)
+
+CHECKPOINT_METADATA = "peak:checkpoint"
+RESTORE_METADATA = "peak:restore"
+
+
+def checkpoint_path(folder: str, group_jid: str, period: int) -> str:
+    """Path of the checkpoint of a group at the start of a period."""
+    return os.path.join(folder, group_jid, f"{period:08d}.json")
+
+
+def save_checkpoint(
+    folder: str,
+    group_jid: str,
+    clock: dict,
+    states: Dict[str, dict],
+    keep: int = 3,
+) -> str:
+    """Writes the checkpoint of a group.
+
+    The checkpoint is written to a temporary file that then replaces the
+    checkpoint file, so a checkpoint file is always complete. Only the last
+    `keep` checkpoints of the group are kept.
+
+    Args:
+        folder: Folder of the checkpoints.
+        group_jid: Group of the agents.
+        clock: State of the clock (see :meth:`Clock.state`).
+        states: Encoded state of each agent by JID, with its codec.
+        keep: Number of checkpoints kept.
+
+    Returns:
+        The path of the checkpoint.
+    """
+    path = checkpoint_path(folder, group_jid, clock["period"])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".tmp", "w") as file:
+        json.dump({"clock": clock, "agents": states}, file, separators=(",", ":"))
+    os.replace(path + ".tmp", path)
+    for old in _checkpoints(folder, group_jid)[:-keep]:
+        os.remove(os.path.join(folder, group_jid, old))
+    return path
+
+
+def load_checkpoint(folder: str, group_jid: str) -> Optional[dict]:
+    """Reads the latest checkpoint of a group.
+
+    Returns:
+        The state of the clock ('clock') and of the agents ('agents'), or None
+        if the group has no checkpoint.
+    """
+    for name in reversed(_checkpoints(folder, group_jid)):
+        path = os.path.join(folder, group_jid, name)
+        try:
+            with open(path) as file:
+                return json.load(file)
+        except (OSError, ValueError) as error:
+            logger.warning(f"Skipping checkpoint {path} ({error})")
+    return None
+
+
+def _checkpoints(folder: str, group_jid: str) -> list:
+    """Checkpoint files of a group, from the oldest to the latest."""
+    try:
+        names = os.listdir(os.path.join(folder, group_jid))
+    except FileNotFoundError:
+        return []
+    return sorted(name for name in names if name.endswith(".json"))
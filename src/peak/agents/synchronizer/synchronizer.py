@@ -1,7 +1,16 @@
+import asyncio
+import math
 from datetime import datetime, timedelta
+from typing import Dict, List, Optional
 
-from peak import Agent
-from peak.agents.synchronizer.behaviors import DateTimeClock, PeriodicClock
+from aioxmpp import JID
+
+from peak import Agent, Message, getLogger
+from peak.agents.synchronizer.behaviors import DateTimeClock, PeriodicClock, Relay
+from peak.agents.synchronizer.telemetry import StepTelemetry
+from peak.jid_cache import parse_jid
+
+logger = getLogger(__name__)
 
 
 class Synchronizer(Agent):
@@ -9,11 +18,140 @@ class Synchronizer(Agent):
 
     The Synchronizer creates a group of agents, awaits for
     the agents to join the group and starts the clock of the
-    simulation.
+    simulation as soon as they are all in the group.
+
+    By default the clock ticks at a fixed interval. In barrier mode
+    the clock advances as soon as all the agents finish the step,
+    and the interval is the minimum time between steps (see
+    :class:`peak.agents.synchronizer.behaviors.Clock`).
+
+    For very large simulations the agents can be split in a tree of
+    groups. With a `fanout`, the Synchronizer starts sub-synchronizers
+    that own up to `fanout` agents (or sub-synchronizers) each, relay the
+    ticks downward and acknowledge the steps upward (see
+    :class:`peak.agents.synchronizer.behaviors.Relay`). Each agent joins
+    the group given by :meth:`leaf_group`. The sub-synchronizers are
+    agents hosted in the Synchronizer's process and event loop: the tree
+    splits the messages of each period across smaller groups, but it
+    does not spread the work of the clocks across processes.
+
+    The clock of each group keeps the step time and latency of the agents
+    and the stragglers of every period (see
+    :class:`peak.agents.synchronizer.telemetry.StepTelemetry`):
+
+        >>> synchronizer.telemetry[group_jid].query(first=10, last=20)
+
+    Attributes:
+        relays (list of :obj:`Synchronizer`): Sub-synchronizers of the tree.
+        telemetry (dict of :obj:`StepTelemetry`): Telemetry of the clocks by
+            group.
     """
 
+    def __init__(self, jid: JID, cid: int = 0, verify_security: bool = False):
+        super().__init__(jid, cid, verify_security)
+        self.relays: List[Synchronizer] = []
+        self.telemetry: Dict[str, StepTelemetry] = {}
+
+    def dispatch(self, msg: Message) -> List[asyncio.Future]:
+        # the groups echo the clock messages back to the Synchronizer
+        sender = msg.sender
+        room = self.communities.get(str(sender.bare())) if sender is not None else None
+        if room is not None and room.me is not None and sender.resource == room.me.nick:
+            return []
+        return super().dispatch(msg)
+
+    @staticmethod
+    def leaf_group(group_jid: str, index: int, fanout: int) -> str:
+        """Group of an agent in a synchronization tree.
+
+        Args:
+            group_jid: Identifier of the group synchronized by the tree.
+            index: Index of the agent, from 0 to the number of agents - 1
+                (e.g. its clone ID).
+            fanout: Fan-out of the tree.
+
+        Returns:
+            The identifier of the group the agent must join.
+        """
+        return str(_tree_group(parse_jid(group_jid), 1, index // fanout))
+
+    async def _async_stop(self):
+        relays = [relay for relay in self.relays if relay.is_alive()]
+        if relays:
+            # the relays stop by themselves once they relay the end of the simulation
+            await asyncio.wait(
+                [asyncio.ensure_future(relay.wait_stopped()) for relay in relays],
+                timeout=5,
+            )
+            for relay in relays:
+                if relay.is_alive():
+                    await relay.stop()
+        await super()._async_stop()
+
+    async def _start_tree(
+        self,
+        group_jid: str,
+        n_agents: int,
+        fanout: int,
+        straggler_timeout: Optional[float],
+        start_timeout: Optional[float],
+    ) -> List[str]:
+        """Starts the sub-synchronizers of a synchronization tree.
+
+        The sub-synchronizers use the Synchronizer's transport and run in its
+        process and event loop, and are stopped with it.
+
+        Returns:
+            The names of the sub-synchronizers at the top of the tree.
+        """
+        if fanout < 2:
+            raise ValueError(f"fanout must be at least 2, not {fanout}")
+        group = parse_jid(group_jid)
+        level, children = 1, n_agents
+        while True:
+            n_groups = math.ceil(children / fanout)
+            names = []
+            for i in range(n_groups):
+                parent = group_jid
+                if n_groups > fanout:
+                    parent = str(_tree_group(group, level + 1, i // fanout))
+                jid = self.jid.replace(localpart=f"{self.jid.localpart}-{level}-{i}")
+                relay = Synchronizer(jid, verify_security=self.verify_security)
+                relay.transport = self.transport
+                relay.add_behaviour(
+                    Relay(
+                        str(_tree_group(group, level, i)),
+                        min(fanout, children - i * fanout) + 1,
+                        parent,
+                        straggler_timeout,
+                        start_timeout,
+                    )
+                )
+                await relay.start()
+                self.relays.append(relay)
+                names.append(relay.name)
+            if n_groups <= fanout:
+                logger.info(
+                    f"Synchronization tree: {n_agents} agents, {len(self.relays)} sub-synchronizers, {level} levels"
+                )
+                return names
+            level, children = level + 1, n_groups
+
     async def sync_group_period(
-        self, group_jid: str, n_agents: int, interval: float, periods: int
+        self,
+        group_jid: str,
+        n_agents: int,
+        interval: float,
+        periods: int,
+        barrier: bool = False,
+        straggler_timeout: Optional[float] = None,
+        start_timeout: Optional[float] = None,
+        agents: Optional[List[str]] = None,
+        fanout: Optional[int] = None,
+        reports: bool = False,
+        checkpoint_every: Optional[int] = None,
+        checkpoint_folder: str = "checkpoints",
+        resume: bool = False,
     ):
         """Synchronizes a group of agents.
 
@@ -24,11 +162,53 @@ class Synchronizer(Agent):
             n_agents: Number of agents to be synchronized. Synchronizer
                 awaits for this number of agents to join the group before
                 it starts the simulation.
-            interval: Time in seconds between each period.
+            interval: Time in seconds between each period. In barrier mode,
+                minimum time between each period.
             periods: Number of periods to simulate.
+            barrier: If True, each period starts as soon as all the agents
+                finished the previous one.
+            straggler_timeout: In barrier mode, seconds to wait for the agents
+                to finish a period. None waits forever.
+            start_timeout: Seconds to wait for the agents to join the group. If
+                they don't, the simulation is cancelled. None waits forever.
+            agents: Names of the agents that must join the group before the
+                simulation starts.
+            fanout: If given, the agents are synchronized through a tree of
+                sub-synchronizers with this fan-out. `n_agents` is then the
+                number of agents, and each agent joins the group given by
+                :meth:`leaf_group` instead of `group_jid`.
+            reports: If True, the agents report their steps even if the clock
+                is not in barrier mode.
+            checkpoint_every: If given, a checkpoint of the agents' state is
+                taken every `checkpoint_every` periods. Not supported with a
+                `fanout`.
+            checkpoint_folder: Folder where the checkpoints are saved.
+            resume: If True, the simulation resumes from the latest checkpoint
+                in `checkpoint_folder`, if any.
         """
-        await self.join_group(group_jid)
-        self.add_behaviour(PeriodicClock(group_jid, n_agents, periods, interval))
+        if fanout is not None:
+            if checkpoint_every is not None or resume:
+                raise ValueError("checkpoints are not supported with a fanout")
+            agents = await self._start_tree(
+                group_jid, n_agents, fanout, straggler_timeout, start_timeout
+            )
+            n_agents = len(agents) + 1
+        clock = PeriodicClock(
+            group_jid,
+            n_agents,
+            periods,
+            interval,
+            barrier=barrier,
+            straggler_timeout=straggler_timeout,
+            start_timeout=start_timeout,
+            agents=agents,
+            reports=reports,
+            checkpoint_every=checkpoint_every,
+            checkpoint_folder=checkpoint_folder,
+            resume=resume,
+        )
+        self.telemetry[group_jid] = clock.telemetry
+        self.add_behaviour(clock)
 
     async def sync_group_time(
         self,
@@ -39,6 +219,15 @@ class Synchronizer(Agent):
         internal_interval: timedelta,
         external_period_time: float,
         start_at: datetime = None,
+        barrier: bool = False,
+        straggler_timeout: Optional[float] = None,
+        start_timeout: Optional[float] = None,
+        agents: Optional[List[str]] = None,
+        fanout: Optional[int] = None,
+        reports: bool = False,
+        checkpoint_every: Optional[int] = None,
+        checkpoint_folder: str = "checkpoints",
+        resume: bool = False,
     ):
         """Synchronizes a group of agents.
 
@@ -57,20 +246,59 @@ class Synchronizer(Agent):
             end_datetime: Defines the date and time at which the simulation ends.
             internal_interval: Time between each period relative to the initial and
                 end datetimes.
-            interval: Time in seconds between each period relative to the Synchronizers
-                clock.
+            external_period_time: Time in seconds between each period relative to the
+                Synchronizers clock. In barrier mode, minimum time between each period.
             start_at: Schedules the simulation to start at a given time. If None the
                 simulation starts right away.
+            barrier: If True, each period starts as soon as all the agents
+                finished the previous one.
+            straggler_timeout: In barrier mode, seconds to wait for the agents
+                to finish a period. None waits forever.
+            start_timeout: Seconds to wait for the agents to join the group. If
+                they don't, the simulation is cancelled. None waits forever.
+            agents: Names of the agents that must join the group before the
+                simulation starts.
+            fanout: If given, the agents are synchronized through a tree of
+                sub-synchronizers with this fan-out. `n_agents` is then the
+                number of agents, and each agent joins the group given by
+                :meth:`leaf_group` instead of `group_jid`.
+            reports: If True, the agents report their steps even if the clock
+                is not in barrier mode.
+            checkpoint_every: If given, a checkpoint of the agents' state is
+                taken every `checkpoint_every` periods. Not supported with a
+                `fanout`.
+            checkpoint_folder: Folder where the checkpoints are saved.
+            resume: If True, the simulation resumes from the latest checkpoint
+                in `checkpoint_folder`, if any.
         """
-        await self.join_group(group_jid)
-        self.add_behaviour(
-            DateTimeClock(
-                group_jid,
-                n_agents,
-                initial_datetime,
-                end_datetime,
-                internal_interval,
-                external_period_time,
-                start_at,
+        if fanout is not None:
+            if checkpoint_every is not None or resume:
+                raise ValueError("checkpoints are not supported with a fanout")
+            agents = await self._start_tree(
+                group_jid, n_agents, fanout, straggler_timeout, start_timeout
             )
+            n_agents = len(agents) + 1
+        clock = DateTimeClock(
+            group_jid,
+            n_agents,
+            initial_datetime,
+            end_datetime,
+            internal_interval,
+            external_period_time,
+            start_at=start_at,
+            barrier=barrier,
+            straggler_timeout=straggler_timeout,
+            start_timeout=start_timeout,
+            agents=agents,
+            reports=reports,
+            checkpoint_every=checkpoint_every,
+            checkpoint_folder=checkpoint_folder,
+            resume=resume,
         )
+        self.telemetry[group_jid] = clock.telemetry
+        self.add_behaviour(clock)
+
+
+def _tree_group(group: JID, level: int, index: int) -> JID:
+    """Group of the sub-synchronizer `index` at `level` of a synchronization tree."""
+    return group.replace(localpart=f"{group.localpart}-{level}-{index}")
@@ -0,0 +1,222 @@
+import math
+import time
+from collections import Counter, deque
+from typing import Deque, Dict, Iterable, List, Optional
+
+from peak import Message, getLogger
+
+logger = getLogger(__name__)
+
+STEP_TIME_METADATA = "peak:step-time"
+LATENCY_METADATA = "peak:latency"
+STRAGGLERS_METADATA = "peak:stragglers"
+
+
+def distribution(values: Iterable[float]) -> Optional[Dict[str, float]]:
+    """Median, 95th percentile and maximum of the values, or None if empty.
+
+    The percentiles are nearest-rank percentiles (one of the values).
+    """
+    values = sorted(values)
+    if not values:
+        return None
+    return {
+        "p50": values[math.ceil(0.50 * len(values)) - 1],
+        "p95": values[math.ceil(0.95 * len(values)) - 1],
+        "max": values[-1],
+    }
+
+
+class StepSamples:
+    """Acknowledgements of the members of a group for one period.
+
+    Attributes:
+        period (int): Number of the period.
+        started (float): Monotonic time at which the period started.
+        missing (set of str): Nicknames of the members that did not acknowledge.
+        step_times (dict of float): Step duration reported by each member.
+        latencies (dict of float): Time each member took between receiving the
+            step message and starting the step.
+        stragglers (int): Stragglers reported by the members (sub-synchronizers).
+    """
+
+    def __init__(self, period: int, members: Dict[str, str]):
+        """Inits the samples of a period.
+
+        Args:
+            period: Number of the period.
+            members: JID of each member of the group by nickname.
+        """
+        self.period = period
+        self.started = time.monotonic()
+        self.members = members
+        self.missing = set(members)
+        self._nicks = {jid: nick for nick, jid in members.items()}
+        self.step_times: Dict[str, float] = {}
+        self.latencies: Dict[str, float] = {}
+        self.stragglers = 0
+
+    def add(self, msg: Message) -> bool:
+        """Adds the acknowledgement of a member.
+
+        Returns:
+            False if the acknowledgement is of another period.
+        """
+        if msg.get_metadata("period") != str(self.period):
+            return False
+        # the acknowledgements come from the agents' JIDs, not their nicknames
+        jid = str(msg.sender.bare())
+        self.missing.discard(self._nicks.get(jid, msg.sender.localpart))
+        if step_time := msg.get_metadata(STEP_TIME_METADATA):
+            self.step_times[jid] = float(step_time)
+        if latency := msg.get_metadata(LATENCY_METADATA):
+            self.latencies[jid] = float(latency)
+        if stragglers := msg.get_metadata(STRAGGLERS_METADATA):
+            self.stragglers += int(stragglers)
+        return True
+
+    def summary(self) -> Dict[str, str]:
+        """Metadata of the acknowledgement that aggregates the samples.
+
+        The step time and latency of a group are the ones of its slowest member.
+        """
+        summary = {STRAGGLERS_METADATA: str(self.stragglers + len(self.missing))}
+        if self.step_times:
+            summary[STEP_TIME_METADATA] = f"{max(self.step_times.values()):.6f}"
+        if self.latencies:
+            summary[LATENCY_METADATA] = f"{max(self.latencies.values()):.6f}"
+        return summary
+
+
+class PeriodStats:
+    """Statistics of one period of the simulation.
+
+    Attributes:
+        period (int): Number of the period.
+        duration (float): Seconds from the step message until the last
+            acknowledgement (or the straggler timeout).
+        agents (int): Number of members that reported their step.
+        step_time (dict): p50, p95 and max of the step durations.
+        latency (dict): p50, p95 and max of the receive-to-step latencies.
+        stragglers (list of str): JIDs of the members that did not acknowledge
+            the step or were much slower than the others.
+    """
+
+    def __init__(
+        self,
+        period: int,
+        duration: float,
+        step_times: Dict[str, float],
+        latencies: Dict[str, float],
+        stragglers: List[str],
+    ):
+        self.period = period
+        self.duration = duration
+        self.agents = len(step_times)
+        self.step_time = distribution(step_times.values())
+        self.latency = distribution(latencies.values())
+        self.stragglers = stragglers
+
+    def as_dict(self) -> dict:
+        return {
+            "period": self.period,
+            "duration": self.duration,
+            "agents": self.agents,
+            "step_time": self.step_time,
+            "latency": self.latency,
+            "stragglers": self.stragglers,
+        }
+
+    def __str__(self):
+        text = f"Period {self.period}: {self.agents} agents in {self.duration:.3f}s"
+        for name, values in (("step", self.step_time), ("latency", self.latency)):
+            if values is not None:
+                text += (
+                    f", {name} p50 {values['p50']:.3f}s p95 {values['p95']:.3f}s"
+                    f" max {values['max']:.3f}s"
+                )
+        if self.stragglers:
+            text += f", {len(self.stragglers)} stragglers"
+        return text
+
+
+class StepTelemetry:
+    """History of the periods of a group and its repeat stragglers.
+
+    A member is a straggler in a period if it does not acknowledge the step or
+    if its step takes more than `straggler_factor` times the median, and more
+    than `min_straggler_time` seconds, so the jitter of very short steps is not
+    counted. Members that are stragglers in `repeat` periods are flagged, and
+    logged once.
+
+    Attributes:
+        history (deque of :obj:`PeriodStats`): Statistics of the last periods.
+        straggler_counts (Counter): Number of periods each member straggled.
+        repeat_stragglers (list of str): JIDs of the flagged members.
+    """
+
+    def __init__(
+        self,
+        max_history: Optional[int] = None,
+        straggler_factor: float = 3.0,
+        repeat: int = 3,
+        min_straggler_time: float = 0.1,
+    ):
+        """Inits the telemetry.
+
+        Args:
+            max_history: Number of periods kept. None keeps all.
+            straggler_factor: Step time, relative to the median, above which a
+                member is a straggler.
+            repeat: Number of periods after which a straggler is flagged.
+            min_straggler_time: Step time in seconds below which a member is
+                never a straggler.
+        """
+        self.history: Deque[PeriodStats] = deque(maxlen=max_history)
+        self.straggler_factor = straggler_factor
+        self.repeat = repeat
+        self.min_straggler_time = min_straggler_time
+        self.straggler_counts = Counter()
+        self.repeat_stragglers: List[str] = []
+
+    def record(self, samples: StepSamples) -> PeriodStats:
+        """Adds the statistics of a period to the history.
+
+        Args:
+            samples: Acknowledgements of the period.
+        """
+        step_times = samples.step_times
+        stragglers = {samples.members.get(nick, nick) for nick in samples.missing}
+        if step_times:
+            threshold = max(
+                self.min_straggler_time,
+                distribution(step_times.values())["p50"] * self.straggler_factor,
+            )
+            stragglers.update(
+                jid for jid, step_time in step_times.items() if step_time > threshold
+            )
+        for jid in stragglers:
+            self.straggler_counts[jid] += 1
+            if self.straggler_counts[jid] == self.repeat:
+                self.repeat_stragglers.append(jid)
+                logger.warning(f"{jid} straggled in {self.repeat} periods")
+        stats = PeriodStats(
+            samples.period,
+            time.monotonic() - samples.started,
+            step_times,
+            samples.latencies,
+            sorted(stragglers),
+        )
+        self.history.append(stats)
+        return stats
+
+    def query(
+        self, first: Optional[int] = None, last: Optional[int] = None
+    ) -> List[PeriodStats]:
+        """Statistics of the periods from `first` to `last`, both included."""
+        return [
+            stats
+            for stats in self.history
+            if (first is None or stats.period >= first)
+            and (last is None or stats.period <= last)
+        ]
@@ -1,4 +1,35 @@
-from .create_graph import CreateGraph
-from .join_community import JoinCommunity
-from .leave_community import LeaveCommunity
-from .search_community import SearchCommunity
+import importlib as _importlib
+
+_LAZY_ATTRIBUTES = {
+    "CreateGraph": ".create_graph",
+    "JoinCommunity": ".join_community",
+    "LeaveCommunity": ".leave_community",
+    "SearchCommunity": ".search_community",
+    "UpdateGraph": ".update_graph",
+}
+
+_LAZY_MODULES = (
+    "create_graph",
+    "join_community",
+    "leave_community",
+    "search_community",
+    "update_graph",
+)
+
+__all__ = [*_LAZY_ATTRIBUTES, *_LAZY_MODULES]
+
+
+def __getattr__(name: str):
+    if name in _LAZY_MODULES:
+        value = _importlib.import_module(f".{name}", __name__)
+    elif name in _LAZY_ATTRIBUTES:
+        module = _importlib.import_module(_LAZY_ATTRIBUTES[name], __name__)
+        value = getattr(module, name)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES) | set(_LAZY_MODULES))
@@ -1,5 +1,3 @@
-import json
-
 from peak import DF, Message
 from peak.core import OneShotBehaviour
 
@@ -18,11 +16,10 @@ class CreateGraph(OneShotBehaviour):
     async def run(self) -> None:
         msg = Message()
         msg.to = DF.name(self.agent.jid.domain)
-        msg.body = f"Create graph {self.id}"
         msg.metadata = {
             "resource": "graph",
             "action": "create",
             "id": self.id,
-            "graph": json.dumps(self.graph),
         }
+        msg.set_payload(self.graph)
         await self.send(msg)
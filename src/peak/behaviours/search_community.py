@@ -1,8 +1,8 @@
-import json
+import asyncio
 import logging
 from typing import Callable
 
-from peak import DF, Message, Template
+from peak import DF, Message
 from peak.core import OneShotBehaviour
 
 
@@ -18,21 +18,16 @@ class SearchCommunity(OneShotBehaviour):
         self.args = args
         self.kargs = kargs
 
-    async def on_start(self):
-        template = Template()
-        template.set_metadata("resource", "searchgroup")
-        self.set_template(template)
-
     async def run(self):
         msg = Message()
         msg.to = DF.name(self.agent.jid.domain)
         msg.set_metadata("resource", "searchgroup")
-        msg.set_metadata("tags", json.dumps(self.tags))
-        await self.send(msg)
-        res = await self.receive(60)
-        if res is None:
-            raise Exception("DF did not respond")
-        communities = json.loads(res.get_metadata("communities"))
+        msg.set_payload(self.tags)
+        try:
+            res = await self.request(msg, 60)
+        except asyncio.TimeoutError:
+            raise Exception("DF did not respond") from None
+        communities = res.payload
         logging.getLogger(self.__class__.__name__).debug(
             f"search: {str(self.tags)}, result: {str(communities)}"
         )
@@ -0,0 +1,33 @@
+from peak import DF, Message
+from peak.core import OneShotBehaviour
+
+
+class UpdateGraph(OneShotBehaviour):
+    """Adds points to the series of a graph in the dashboard.
+
+    The graph must have been created with :class:`CreateGraph`. Only the new
+    points are sent to the DF.
+    """
+
+    def __init__(self, id: str, points: dict):
+        """Inits the behaviour.
+
+        Args:
+            id: Identifier of the graph.
+            points: Maps the name of each series to the list of points to
+                append to it. Series that do not exist are created.
+        """
+        super().__init__()
+        self.id = id
+        self.points = points
+
+    async def run(self) -> None:
+        msg = Message()
+        msg.to = DF.name(self.agent.jid.domain)
+        msg.metadata = {
+            "resource": "graph",
+            "action": "update",
+            "id": self.id,
+        }
+        msg.set_payload(self.points)
+        await self.send(msg)
@@ -1,10 +1,12 @@
 import asyncio
 import importlib
 import logging
+import math
+import multiprocessing
 import os
+import statistics
 import sys
 import time
-from multiprocessing import Process
 from pathlib import Path
 from typing import List, Type
 
@@ -13,40 +15,532 @@ from aioxmpp import JID, node
 from peak import (
     configure_debug_mode,
     configure_multiple_agent_logging,
+    configure_shared_agents_logging,
+    configure_shared_debug_mode,
     configure_single_agent_logging,
+    set_agent_context,
 )
+from peak.rampup import ProcessRampUp, RampUp
+from peak.supervisor import Supervisor
 
 _logger = logging.getLogger(__name__)
 
+HOSTING_MODES = ("process", "shared", "pool")
+SHARDING_POLICIES = ("round-robin", "group", "clone")
+LAUNCHERS = ("fork", "spawn", "forkserver")
 
-def bootloader(agents: list[dict]):
-    if len(agents) == 1:
-        boot_single_agent(agents[0])
+
+def bootloader(
+    agents: list[dict],
+    hosting: str = "process",
+    workers: int = None,
+    sharding: str = "round-robin",
+    launcher: str = None,
+    max_connections: int = None,
+    connection_rate: float = None,
+    connection_retries: int = 0,
+    retry_backoff: float = 1.0,
+    restart: str = "never",
+    max_restarts: int = None,
+    restart_backoff: float = 1.0,
+    transport: str = "xmpp",
+    df_port: int = None,
+    record: str = None,
+):
+    """Boots the agents.
+
+    Args:
+        agents: Arguments of each agent (see :func:`boot_agent`).
+        hosting: How the agents are hosted. 'process' runs each agent in its own
+            process, 'shared' runs all the agents in the same process and event loop,
+            'pool' splits the agents across worker processes, each one hosting its
+            agents in the same event loop.
+        workers: Number of worker processes in 'pool' mode. Defaults to the number
+            of CPU cores.
+        sharding: How the agents are split across the workers in 'pool' mode
+            (see :func:`shard_agents`).
+        launcher: How the processes are started (see :func:`get_launcher`).
+            Defaults to the platform's default.
+        max_connections: Maximum number of agents connecting to the server at the
+            same time. No limit by default.
+        connection_rate: Maximum number of new connections per second. No limit
+            by default.
+        connection_retries: Number of retries when an agent fails to connect.
+        retry_backoff: Base delay in seconds between retries (see
+            :class:`peak.rampup.RampUp`).
+        restart: Restart policy of the processes, 'never', 'on-failure' or
+            'always' (see :class:`peak.supervisor.Supervisor`). Only the
+            'process' and 'pool' hosting modes of several agents with the
+            'xmpp' transport run the agents in processes that can be restarted.
+        max_restarts: Maximum number of restarts of each process. No limit by
+            default.
+        restart_backoff: Base delay in seconds before restarting a process.
+        transport: Transport used by the agents (see :mod:`peak.transport`).
+            'memory' hosts all the agents, and a Directory Facilitator for each
+            domain, in the same process.
+        df_port: Port of the REST API of the Directory Facilitators hosted with
+            the 'memory' transport. No REST API by default.
+        record: Path of a log where the messages received by the agents are
+            recorded (see :mod:`peak.recording`). Nothing is recorded by default.
+    """
+    from peak.transport import TRANSPORTS
+
+    if hosting not in HOSTING_MODES:
+        raise ValueError(
+            f"hosting mode must be one of {HOSTING_MODES}, not '{hosting}'"
+        )
+    if transport not in TRANSPORTS:
+        raise ValueError(f"transport must be one of {TRANSPORTS}, not '{transport}'")
+    if restart != "never" and (
+        transport == "memory" or len(agents) == 1 or hosting == "shared"
+    ):
+        raise ValueError(
+            "restart policies only apply to the agents' own processes, the agents "
+            "would run in the bootloader's process"
+        )
+    if record is not None:
+        agents = [agent | {"record": record} for agent in agents]
+    ramp = RampUp(max_connections, connection_rate, connection_retries, retry_backoff)
+    supervision = (restart, max_restarts, restart_backoff)
+    if transport == "memory":
+        if hosting != "shared":
+            _logger.warning(
+                f"the memory transport hosts all the agents in the same process, ignoring '{hosting}' hosting"
+            )
+        boot_shared_agents(agents, ramp, transport="memory", df_port=df_port)
+    elif len(agents) == 1:
+        boot_single_agent(agents[0], ramp)
+    elif hosting == "shared":
+        boot_shared_agents(agents, ramp)
+    elif hosting == "pool":
+        boot_agents_pool(
+            agents,
+            workers or os.cpu_count(),
+            sharding,
+            get_launcher(launcher, agents),
+            ramp,
+            *supervision,
+        )
     else:
-        boot_several_agents(agents)
+        boot_several_agents(agents, get_launcher(launcher, agents), ramp, *supervision)
+
+
+def get_launcher(
+    launcher: str, agents: list[dict]
+) -> multiprocessing.context.BaseContext:
+    """Gets the multiprocessing context used to start the processes.
+
+    The 'forkserver' launcher starts a template process that imports the framework
+    and the agents' modules once. Every process is then forked from the template,
+    sharing the imported modules (copy-on-write) instead of importing them again.
+    The template process does not inherit `sys.path`, so the folders of the
+    agents' modules are added to the `PYTHONPATH` it is started with.
+
+    Args:
+        launcher: Start method ('fork', 'spawn' or 'forkserver'). If None uses the
+            platform's default.
+        agents: Arguments of each agent. Used to preload the agents' modules.
 
+    Returns:
+        The multiprocessing context.
+    """
+    if launcher is not None and launcher not in LAUNCHERS:
+        raise ValueError(f"launcher must be one of {LAUNCHERS}, not '{launcher}'")
+    context = multiprocessing.get_context(launcher)
+    if context.get_start_method() == "forkserver":
+        # peak's public names are loaded lazily, the preload must name the
+        # modules that import SPADE and aioxmpp
+        modules = ["peak.core", "peak.bootloader"]
+        paths = []
+        for file in {agent["file"] for agent in agents}:
+            module_path, module_name = _module_location(file)
+            if module_path not in sys.path:
+                sys.path.append(module_path)
+            paths.append(module_path)
+            modules.append(module_name)
+        _extend_pythonpath(paths)
+        context.set_forkserver_preload(modules)
+        _logger.debug(f"forkserver preloading: {', '.join(modules)}")
+    return context
+
+
+class _ReportChannel:
+    """Channel through which the processes report back to the bootloader.
+
+    Each report is a tuple whose first item is the kind of report.
+    """
+
+    def __init__(self, context: multiprocessing.context.BaseContext):
+        self.reader, self._writer = context.Pipe(duplex=False)
+        self._lock = context.Lock()
+
+    def send(self, *report):
+        with self._lock:
+            self._writer.send(report)
 
-def boot_single_agent(agent: dict):
+    def recv(self) -> tuple:
+        return self.reader.recv()
+
+
+def boot_single_agent(agent: dict, ramp: RampUp = None):
     _logger.info(f"booting single agent: {agent['jid']}")
     # configure_single_agent_logging()
-    boot_agent(**agent, single_agent=True)
+    ramp = ramp or RampUp()
+    boot_agent(**agent, single_agent=True, ramp=ramp.for_processes(multiprocessing))
 
 
-def boot_several_agents(agents: list[dict]):
-    _logger.info(f"booting {len(agents)} agents (multiprocess)")
+def boot_several_agents(
+    agents: list[dict],
+    launcher: multiprocessing.context.BaseContext = multiprocessing,
+    ramp: RampUp = None,
+    restart: str = "never",
+    max_restarts: int = None,
+    restart_backoff: float = 1.0,
+):
+    _logger.info(
+        f"booting {len(agents)} agents (multiprocess, {launcher.get_start_method()})"
+    )
     # configure_multiple_agent_logging()
-    procs: List[Process] = []
-    for i, agent in enumerate(agents):
-        proc = Process(
-            target=boot_agent,
-            kwargs=agent,
-            daemon=False,
-            name=agents[i]["jid"].localpart,
+    reports = _ReportChannel(launcher)
+    boot_report = _BootReport(
+        [agent["jid"].localpart for agent in agents], launcher.get_start_method()
+    )
+    supervisor = Supervisor(
+        launcher,
+        restart,
+        max_restarts,
+        restart_backoff,
+        reports=reports,
+        on_report=boot_report.report,
+        on_exit=boot_report.process_ended,
+    )
+    shared_ramp = (ramp or RampUp()).for_processes(launcher)
+    for agent in agents:
+        supervisor.start(
+            agent["jid"].localpart,
+            boot_agent,
+            kwargs=agent | {"reports": reports, "ramp": shared_ramp},
         )
-        proc.start()
-        procs.append(proc)
     _logger.info(f"all {len(agents)} processes created")
-    asyncio.run(_wait_for_processes(procs))
+    supervisor.run()
+
+
+def boot_agents_pool(
+    agents: list[dict],
+    workers: int,
+    sharding: str,
+    launcher: multiprocessing.context.BaseContext = multiprocessing,
+    ramp: RampUp = None,
+    restart: str = "never",
+    max_restarts: int = None,
+    restart_backoff: float = 1.0,
+):
+    """Boots several agents split across worker processes.
+
+    Each worker hosts its share of the agents in the same event loop
+    (see :func:`boot_shared_agents`).
+
+    Args:
+        agents: Arguments of each agent (see :func:`boot_agent`).
+        workers: Maximum number of worker processes.
+        sharding: Sharding policy (see :func:`shard_agents`).
+        launcher: Multiprocessing context used to start the workers.
+        ramp: Connection limits, split evenly between the workers.
+        restart: Restart policy of the workers (see :class:`peak.supervisor.Supervisor`).
+        max_restarts: Maximum number of restarts of each worker.
+        restart_backoff: Base delay in seconds before restarting a worker.
+    """
+    shards = shard_agents(agents, workers, sharding)
+    _logger.info(
+        f"booting {len(agents)} agents ({len(shards)} workers, {sharding} sharding, {launcher.get_start_method()})"
+    )
+    reports = _ReportChannel(launcher)
+    boot_report = _BootReport(
+        [f"worker{i}" for i in range(len(shards))], launcher.get_start_method()
+    )
+    supervisor = Supervisor(
+        launcher,
+        restart,
+        max_restarts,
+        restart_backoff,
+        reports=reports,
+        on_report=boot_report.report,
+        on_exit=boot_report.process_ended,
+    )
+    worker_ramp = (ramp or RampUp()).split(len(shards))
+    for i, shard in enumerate(shards):
+        supervisor.start(
+            f"worker{i}",
+            boot_shared_agents,
+            args=(shard, worker_ramp),
+            kwargs={"reports": reports},
+        )
+        _logger.debug(
+            f"worker{i} hosting: {', '.join(a['jid'].localpart for a in shard)}"
+        )
+    _logger.info(f"all {len(shards)} workers created")
+    supervisor.run()
+
+
+class _BootReport:
+    """Collects the reports sent by the processes while their agents boot.
+
+    Once the agents of every process are online (or the process ended), logs the
+    startup time of the processes, from their launch until their agents are
+    instantiated, and the time until each agent was online.
+    """
+
+    def __init__(self, processes: List[str], launcher: str):
+        self.pending = set(processes)
+        self.launcher = launcher
+        self.startup_times = {}
+        self.online_times = {}
+
+    def report(self, kind: str, name: str, *values):
+        if kind == "startup":
+            self.startup_times[name] = values[0]
+            _logger.debug(f"{name}'s process started in {values[0]:.3f}s")
+        elif kind == "online":
+            self.online_times[name] = tuple(values)
+            if not self.pending:
+                _logger.info(f"agent {name} online again after {values[0]:.3f}s")
+        elif kind == "ready":
+            self._ready(name)
+
+    def process_ended(self, name: str, exitcode: int):
+        self._ready(name)
+
+    def _ready(self, name: str):
+        if name not in self.pending:
+            return
+        self.pending.remove(name)
+        if self.pending:
+            return
+        if self.startup_times:
+            times = self.startup_times.values()
+            _logger.info(
+                f"startup time of {len(self.startup_times)} processes ({self.launcher}): "
+                f"mean {statistics.mean(times):.3f}s, max {max(times):.3f}s"
+            )
+        _log_online_times(self.online_times)
+
+
+def _log_online_times(online_times: dict[str, tuple[float, int]]):
+    """Logs the distribution of the time each agent took to be online.
+
+    Args:
+        online_times: Seconds until online and number of attempts of each agent.
+    """
+    if not online_times:
+        return
+    times = sorted(seconds for seconds, _ in online_times.values())
+    slowest = sorted(online_times, key=lambda name: online_times[name][0])[-3:]
+    retries = sum(attempts - 1 for _, attempts in online_times.values())
+    _logger.info(
+        f"{len(times)} agents online: "
+        f"p50 {times[int(0.50 * (len(times) - 1))]:.3f}s, "
+        f"p95 {times[int(0.95 * (len(times) - 1))]:.3f}s, "
+        f"max {times[-1]:.3f}s, {retries} retries "
+        f"(slowest: {', '.join(reversed(slowest))})"
+    )
+
+
+def shard_agents(agents: list[dict], workers: int, policy: str) -> list[list[dict]]:
+    """Splits the agents in groups, one for each worker.
+
+    Policies:
+        'round-robin': the agents are dealt one by one to each worker.
+        'group': agents of the same group (the same entry in the YAML file,
+            including its clones) are kept in the same worker. The groups are
+            balanced by their number of agents.
+        'clone': each worker gets a contiguous range of clone IDs.
+
+    Args:
+        agents: Arguments of each agent (see :func:`boot_agent`).
+        workers: Maximum number of workers.
+        policy: Sharding policy.
+
+    Returns:
+        List of non-empty groups of agents.
+    """
+    if workers < 1:
+        raise ValueError(f"number of workers must be positive, not {workers}")
+    workers = min(workers, len(agents))
+    shards = [[] for _ in range(workers)]
+    if policy == "round-robin":
+        for i, agent in enumerate(agents):
+            shards[i % workers].append(agent)
+    elif policy == "group":
+        groups = {}
+        for agent in agents:
+            groups.setdefault(agent.get("group", agent["jid"].localpart), []).append(
+                agent
+            )
+        for group in sorted(groups.values(), key=len, reverse=True):
+            min(shards, key=len).extend(group)
+    elif policy == "clone":
+        range_size = math.ceil((max(agent["cid"] for agent in agents) + 1) / workers)
+        for agent in agents:
+            shards[agent["cid"] // range_size].append(agent)
+    else:
+        raise ValueError(
+            f"sharding policy must be one of {SHARDING_POLICIES}, not '{policy}'"
+        )
+    return [shard for shard in shards if shard]
+
+
+def boot_shared_agents(
+    agents: list[dict],
+    ramp: RampUp = None,
+    launched_at: float = None,
+    reports: _ReportChannel = None,
+    transport: str = "xmpp",
+    df_port: int = None,
+    *args,
+    **kargs,
+):
+    """Boots several agents in the current process.
+
+    All the agents run in the same event loop. Each agent still logs to its own
+    log file.
+
+    Args:
+        agents: Arguments of each agent (see :func:`boot_agent`).
+        ramp: Connection limits of the agents.
+        launched_at: Time at which the process was launched, if it is a worker.
+        reports: Channel to report to the bootloader, if it is a worker.
+        transport: Transport used by the agents. With the 'memory' transport a
+            Directory Facilitator is also hosted for each domain of the agents.
+        df_port: Port of the REST API of the hosted Directory Facilitators.
+    """
+    _logger.info(f"booting {len(agents)} agents (shared event loop)")
+    ports = {agent["port"] for agent in agents}
+    if len(ports) > 1:
+        raise ValueError(
+            f"agents hosted in the same process must use the same port, not {ports}"
+        )
+    router = configure_shared_agents_logging(
+        min(logging.getLevelName(agent["log_level"]) for agent in agents)
+    )
+    debug_router = None
+    debug_agents = [agent for agent in agents if agent["debug_mode"]]
+    if debug_agents:
+        debug_router = configure_shared_debug_mode(
+            min(logging.getLevelName(agent["log_level"]) for agent in debug_agents)
+        )
+    node.discover_connectors = _change_discover_connectors_port(
+        node.discover_connectors, ports.pop()
+    )
+
+    instances = []
+    for agent in agents:
+        jid: JID = agent["jid"]
+        log_file = _log_file(jid, agent["log_folder"])
+        router.add_agent(str(jid), agent["log_level"], log_file, agent["log_file_mode"])
+        if agent["debug_mode"]:
+            debug_router.add_agent(
+                str(jid), agent["log_level"], log_file, agent["log_file_mode"]
+            )
+        _logger.debug(f"instanciating agent {jid.localpart} from file {agent['file']}")
+        agent_class = _get_class(agent["file"])
+        instance = agent_class(jid, agent["cid"], agent["verify_security"])
+        if agent.get("record") is not None:
+            from peak.recording import get_recorder
+
+            instance.recorder = get_recorder(agent["record"])
+        instances.append(instance)
+    services = []
+    if transport != "xmpp":
+        from peak import DF
+        from peak.transport import get_transport
+
+        hosted = {str(instance.jid) for instance in instances}
+        for domain in sorted({agent["jid"].domain for agent in agents}):
+            if DF.name(domain) not in hosted:
+                services.append(DF(domain, False, df_port))
+        for instance in instances + services:
+            instance.transport = get_transport(transport)
+    if reports is not None:
+        reports.send(
+            "startup", multiprocessing.current_process().name, time.time() - launched_at
+        )
+
+    loop = instances[0].loop
+    future = asyncio.run_coroutine_threadsafe(
+        _host_agents(instances, ramp or RampUp(), reports, services), loop
+    )
+    try:
+        future.result()
+    except KeyboardInterrupt:
+        _logger.info("stopping agents (KeyboardInterrupt)")
+        asyncio.run_coroutine_threadsafe(
+            _stop_agents(instances + services), loop
+        ).result()
+    _logger.info(f"all {len(agents)} agents terminated")
+
+
+async def _host_agents(
+    agents: list, ramp: RampUp, reports: _ReportChannel = None, services: list = ()
+):
+    """Runs the agents until all of them stop.
+
+    The services (e.g. a Directory Facilitator) are started before the agents
+    and stopped after them.
+    """
+    for service in services:
+        await service.start(auto_register=False)
+        _logger.info(f"{service.jid} hosted in this process")
+    loop = asyncio.get_running_loop()
+    online = [loop.create_future() for _ in agents]
+    hosts = [
+        asyncio.ensure_future(_host_agent(agent, ramp, agent_online))
+        for agent, agent_online in zip(agents, online)
+    ]
+    online_times = {}
+    for agent, agent_online in zip(agents, online):
+        online_time = await agent_online
+        if online_time is not None:
+            online_times[agent.jid.localpart] = online_time
+            if reports is not None:
+                reports.send("online", agent.jid.localpart, *online_time)
+    if reports is not None:
+        reports.send("ready", multiprocessing.current_process().name)
+    else:
+        _log_online_times(online_times)
+    await asyncio.gather(*hosts)
+    await _stop_agents(services)
+
+
+async def _host_agent(agent, ramp: RampUp, online: asyncio.Future):
+    """Runs an agent in its own logging context until it stops.
+
+    Sets the result of `online` with the time until the agent was online and
+    the number of attempts, or None if it failed to start.
+    """
+    set_agent_context(str(agent.jid))
+    name = agent.jid.localpart
+    try:
+        _logger.info(f"starting agent {name}")
+        seconds, attempts = await ramp.start(agent)
+        _logger.info(f"agent {name} online after {seconds:.3f}s ({attempts} attempts)")
+        online.set_result((seconds, attempts))
+        await agent.wait_stopped()
+        _logger.info(f"agent {name} terminated")
+    except Exception as error:
+        _logger.critical(
+            f"agent {name} terminated ({error.__class__.__name__}: {error})",
+            exc_info=True,
+        )
+        if not online.done():
+            online.set_result(None)
+        await agent.stop()
+
+
+async def _stop_agents(agents: list):
+    await asyncio.gather(
+        *[agent.stop() for agent in agents if agent.is_alive()],
+        return_exceptions=True,
+    )
 
 
 def boot_agent(
@@ -60,6 +554,10 @@ def boot_agent(
     debug_mode: bool,
     port: int,
     single_agent: bool = False,
+    launched_at: float = None,
+    reports: _ReportChannel = None,
+    ramp: ProcessRampUp = None,
+    record: str = None,
     *args,
     **kargs,
 ):
@@ -71,13 +569,14 @@ def boot_agent(
         name: The name of the agent.
         cid: Clone ID, zero if its the original.
         verify_security: If true it validates the SSL certificates.
+        launched_at: Time at which the agent's process was launched.
+        reports: Channel to report to the bootloader.
+        ramp: Connection limits shared by the agents' processes.
+        record: Path of the log where the messages received by the agent are
+            recorded.
     """
     try:
-        log_file_name: str = jid.localpart + (
-            f"_{jid.resource}" if jid.resource else ""
-        )
-        log_file = log_folder.joinpath(f"{log_file_name}.log")
-        os.makedirs(log_folder, exist_ok=True)
+        log_file = _log_file(jid, log_folder)
         if single_agent:
             configure_single_agent_logging(log_level, log_file, log_file_mode)
         else:
@@ -91,10 +590,27 @@ def boot_agent(
         )
         agent_class = _get_class(file)
         agent_instance = agent_class(jid, cid, verify_security)
+        if record is not None:
+            from peak.recording import get_recorder
+
+            agent_instance.recorder = get_recorder(record)
+        if reports is not None:
+            reports.send(
+                "startup",
+                multiprocessing.current_process().name,
+                time.time() - launched_at,
+            )
         _logger.info(f"starting agent {jid.localpart}")
-        agent_instance.start().result()
-        while agent_instance.is_alive():
-            time.sleep(1)
+        if ramp is None:
+            ramp = RampUp().for_processes(multiprocessing)
+        seconds, attempts = ramp.start(agent_instance)
+        _logger.info(
+            f"agent {jid.localpart} online after {seconds:.3f}s ({attempts} attempts)"
+        )
+        if reports is not None:
+            reports.send("online", jid.localpart, seconds, attempts)
+            reports.send("ready", multiprocessing.current_process().name)
+        agent_instance.join()
         _logger.info(f"agent {jid.localpart} terminated")
     # except Exception as error:
     #    _logger.critical(f"agent {jid.localpart} terminated ({error.__class__.__name__}: {error})", exc_info=True)
@@ -103,6 +619,13 @@ def boot_agent(
         _logger.info(f"agent {jid.localpart} terminated (KeyboardInterrupt)")
 
 
+def _log_file(jid: JID, log_folder: Path) -> Path:
+    """Path of the agent's log file. Creates the logs folder if needed."""
+    log_file_name: str = jid.localpart + (f"_{jid.resource}" if jid.resource else "")
+    os.makedirs(log_folder, exist_ok=True)
+    return log_folder.joinpath(f"{log_file_name}.log")
+
+
 def _get_class(file: Path) -> Type:
     """Gets class from a file.
 
@@ -120,24 +643,27 @@ def _get_class(file: Path) -> Type:
         raise FileNotFoundError(
             f"cannot instatiate agent from a non-existing file ({file})"
         )
-    module_path, module_file = os.path.split(file.absolute())
-    module_name = module_file.split(".")[0]
-    sys.path.append(module_path)
+    module_path, module_name = _module_location(file)
+    if module_path not in sys.path:
+        sys.path.append(module_path)
     module = importlib.import_module(module_name)
     return getattr(module, module_name)
 
 
-async def _wait_for_processes(processes):
-    def join_process(process):
-        process.join()
-        if process.exitcode != 0:
-            _logger.error(
-                f"{process.name}'s process ended with exitcode {process.exitcode}."
-            )
+def _extend_pythonpath(paths: list[str]):
+    """Adds folders to the `PYTHONPATH` of the processes started from now on."""
+    current = [
+        path for path in os.environ.get("PYTHONPATH", "").split(os.pathsep) if path
+    ]
+    missing = [path for path in dict.fromkeys(paths) if path not in current]
+    if missing:
+        os.environ["PYTHONPATH"] = os.pathsep.join(current + missing)
 
-    await asyncio.gather(
-        *[asyncio.to_thread(join_process, process) for process in processes]
-    )
+
+def _module_location(file: Path) -> tuple[str, str]:
+    """Folder and name of the agent's module."""
+    module_path, module_file = os.path.split(file.absolute())
+    return module_path, module_file.split(".")[0]
 
 
 def _change_discover_connectors_port(original_function, new_port):
@@ -1,5 +1,3 @@
-from time import sleep
-
 from peak import DF, getMainLogger
 
 
@@ -20,8 +18,7 @@ def exec(domain: str, verify_security: bool, port: int, *args, **kargs):
     logger.info("DF running")
 
     try:
-        while df.is_alive():
-            sleep(10)
+        df.join()
     except KeyboardInterrupt:
-        df.stop()
+        df.stop().result()
     logger.info("Stoped DF")
@@ -0,0 +1,49 @@
+import asyncio
+import logging
+from pathlib import Path
+from typing import List
+
+from peak import JID
+from peak.agents.synchronizer.telemetry import distribution
+from peak.bootloader import _get_class
+from peak.recording import Replayer
+
+_logger = logging.getLogger(__name__)
+
+
+def replay_agents(
+    log: Path,
+    file: Path,
+    jid: List[JID],
+    cid: List[int] = None,
+    speed: float = None,
+    log_level: str = "INFO",
+    *args,
+    **kargs,
+):
+    """Replays the messages received by agents in a recorded run.
+
+    Args:
+        log: Log of the recorded run (see :mod:`peak.recording`).
+        file: Path to the agents' python file.
+        jid: JIDs of the agents in the recorded run.
+        cid: Clone IDs of the agents. Defaults to 0.
+        speed: Speed of the replay relative to the recorded run. As fast as
+            possible by default.
+        log_level: Logging level.
+    """
+    logging.getLogger("peak").setLevel(log_level)
+    cid = cid or [0] * len(jid)
+    if len(cid) != len(jid):
+        raise ValueError(f"expected {len(jid)} clone IDs, not {len(cid)}")
+    agent_class = _get_class(file)
+    agents = [
+        agent_class(agent_jid, agent_cid) for agent_jid, agent_cid in zip(jid, cid)
+    ]
+    replayer = Replayer(str(log), speed)
+    asyncio.run_coroutine_threadsafe(replayer.replay(agents), agents[0].loop).result()
+    step_time = distribution(replayer.step_times())
+    if step_time is not None:
+        _logger.info(
+            f"step p50 {step_time['p50']:.6f}s p95 {step_time['p95']:.6f}s max {step_time['max']:.6f}s"
+        )
@@ -15,6 +15,20 @@ def execute_agent(
     debug_mode: bool = False,
     port: int = 5222,
     verify_security: bool = False,
+    hosting: str = "process",
+    workers: int = None,
+    sharding: str = "round-robin",
+    launcher: str = None,
+    max_connections: int = None,
+    connection_rate: float = None,
+    connection_retries: int = 0,
+    retry_backoff: float = 1.0,
+    restart: str = "never",
+    max_restarts: int = None,
+    restart_backoff: float = 1.0,
+    transport: str = "xmpp",
+    df_port: int = None,
+    record: str = None,
     *args,
     **kargs,
 ):
@@ -26,6 +40,21 @@ def execute_agent(
         clones: Number of clones to be made.
         log_level: Logging level.
         verify_security: Verifies the SSL certificates.
+        hosting: Hosting mode of the clones (see :func:`peak.bootloader.bootloader`).
+        workers: Number of worker processes in pool mode.
+        sharding: Sharding policy in pool mode.
+        launcher: How the processes are started.
+        max_connections: Maximum number of clones connecting at the same time.
+        connection_rate: Maximum number of new connections per second.
+        connection_retries: Number of retries when a clone fails to connect.
+        retry_backoff: Base delay in seconds between retries.
+        restart: Restart policy of the agents' processes.
+        max_restarts: Maximum number of restarts of each process.
+        restart_backoff: Base delay in seconds before restarting a process.
+        transport: Transport used by the clones, 'xmpp' or 'memory'.
+        df_port: REST API port of the Directory Facilitator hosted with the
+            'memory' transport.
+        record: Log where the messages received by the clones are recorded.
     """
     # TODO: verify at argsparser level
     if file and not file.is_file():
@@ -41,6 +70,7 @@ def execute_agent(
         "debug_mode": debug_mode,
         "port": port,
         "verify_security": verify_security,
+        "group": jid.localpart,
     }
 
     name = jid.localpart
@@ -50,4 +80,20 @@ def execute_agent(
         agents.append(agent)
         kwargs["jid"] = kwargs["jid"].replace(localpart=f"{name}{cid}")
         kwargs["cid"] = cid
-    bootloader(agents)
+    bootloader(
+        agents,
+        hosting=hosting,
+        workers=workers,
+        sharding=sharding,
+        launcher=launcher,
+        max_connections=max_connections,
+        connection_rate=connection_rate,
+        connection_retries=connection_retries,
+        retry_backoff=retry_backoff,
+        restart=restart,
+        max_restarts=max_restarts,
+        restart_backoff=restart_backoff,
+        transport=transport,
+        df_port=df_port,
+        record=record,
+    )
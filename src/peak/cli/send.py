@@ -1,5 +1,3 @@
-from time import sleep
-
 from peak import JID, DummyAgent, Message
 
 
@@ -14,5 +12,4 @@ def send_message(
     print(to, sender, body, msg.sender, type(msg.sender))
     da = DummyAgent(jid=msg.sender, message=msg)
     da.start().result()
-    while da.is_alive():
-        sleep(0.5)
+    da.join()
@@ -13,6 +13,10 @@ _logger = logging.getLogger(__name__)
 def execute_config_file(file: Path, *args, **kargs):
     """Executes agents using a YAML configuration file.
 
+    Bootloader options given as keyword arguments (from the command line) override
+    the ones in the 'bootloader' section of the YAML file. See
+    :func:`peak.bootloader.bootloader` for the list of options.
+
     Args:
         file: Path to the agent's python file.
     """
@@ -31,6 +35,22 @@ def execute_config_file(file: Path, *args, **kargs):
         "clones": 1,
         "verify_security": False,
     }
+    options = {
+        "hosting": "process",
+        "workers": None,
+        "sharding": "round-robin",
+        "launcher": None,
+        "max_connections": None,
+        "connection_rate": None,
+        "connection_retries": 0,
+        "retry_backoff": 1.0,
+        "restart": "never",
+        "max_restarts": None,
+        "restart_backoff": 1.0,
+        "transport": "xmpp",
+        "df_port": None,
+        "record": None,
+    }
     agents = []
 
     with file.open() as f:
@@ -41,6 +61,16 @@ def execute_config_file(file: Path, *args, **kargs):
 
     if "defaults" in yml:
         defaults = defaults | yml["defaults"]
+    if "bootloader" in yml:
+        for option in yml["bootloader"]:
+            if option not in options:
+                raise Exception(f"YAML: unknown bootloader option '{option}'")
+        options = options | yml["bootloader"]
+    options = options | {
+        option: value
+        for option, value in kargs.items()
+        if option in options and value is not None
+    }
     if "agents" not in yml:
         raise Exception("YAML: 'agents' argument required")
     for agent_name, agent_args in yml["agents"].items():
@@ -62,6 +92,7 @@ def execute_config_file(file: Path, *args, **kargs):
             "verify_security": agent_args["ssl"],
             "debug_mode": agent_args["debug_mode"],
             "port": agent_args["port"],
+            "group": agent_name,
         }
         if agent_args["clones"] > 1:
             for cid in range(agent_args["clones"]):
@@ -73,4 +104,4 @@ def execute_config_file(file: Path, *args, **kargs):
             agents.append(kwargs)
 
     _logger.info("YAML configuration file parsed")
-    bootloader(agents)
+    bootloader(agents, **options)
@@ -0,0 +1,129 @@
+"""Codecs of the payloads carried in the messages' body.
+
+A codec turns a Python object into the text of the message body and back. The
+name of the codec travels in the 'peak:codec' metadata field, so the receiver knows
+how to decode the payload (see :meth:`peak.Message.set_payload`). XMPP bodies
+are text, so binary codecs encode their output in base64.
+
+New codecs can be added with :func:`register_codec`.
+"""
+
+import base64
+import json
+from abc import ABC, abstractmethod
+from typing import Any, Dict
+
+CODEC_METADATA = "peak:codec"
+
+
+class Codec(ABC):
+    """Base class of the codecs.
+
+    Attributes:
+        name (str): Name of the codec, sent in the 'peak:codec' metadata field.
+    """
+
+    name: str
+
+    @abstractmethod
+    def encode(self, payload: Any) -> str:
+        """Encodes the payload as the text of a message body."""
+
+    @abstractmethod
+    def decode(self, body: str) -> Any:
+        """Decodes the payload from the text of a message body."""
+
+
+class JSONCodec(Codec):
+    """Encodes the payload in compact JSON."""
+
+    name = "json"
+
+    def encode(self, payload: Any) -> str:
+        return json.dumps(payload, separators=(",", ":"))
+
+    def decode(self, body: str) -> Any:
+        return json.loads(body)
+
+
+class MsgpackCodec(Codec):
+    """Encodes the payload in MessagePack.
+
+    Requires the `msgpack` package (`pip install peak-mas[codecs]`).
+    """
+
+    name = "msgpack"
+
+    def encode(self, payload: Any) -> str:
+        import msgpack
+
+        return base64.b64encode(msgpack.packb(payload)).decode("ascii")
+
+    def decode(self, body: str) -> Any:
+        import msgpack
+
+        return msgpack.unpackb(base64.b64decode(body))
+
+
+class NumpyCodec(Codec):
+    """Encodes a NumPy array as its raw buffer.
+
+    The body is framed as `<dtype>;<shape>;<base64 buffer>`, e.g.
+    `<f8;2,3;AAAA...`. The decoded array is read-only, as it shares the memory
+    of the decoded buffer.
+
+    Requires the `numpy` package.
+    """
+
+    name = "numpy"
+
+    def encode(self, payload) -> str:
+        import numpy
+
+        array = numpy.asarray(payload)
+        if not array.flags.c_contiguous:
+            array = array.copy(order="C")
+        shape = ",".join(str(size) for size in array.shape)
+        buffer = base64.b64encode(array.reshape(-1).data).decode("ascii")
+        return f"{array.dtype.str};{shape};{buffer}"
+
+    def decode(self, body: str):
+        import numpy
+
+        dtype, shape, buffer = body.split(";", 2)
+        array = numpy.frombuffer(base64.b64decode(buffer), dtype=dtype)
+        return array.reshape(tuple(int(size) for size in shape.split(",") if size))
+
+
+_codecs: Dict[str, Codec] = {}
+
+
+def register_codec(codec: Codec):
+    """Registers a codec, replacing any codec with the same name.
+
+    Args:
+        codec: Codec to register.
+    """
+    _codecs[codec.name] = codec
+
+
+def get_codec(name: str) -> Codec:
+    """Gets a registered codec.
+
+    Args:
+        name: Name of the codec.
+
+    Raises:
+        ValueError: If there is no codec with that name.
+    """
+    try:
+        return _codecs[name]
+    except KeyError:
+        raise ValueError(
+            f"codec must be one of {tuple(_codecs)}, not '{name}'"
+        ) from None
+
+
+register_codec(JSONCodec())
+register_codec(MsgpackCodec())
+register_codec(NumpyCodec())
@@ -0,0 +1,165 @@
+"""Compression of the body and metadata of the messages.
+
+Compression is disabled by default. Once enabled with :func:`enable_compression`,
+the body and the metadata values larger than the threshold are compressed when
+the messages are sent to another process. The compressed fields are listed in the
+message metadata, so the receivers decompress them automatically whether or not
+they enabled compression.
+"""
+
+import base64
+import bz2
+import lzma
+import time
+import zlib
+from typing import Dict, Optional, Tuple
+
+COMPRESSION_METADATA = "peak:compression"
+COMPRESSED_METADATA = "peak:compressed"
+BODY_FIELD = "_body"
+
+ALGORITHMS = {
+    "zlib": (zlib.compress, zlib.decompress),
+    "bz2": (bz2.compress, bz2.decompress),
+    "lzma": (lambda data, level: lzma.compress(data, preset=level), lzma.decompress),
+}
+
+_DEFAULT_LEVELS = {"zlib": 6, "bz2": 9, "lzma": 6}
+
+
+class Compressor:
+    """Compresses the fields of the messages above a size threshold.
+
+    A field is only sent compressed if that makes it smaller.
+
+    Attributes:
+        algorithm (str): 'zlib', 'bz2' or 'lzma'.
+        threshold (int): Minimum size in characters of the fields to compress.
+        level (int): Compression level.
+        fields_compressed (int): Number of fields sent compressed.
+        bytes_in (int): Size of the compressed fields before compression.
+        bytes_out (int): Size of the compressed fields after compression.
+        compress_time (float): CPU seconds spent compressing.
+        decompress_time (float): CPU seconds spent decompressing.
+    """
+
+    def __init__(self, algorithm: str = "zlib", threshold: int = 1024, level=None):
+        if algorithm not in ALGORITHMS:
+            raise ValueError(
+                f"compression algorithm must be one of {tuple(ALGORITHMS)}, not '{algorithm}'"
+            )
+        self.algorithm = algorithm
+        self.threshold = threshold
+        self.level = _DEFAULT_LEVELS[algorithm] if level is None else level
+        self.fields_compressed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.compress_time = 0.0
+        self.decompress_time = 0.0
+
+    @property
+    def bytes_saved(self) -> int:
+        """Bytes saved by the compressed fields."""
+        return self.bytes_in - self.bytes_out
+
+    def compress(
+        self, body: Optional[str], metadata: Dict[str, str]
+    ) -> Tuple[Optional[str], Dict[str, str]]:
+        """Compresses the body and the metadata values above the threshold.
+
+        Args:
+            body: Body of the message.
+            metadata: Metadata of the message. It is not modified.
+
+        Returns:
+            The body and metadata to send.
+        """
+        compressed = []
+        if body is not None and len(body) >= self.threshold:
+            data = self._compress(body)
+            if data is not None:
+                body = data
+                compressed.append(BODY_FIELD)
+        large = [
+            name for name, value in metadata.items() if len(value) >= self.threshold
+        ]
+        if large:
+            metadata = dict(metadata)
+            for name in large:
+                data = self._compress(metadata[name])
+                if data is not None:
+                    metadata[name] = data
+                    compressed.append(name)
+        if compressed:
+            if not large:
+                metadata = dict(metadata)
+            metadata[COMPRESSION_METADATA] = self.algorithm
+            metadata[COMPRESSED_METADATA] = ",".join(compressed)
+        return body, metadata
+
+    def _compress(self, text: str) -> Optional[str]:
+        started = time.process_time()
+        data = text.encode()
+        compressed = base64.b64encode(
+            ALGORITHMS[self.algorithm][0](data, self.level)
+        ).decode("ascii")
+        self.compress_time += time.process_time() - started
+        if len(compressed) >= len(data):
+            return None
+        self.fields_compressed += 1
+        self.bytes_in += len(data)
+        self.bytes_out += len(compressed)
+        return compressed
+
+
+_compressor: Optional[Compressor] = None
+
+
+def enable_compression(
+    algorithm: str = "zlib", threshold: int = 1024, level: int = None
+) -> Compressor:
+    """Compresses the messages sent by the agents of this process.
+
+    Args:
+        algorithm: 'zlib', 'bz2' or 'lzma'.
+        threshold: Minimum size in characters of the fields to compress.
+        level: Compression level. Defaults to the algorithm's default level.
+
+    Returns:
+        The compressor, with the compression counters.
+    """
+    global _compressor
+    _compressor = Compressor(algorithm, threshold, level)
+    return _compressor
+
+
+def disable_compression():
+    """Stops compressing the messages sent by the agents of this process."""
+    global _compressor
+    _compressor = None
+
+
+def get_compressor() -> Optional[Compressor]:
+    """The compressor of this process, or None if compression is disabled."""
+    return _compressor
+
+
+def decompress(msg):
+    """Decompresses the fields of a received message in place.
+
+    Args:
+        msg: Message with the compression metadata field.
+    """
+    started = time.process_time()
+    algorithm = msg.metadata.pop(COMPRESSION_METADATA)
+    fields = msg.metadata.pop(COMPRESSED_METADATA, "")
+    _, decompress_function = ALGORITHMS[algorithm]
+    for name in fields.split(","):
+        if name == BODY_FIELD:
+            msg.body = decompress_function(base64.b64decode(msg.body)).decode()
+        elif name:
+            msg.metadata[name] = decompress_function(
+                base64.b64decode(msg.metadata[name])
+            ).decode()
+    if _compressor is not None:
+        _compressor.decompress_time += time.process_time() - started
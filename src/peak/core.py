@@ -1,11 +1,31 @@
 import asyncio
+import logging
+import threading
+import time
 from abc import ABCMeta as _ABCMeta
-from typing import Dict, List, Optional
+from abc import abstractmethod
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Union
 
 import aioxmpp as _aioxmpp
 import spade as _spade
 from aioxmpp import JID
-from aioxmpp.callbacks import first_signal
+
+from peak import executors
+from peak.logging import agent_context, getLogger
+from peak.mailbox import ERROR_METADATA, MAILBOX_FULL, OVERFLOW_POLICIES, Mailbox
+from peak.message import ENVELOPE_METADATA, Message, unpack_envelope
+from peak.outbox import Outbox
+from peak.rpc import REPLY_METADATA, REQUEST_METADATA, PendingRequests
+from peak.streaming import (
+    STREAM_METADATA,
+    IncomingStream,
+    OutgoingStream,
+    StreamManager,
+)
+from peak.template import TemplateIndex
+from peak.transport import Transport, get_transport
+
+logger = getLogger(__name__)
 
 
 class Agent(_spade.agent.Agent):
@@ -14,6 +34,11 @@ class Agent(_spade.agent.Agent):
     Attributes:
         communities (dict of :obj:`Room`): Dictionary of the communities joined.
         cid (int): Clone ID.
+        outbox (:obj:`Outbox`): Coalesces the outgoing messages, if enabled.
+        transport (:obj:`Transport`): Transport used to exchange messages (see
+            :mod:`peak.transport`). Must be set before the agent starts.
+        recorder (:obj:`Recorder`): Records the messages received by the agent,
+            if set (see :mod:`peak.recording`).
     """
 
     def __init__(self, jid: JID, cid: int = 0, verify_security: bool = False):
@@ -28,6 +53,14 @@ class Agent(_spade.agent.Agent):
         self.communities: Dict[str, _aioxmpp.muc.Room] = dict()
         self.cid = cid
         self._muc_client = None
+        self._stop_waiters: List[asyncio.Future] = []
+        self._stopped = threading.Event()
+        self.outbox: Optional[Outbox] = None
+        self.streams = StreamManager()
+        self.pending_requests = PendingRequests()
+        self._template_index: Optional[TemplateIndex] = None
+        self.transport: Transport = get_transport()
+        self.recorder = None
 
     async def _hook_plugin_after_connection(self):
         """Executed after SPADE Agent's connection.
@@ -49,6 +82,155 @@ class Agent(_spade.agent.Agent):
             self._message_received,
         )
 
+    def _message_received(self, msg: _aioxmpp.Message):
+        """Converts the XMPP message into a PEAK :class:`Message` and dispatches it."""
+        return self._deliver(Message.from_node(msg))
+
+    def _deliver(self, msg: Message) -> List[asyncio.Future]:
+        """Dispatches a message received through the agent's transport.
+
+        Envelopes (see :class:`Outbox`) are unpacked and each of their messages is
+        dispatched.
+        """
+        if ENVELOPE_METADATA not in msg.metadata:
+            return self.dispatch(msg)
+        futures = []
+        for inner in unpack_envelope(msg):
+            futures.extend(self.dispatch(inner))
+        return futures
+
+    def dispatch(self, msg: _spade.message.Message) -> List[asyncio.Future]:
+        """Dispatches the message to the behaviours whose template matches it.
+
+        The chunks of the transfers (see :meth:`_BehaviourMixin.send_stream`) are
+        handled by the agent's :class:`StreamManager`; only the first chunk of
+        each transfer is dispatched to the behaviours. Replies to the requests
+        of the agent (see :meth:`_BehaviourMixin.request`) resolve the requests
+        instead. If the agent has a recorder, the message is recorded first.
+        The message is dispatched in the agent's logging context (see
+        :func:`peak.logging.agent_context`), whichever agent delivers it.
+        """
+        with agent_context(str(self.jid)):
+            if self.recorder is not None:
+                self.recorder.record(self, msg)
+            if STREAM_METADATA in msg.metadata and self.streams.receive(msg):
+                return []
+            if REPLY_METADATA in msg.metadata and self.pending_requests.resolve(msg):
+                return []
+            if self._template_index is None or self._template_index.stale:
+                self._template_index = TemplateIndex(self.behaviours)
+            debug = logger.isEnabledFor(logging.DEBUG)
+            if debug:
+                logger.debug(f"Got message: {msg}")
+            futures = []
+            behaviours = self._template_index.match(msg)
+            for behaviour in behaviours:
+                futures.append(self.submit(behaviour.enqueue(msg)))
+                if debug:
+                    logger.debug(f"Message enqueued to behaviour: {behaviour}")
+                self.traces.append(msg, category=str(behaviour))
+            if not behaviours:
+                logger.warning(f"No behaviour matched for message: {msg}")
+                self.traces.append(msg)
+            return futures
+
+    def submit(self, coro: Coroutine) -> asyncio.Future:
+        """Runs a coroutine in the event loop of the agent.
+
+        The coroutine runs in the agent's logging context, so the records of the
+        behaviours started, or the messages enqueued, by other agents are
+        written to this agent's log.
+        """
+        with agent_context(str(self.jid)):
+            return super().submit(coro)
+
+    def add_behaviour(
+        self,
+        behaviour: _spade.behaviour.CyclicBehaviour,
+        template: Optional[_spade.template.Template] = None,
+    ):
+        """Adds and starts a behaviour to the agent.
+
+        Args:
+            behaviour: The behaviour to be started.
+            template: Template used to match the messages delivered to the
+                behaviour.
+        """
+        super().add_behaviour(behaviour, template)
+        self._template_index = None
+
+    def remove_behaviour(self, behaviour: _spade.behaviour.CyclicBehaviour):
+        """Kills and removes a behaviour from the agent.
+
+        Args:
+            behaviour: The behaviour to be removed.
+        """
+        super().remove_behaviour(behaviour)
+        self._template_index = None
+
+    def enable_outbox(
+        self,
+        window: float = 0.01,
+        max_messages: int = 64,
+        max_retries: int = 3,
+        retry_delay: float = 1.0,
+    ):
+        """Coalesces the messages sent to the same receiver.
+
+        Messages sent to the same agent or community within `window` seconds are
+        sent in a single stanza (see :class:`Outbox`).
+
+        Args:
+            window: Seconds a message waits for others to the same receiver.
+            max_messages: Maximum number of messages in a stanza.
+            max_retries: Maximum number of retries of a stanza the transport
+                failed to send.
+            retry_delay: Seconds to wait before retrying a stanza.
+        """
+        self.outbox = Outbox(self, window, max_messages, max_retries, retry_delay)
+
+    async def _async_start(self, auto_register: bool = True):
+        self._stopped.clear()
+        await self.transport.start(self, auto_register)
+
+    async def _async_stop(self):
+        if self.outbox is not None and self.is_alive():
+            await self.outbox.flush()
+        await self.transport.stop(self)
+        if self.recorder is not None:
+            self.recorder.flush()
+        self._stopped.set()
+        for waiter in self._stop_waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+        self._stop_waiters.clear()
+
+    async def wait_stopped(self):
+        """Waits until the agent stops.
+
+        Returns right away if the agent is not running.
+        """
+        if not self.is_alive():
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._stop_waiters.append(waiter)
+        await waiter
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Blocks the calling thread until the agent stops.
+
+        Must not be called from the agent's event loop (see :meth:`wait_stopped`).
+
+        Args:
+            timeout: Maximum number of seconds to wait. None waits forever.
+
+        Returns:
+            True if the agent stopped, False if the timeout expired.
+        """
+        if not self.is_alive():
+            return True
+        return self._stopped.wait(timeout)
+
 
 class _BehaviourMixin:
     """Adds XMPP functinalities to SPADE's base behaviours.
@@ -56,6 +238,82 @@ class _BehaviourMixin:
     Acts as Mixin in the SPADE's behaviours."""
 
     agent: Agent
+    mailbox_capacity: Optional[int] = None
+    mailbox_overflow: str = "drop-newest"
+
+    @property
+    def logger(self) -> logging.Logger:
+        """Logger of the behaviour ('peak.{class name}')."""
+        return getLogger(self.__class__.__name__)
+
+    _logger = logger
+
+    def kill(self, exit_code: Optional[Any] = None):
+        super().kill(exit_code)
+        for call in getattr(self, "_blocking_calls", ()):
+            call.get_loop().call_soon_threadsafe(call.cancel)
+
+    def set_agent(self, agent: Agent):
+        # SPADE's set_agent creates its queue with the loop argument, removed in
+        # Python 3.10; the mailbox replaces it and takes the loop only on 3.9
+        self.agent = agent
+        self.presence = agent.presence
+        self.web = agent.web
+        self.queue = Mailbox(self.mailbox_capacity, self.mailbox_overflow, agent.loop)
+        self._blocking_calls = set()
+
+    def set_mailbox(self, capacity: Optional[int], overflow: str = "drop-newest"):
+        """Limits the number of messages waiting in the behaviour's mailbox.
+
+        Must be called before the behaviour is added to the agent. The limits can
+        also be set with the class attributes `mailbox_capacity` and
+        `mailbox_overflow`.
+
+        Args:
+            capacity: Maximum number of messages. None means no limit.
+            overflow: What happens to new messages when the mailbox is full:
+                'drop-oldest', 'drop-newest' or 'reject' (see
+                :class:`peak.mailbox.Mailbox`).
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(
+                f"overflow policy must be one of {OVERFLOW_POLICIES}, not '{overflow}'"
+            )
+        self.mailbox_capacity = capacity
+        self.mailbox_overflow = overflow
+
+    async def enqueue(self, message: _spade.message.Message):
+        """Delivers a message to the behaviour's mailbox.
+
+        If the mailbox rejects the message, the sender gets a reply with the
+        'peak:error' metadata field set to 'mailbox-full'.
+        """
+        if self.queue.deliver(message):
+            return
+        if self.queue.overflow == "reject" and message.sender:
+            if message.get_metadata(ERROR_METADATA) == MAILBOX_FULL:
+                return
+            reply = message.make_reply()
+            reply.set_metadata(ERROR_METADATA, MAILBOX_FULL)
+            await self.send(reply)
+
+    def mailbox_metrics(self) -> dict:
+        """Depth of the mailbox and number of messages received, dropped and rejected."""
+        return self.queue.metrics()
+
+    def set_template(self, template: _spade.template.Template):
+        """Sets the template used to match the messages delivered to the behaviour.
+
+        The template is compiled when the agent dispatches the next message.
+        Later changes to PEAK's templates are compiled again too, while other
+        templates changed afterwards must be set again.
+
+        Args:
+            template: The template.
+        """
+        super().set_template(template)
+        if self.agent is not None:
+            self.agent._template_index = None
 
     async def receive(
         self, timeout: Optional[float] = None
@@ -79,6 +337,63 @@ class _BehaviourMixin:
             msg = None
         return msg
 
+    async def receive_many(
+        self, max_n: Optional[int] = None, timeout: Optional[float] = None
+    ) -> List[_spade.message.Message]:
+        """
+        Receives all the messages waiting in the mailbox, up to `max_n`.
+        If the mailbox is empty, waits `timeout` seconds for the first message.
+        If timeout is `None`, it will wait until it receives a message.
+
+        Args:
+            max_n (int, optional): maximum number of messages
+            timeout (float, optional): number of seconds to wait for the first message
+
+        Returns:
+            List of messages, empty if the timeout expired.
+        """
+        if self.queue.empty():
+            msg = await self.receive(timeout)
+            if msg is None:
+                return []
+            messages = [msg]
+        else:
+            messages = [self.queue.get_nowait()]
+        while (max_n is None or len(messages) < max_n) and not self.queue.empty():
+            messages.append(self.queue.get_nowait())
+        return messages
+
+    async def request(
+        self, msg: _spade.message.Message, timeout: Optional[float] = 60
+    ) -> _spade.message.Message:
+        """Sends a request and waits for its reply.
+
+        The request gets a unique identifier, so the reply (created by the
+        receiver with `make_reply`) is delivered here and not to the behaviours
+        of the agent. Several requests can wait for their replies at the same
+        time, e.g. with `asyncio.gather`.
+
+        Args:
+            msg: The request.
+            timeout: Seconds to wait for the reply. None waits forever.
+
+        Returns:
+            The reply.
+
+        Raises:
+            asyncio.TimeoutError: If the reply did not arrive in time.
+        """
+        # the request is registered first, since the reply can arrive before
+        # the send returns (e.g. with the memory transport)
+        id, reply = self.agent.pending_requests.create()
+        msg.set_metadata(REQUEST_METADATA, id)
+        try:
+            await self.send(msg)
+        except BaseException:
+            self.agent.pending_requests.discard(id)
+            raise
+        return await self.agent.pending_requests.wait(id, reply, timeout)
+
     async def join_community(self, jid: str):
         """Joins a community.
 
@@ -89,11 +404,8 @@ class _BehaviourMixin:
             Exception if the community JID is invalid.
         """
         if jid not in self.agent.communities:
-            room, _ = self.agent._muc_client.join(
-                _aioxmpp.JID.fromstr(jid), self.agent.name
-            )
             try:
-                await first_signal(room.on_enter, room.on_failure)
+                room = await self.agent.transport.join(self.agent, jid)
                 self.agent.communities[jid] = room
                 self._logger.debug(f"Joined community: {jid}")
             except Exception as error:
@@ -117,9 +429,9 @@ class _BehaviourMixin:
     async def list_communities(self, node_jid: str):
         """Retrieves the list of the existing community in the server.
 
-        This method uses the Service Discovery functionality of the XMPP
-        server. In orther to work the server must have this functionality
-        configured.
+        With the XMPP transport this method uses the Service Discovery
+        functionality of the XMPP server. In orther to work the server must have
+        this functionality configured.
 
         Args:
             jid: XMPP identifier of the Service Discovery domain.
@@ -127,10 +439,7 @@ class _BehaviourMixin:
         Returns:
             A list of XMPP communities.
         """
-        info = await self.agent._disco.query_items(
-            _aioxmpp.JID.fromstr(node_jid), require_fresh=True
-        )
-        return info.items
+        return await self.agent.transport.list_communities(self.agent, node_jid)
 
     async def community_members(self, jid: str) -> List[_aioxmpp.muc.Occupant]:
         """Retrieves list of members from a community.
@@ -162,19 +471,120 @@ class _BehaviourMixin:
         Args:
             msg: The XMPP message.
         """
-        raw_msg = msg.prepare()
-        self._logger.debug(f"Sending message: {msg}")
         group = str(msg.to)
+        if self.agent.outbox is not None and group in self.agent.communities:
+            await self.agent.outbox.send(msg, community=True)
+            return
+        transport = self.agent.transport
+        self._logger.debug(f"Sending message: {msg}")
         try:
-            await self.agent.communities[group].send_message(raw_msg)
+            await transport.send_to_community(self.agent.communities[group], msg)
         except:
             self._logger.debug(
                 f"Sending a message to a group which the agent is not a member of: {group}"
             )
             await self.join_community(group)
-            await self.agent.communities[group].send_message(raw_msg)
+            await transport.send_to_community(self.agent.communities[group], msg)
             await self.leave_community(group)
 
+    async def _xmpp_send(self, msg: _spade.message.Message):
+        if self.agent.outbox is not None:
+            await self.agent.outbox.send(msg)
+        else:
+            await self.agent.transport.send(self.agent, msg)
+
+    async def send_stream(
+        self,
+        to: Union[str, JID],
+        data: Union[str, bytes],
+        metadata: dict = None,
+        chunk_size: int = 32768,
+        window: int = 8,
+        timeout: float = 60,
+    ):
+        """Sends data that may not fit in one message in chunks.
+
+        The receiver gets the first chunk as a normal message, with the given
+        metadata, and reads the data with :meth:`open_stream`. At most `window`
+        chunks are sent ahead of the ones consumed by the receiver, so other
+        messages are not stuck behind the whole transfer.
+
+        Args:
+            to: Receiver of the data.
+            data: Data to send.
+            metadata: Metadata of the first chunk.
+            chunk_size: Maximum number of characters (or bytes) of each chunk.
+            window: Maximum number of chunks not yet consumed by the receiver.
+            timeout: Seconds to wait for the receiver to consume a chunk.
+
+        Raises:
+            asyncio.TimeoutError: If the receiver stops consuming the chunks.
+        """
+        stream = OutgoingStream(str(to), chunk_size, window, timeout)
+        self.agent.streams.outgoing[stream.id] = stream
+        try:
+            await stream.send(self, data, metadata)
+        finally:
+            del self.agent.streams.outgoing[stream.id]
+
+    def open_stream(self, msg: Message, timeout: float = 60) -> IncomingStream:
+        """Opens the transfer started by a message received by this behaviour.
+
+        Example:
+            >>> msg = await self.receive()
+            >>> data = await self.open_stream(msg).read()
+
+        Args:
+            msg: First chunk of the transfer.
+            timeout: Seconds to wait for each chunk.
+
+        Returns:
+            The data as an async iterator of chunks.
+        """
+        return self.agent.streams.open(msg, self, timeout)
+
+    async def run_blocking(
+        self,
+        func: Callable,
+        *args,
+        executor: str = "thread",
+        timeout: Optional[float] = None,
+        **kwargs,
+    ) -> Any:
+        """Runs a blocking function in a pool, out of the agent's event loop.
+
+        The other behaviours of the agent keep running meanwhile. If the
+        behaviour is killed (e.g. the agent stops) before the function returns,
+        the call is cancelled and the behaviour ends without running `on_end`
+        (see :mod:`peak.executors`).
+
+        Args:
+            func: Function to run.
+            args: Positional arguments of the function.
+            executor: 'thread' or 'process'.
+            timeout: Seconds to wait for the result. None waits forever.
+            kwargs: Keyword arguments of the function.
+
+        Returns:
+            The result of the function.
+
+        Raises:
+            asyncio.TimeoutError: If the timeout expires.
+            asyncio.CancelledError: If the behaviour is killed.
+        """
+        call = asyncio.ensure_future(
+            executors.run_blocking(
+                func, *args, executor=executor, timeout=timeout, **kwargs
+            )
+        )
+        if self.is_killed():
+            call.cancel()
+        self._blocking_calls.add(call)
+        try:
+            return await call
+        finally:
+            self._blocking_calls.discard(call)
+
     async def wait_for(
         self,
         behaviour: _spade.behaviour.CyclicBehaviour,
@@ -216,3 +626,45 @@ class CyclicBehaviour(
 class FSMBehaviour(_BehaviourMixin, _spade.behaviour.FSMBehaviour, metaclass=_ABCMeta):
     """A behaviour composed of states (oneshotbehaviours) that may transition from one
     state to another."""
+
+
+class BatchBehaviour(CyclicBehaviour, metaclass=_ABCMeta):
+    """This behaviour handles the messages it receives in batches.
+
+    After the first message arrives, it keeps collecting messages until it has
+    `batch_size` messages or `max_latency` seconds have passed, and then calls
+    :meth:`handle_batch` with all of them.
+    """
+
+    def __init__(self, batch_size: int = 32, max_latency: float = 0.05):
+        """Inits the behaviour.
+
+        Args:
+            batch_size: Maximum number of messages in a batch.
+            max_latency: Maximum number of seconds the first message of a batch
+                waits for the others.
+        """
+        super().__init__()
+        self.batch_size = batch_size
+        self.max_latency = max_latency
+
+    async def run(self):
+        batch = await self.receive_many(self.batch_size)
+        deadline = time.monotonic() + self.max_latency
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            messages = await self.receive_many(self.batch_size - len(batch), remaining)
+            if not messages:
+                break
+            batch.extend(messages)
+        await self.handle_batch(batch)
+
+    @abstractmethod
+    async def handle_batch(self, messages: List[_spade.message.Message]):
+        """Handles a batch of messages.
+
+        Args:
+            messages: The messages, in the order they were received.
+        """
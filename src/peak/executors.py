@@ -0,0 +1,170 @@
+"""Executors that run blocking code out of the agents' event loop.
+
+The behaviours of an agent share its event loop, so a blocking call (a long
+computation, a synchronous client library...) in a behaviour or in the `step` of
+a :class:`peak.SyncAgent` freezes the whole agent: no message is dispatched, no
+other behaviour runs and the XMPP connection is not kept alive. Such calls can be
+run in a pool of threads ('thread' executor, for I/O and libraries that release
+the GIL) or of processes ('process' executor, for pure Python computations):
+
+    >>> response = await run_blocking(ollama.generate, model, prompt)
+
+or, from a behaviour, so that the call is cancelled if the behaviour is killed:
+
+    >>> response = await self.run_blocking(ollama.generate, model, prompt)
+
+Functions can also be declared blocking once:
+
+    >>> @blocking(executor="process")
+    ... def simulate(state):
+    ...     ...
+    >>> result = await simulate(state)
+
+The pools are shared by all the agents of the process and created when first
+used. Their sizes can be set with :func:`configure_executors`. A call that is
+cancelled (or times out) before it starts is removed from the pool, but a call
+that is already running can not be interrupted and runs until it returns. The
+functions and arguments sent to the 'process' executor must be picklable.
+"""
+
+import asyncio
+import functools
+import importlib
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+EXECUTORS = ("thread", "process")
+
+_sizes: Dict[str, Optional[int]] = {"thread": None, "process": None}
+_executors: Dict[str, Executor] = {}
+
+
+def configure_executors(threads: Optional[int] = None, processes: Optional[int] = None):
+    """Sets the number of workers of the pools.
+
+    The pools already created are shut down once all their calls, running or
+    not started yet, finish, and are created again with the new size when
+    next used.
+
+    Args:
+        threads: Number of threads of the 'thread' executor. None uses the
+            default of :class:`ThreadPoolExecutor`.
+        processes: Number of processes of the 'process' executor. None uses the
+            number of CPUs.
+    """
+    _sizes["thread"] = threads
+    _sizes["process"] = processes
+    shutdown_executors(wait=False, cancel_futures=False)
+
+
+def get_executor(executor: str = "thread") -> Executor:
+    """Gets the pool of an executor, creating it if needed.
+
+    Args:
+        executor: 'thread' or 'process'.
+
+    Raises:
+        ValueError: If there is no executor with that name.
+    """
+    if executor not in EXECUTORS:
+        raise ValueError(f"executor must be one of {EXECUTORS}, not '{executor}'")
+    pool = _executors.get(executor)
+    if pool is None:
+        if executor == "thread":
+            pool = ThreadPoolExecutor(_sizes["thread"], thread_name_prefix="peak")
+        else:
+            pool = ProcessPoolExecutor(_sizes["process"])
+        _executors[executor] = pool
+    return pool
+
+
+def shutdown_executors(wait: bool = True, cancel_futures: bool = True):
+    """Shuts down the pools.
+
+    Args:
+        wait: Whether to wait for the running calls to finish.
+        cancel_futures: Whether to cancel the calls that did not start yet.
+    """
+    for pool in _executors.values():
+        pool.shutdown(wait=wait, cancel_futures=cancel_futures)
+    _executors.clear()
+
+
+async def run_blocking(
+    func: Callable,
+    *args,
+    executor: str = "thread",
+    timeout: Optional[float] = None,
+    **kwargs,
+) -> Any:
+    """Runs a blocking function in a pool and waits for its result.
+
+    Args:
+        func: Function to run.
+        args: Positional arguments of the function.
+        executor: 'thread' or 'process'.
+        timeout: Seconds to wait for the result. None waits forever.
+        kwargs: Keyword arguments of the function.
+
+    Returns:
+        The result of the function. Its exceptions are raised in the caller.
+
+    Raises:
+        asyncio.TimeoutError: If the timeout expires.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(
+        get_executor(executor), functools.partial(func, *args, **kwargs)
+    )
+    return await asyncio.wait_for(future, timeout)
+
+
+def blocking(
+    func: Callable = None,
+    *,
+    executor: str = "thread",
+    timeout: Optional[float] = None,
+):
+    """Turns a blocking function into a coroutine function that runs it in a pool.
+
+    Can be used with or without arguments (`@blocking` or
+    `@blocking(executor="process")`), on functions and on methods such as
+    :meth:`peak.SyncAgent.step`. Methods can only use the 'thread' executor,
+    since the agents can not be sent to other processes.
+
+    Args:
+        func: Function to decorate.
+        executor: 'thread' or 'process'.
+        timeout: Seconds to wait for the result of each call. None waits
+            forever.
+    """
+    if executor not in EXECUTORS:
+        raise ValueError(f"executor must be one of {EXECUTORS}, not '{executor}'")
+
+    def decorator(func: Callable):
+        target = func
+        if executor == "process":
+            # the decorated name refers to the wrapper, so the pickled function
+            # is looked up by name and unwrapped in the worker process
+            target = functools.partial(
+                _call_unwrapped, func.__module__, func.__qualname__
+            )
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            return await run_blocking(
+                target, *args, executor=executor, timeout=timeout, **kwargs
+            )
+
+        return wrapper
+
+    if func is None:
+        return decorator
+    return decorator(func)
+
+
+def _call_unwrapped(module: str, qualname: str, *args, **kwargs) -> Any:
+    func = importlib.import_module(module)
+    for name in qualname.split("."):
+        func = getattr(func, name)
+    return func.__wrapped__(*args, **kwargs)
@@ -0,0 +1,75 @@
+"""Cache of parsed JIDs.
+
+Parsing a JID runs stringprep on each of its parts, which is slow compared to
+the rest of the work done to build or match a message. The agents of a system
+use the same few JIDs over and over (the DF, the communities, the synchronizer),
+so PEAK parses each JID once and reuses the same :obj:`JID` object afterwards.
+JIDs are immutable, so they can be shared safely.
+"""
+
+from typing import Dict
+
+from aioxmpp import JID
+
+DEFAULT_SIZE = 4096
+
+
+class JIDCache:
+    """Bounded cache of parsed JIDs.
+
+    When the cache is full the oldest JID is evicted.
+
+    Attributes:
+        maxsize (int): Maximum number of JIDs in the cache.
+        hits (int): Number of JIDs found in the cache.
+        misses (int): Number of JIDs parsed.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._jids: Dict[str, JID] = {}
+
+    def parse(self, value: str) -> JID:
+        """Parses a JID, or gets it from the cache if it was parsed before.
+
+        Args:
+            value: String representation of the JID.
+
+        Raises:
+            ValueError: If the JID is invalid.
+        """
+        jid = self._jids.get(value)
+        if jid is not None:
+            self.hits += 1
+            return jid
+        self.misses += 1
+        jid = JID.fromstr(value)
+        if len(self._jids) >= self.maxsize:
+            del self._jids[next(iter(self._jids))]
+        self._jids[value] = jid
+        return jid
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of the JIDs found in the cache."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __len__(self) -> int:
+        return len(self._jids)
+
+    def clear(self):
+        """Empties the cache and resets the statistics."""
+        self._jids.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+jid_cache = JIDCache()
+
+
+def parse_jid(value: str) -> JID:
+    """Parses a JID using the process' cache (see :class:`JIDCache`)."""
+    return jid_cache.parse(value)
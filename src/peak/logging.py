@@ -1,10 +1,14 @@
 import logging
 import sys
+from contextlib import contextmanager
+from contextvars import ContextVar
 from os import PathLike
-from typing import Union
+from typing import Dict, Optional, Union
 
 FORMATTER = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
 
+_agent_context: ContextVar[Optional[str]] = ContextVar("peak_agent", default=None)
+
 
 def configure_cli_logger() -> logging.Logger:
     """Configure logger for command line interface."""
@@ -64,6 +68,103 @@ def configure_debug_mode(
     logger.addHandler(file_handler)
 
 
+class AgentLogRouter(logging.Handler):
+    """Routes log records to the file of the agent that emitted them.
+
+    Used when several agents share the same process. The agent is identified
+    by the logging context of the asyncio task that emitted the record (see
+    :func:`set_agent_context`). Records emitted outside of any agent, or by the
+    'peak.main' logger, are handed to the console handler, if any.
+    """
+
+    def __init__(self, console: logging.Handler = None):
+        super().__init__()
+        self.console = console
+        self.agents: Dict[str, logging.Handler] = {}
+
+    def add_agent(
+        self,
+        name: str,
+        log_level: Union[int, str],
+        filename: Union[str, PathLike],
+        mode: str,
+    ):
+        """Creates the log file of an agent."""
+        file_handler = logging.FileHandler(filename, mode)
+        file_handler.setLevel(log_level)
+        file_handler.setFormatter(FORMATTER)
+        self.agents[name] = file_handler
+
+    def emit(self, record: logging.LogRecord):
+        file_handler = self.agents.get(_agent_context.get())
+        if file_handler is not None and record.levelno >= file_handler.level:
+            file_handler.handle(record)
+        if self.console is not None and (
+            file_handler is None or record.name.startswith("peak.main")
+        ):
+            self.console.handle(record)
+
+    def close(self):
+        for file_handler in self.agents.values():
+            file_handler.close()
+        super().close()
+
+
+def set_agent_context(name: str):
+    """Binds the current asyncio task (and the tasks it creates) to an agent.
+
+    Every record logged from this context is written to the agent's log file
+    by the :class:`AgentLogRouter`.
+    """
+    return _agent_context.set(name)
+
+
+@contextmanager
+def agent_context(name: str):
+    """Binds the code in the block (and the tasks it creates) to an agent.
+
+    Unlike :func:`set_agent_context`, the previous context is restored at the
+    end of the block, so it can be used where an agent runs code on behalf of
+    another, e.g. when it delivers a message to an agent of the same process.
+    """
+    token = _agent_context.set(name)
+    try:
+        yield
+    finally:
+        _agent_context.reset(token)
+
+
+def configure_shared_agents_logging(log_level: Union[int, str]) -> AgentLogRouter:
+    """Configure logging for several agents hosted in the same process.
+
+    Returns:
+        The router to which the log file of each agent must be added.
+    """
+    logger = logging.getLogger("peak")
+    logger.setLevel(log_level)
+    logger.propagate = False
+    logger.handlers.clear()
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setLevel(logging.INFO)
+    console_handler.setFormatter(FORMATTER)
+    router = AgentLogRouter(console_handler)
+    logger.addHandler(router)
+    return router
+
+
+def configure_shared_debug_mode(log_level: Union[int, str]) -> AgentLogRouter:
+    """Same as :func:`configure_debug_mode` for agents sharing the same process.
+
+    Returns:
+        The router to which the log file of each agent in debug mode must be added.
+    """
+    logger = logging.getLogger()
+    logger.setLevel(log_level)
+    router = AgentLogRouter()
+    logger.addHandler(router)
+    return router
+
+
 def getLogger(name: str = None) -> logging.Logger:
     """Same as getFileLogger, just renamed it."""
     return getFileLogger(name)
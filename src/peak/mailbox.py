@@ -0,0 +1,85 @@
+import asyncio
+import sys
+from typing import Optional
+
+OVERFLOW_POLICIES = ("drop-oldest", "drop-newest", "reject")
+ERROR_METADATA = "peak:error"
+MAILBOX_FULL = "mailbox-full"
+
+
+class Mailbox(asyncio.Queue):
+    """Mailbox of a behaviour, with an optional capacity.
+
+    When the mailbox is full, new messages are handled according to the overflow
+    policy:
+
+        'drop-oldest': the oldest message in the mailbox is discarded.
+        'drop-newest': the new message is discarded.
+        'reject': the new message is discarded and the sender gets an error
+            reply (see :meth:`peak.core._BehaviourMixin.enqueue`).
+
+    There is no policy that waits for space in the mailbox: the transport
+    delivers the messages as they arrive, without flow control, so the waiting
+    deliveries would pile up in memory instead of slowing down the senders.
+
+    Attributes:
+        capacity (int): Maximum number of messages. None means no limit.
+        overflow (str): Overflow policy.
+        received (int): Number of messages delivered to the mailbox.
+        dropped (int): Number of messages discarded by the 'drop' policies.
+        rejected (int): Number of messages rejected.
+        max_depth (int): Maximum number of messages waiting in the mailbox.
+    """
+
+    def __init__(
+        self,
+        capacity: Optional[int] = None,
+        overflow: str = "drop-newest",
+        loop: asyncio.AbstractEventLoop = None,
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(
+                f"overflow policy must be one of {OVERFLOW_POLICIES}, not '{overflow}'"
+            )
+        if loop is not None and sys.version_info < (3, 10):
+            # before Python 3.10 queues are bound to a loop when created
+            super().__init__(capacity or 0, loop=loop)
+        else:
+            super().__init__(capacity or 0)
+        self.capacity = capacity
+        self.overflow = overflow
+        self.received = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.max_depth = 0
+
+    def deliver(self, message) -> bool:
+        """Puts a message in the mailbox following the overflow policy.
+
+        Returns:
+            False if the message was discarded or rejected.
+        """
+        self.received += 1
+        if self.full():
+            if self.overflow == "drop-oldest":
+                self.get_nowait()
+                self.dropped += 1
+            elif self.overflow == "drop-newest":
+                self.dropped += 1
+                return False
+            else:
+                self.rejected += 1
+                return False
+        self.put_nowait(message)
+        self.max_depth = max(self.max_depth, self.qsize())
+        return True
+
+    def metrics(self) -> dict:
+        """Depth of the mailbox and number of messages received, dropped and rejected."""
+        return {
+            "depth": self.qsize(),
+            "max_depth": self.max_depth,
+            "received": self.received,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+        }
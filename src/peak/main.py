@@ -1,18 +1,39 @@
+import importlib
 import logging
 import os
 import sys
 from argparse import ArgumentParser
 from pathlib import Path
 
-from peak import JID
 from peak import __name__ as peak_name
 from peak import __version__ as version
 from peak import configure_cli_logger
-from peak.cli import df, run, send, start
 
 _logger = logging.getLogger(__name__)
 
 
+def jid(value: str):
+    """Parses a JID from the command line.
+
+    aioxmpp is only imported when a JID argument is given.
+    """
+    from aioxmpp import JID
+
+    return JID.fromstr(value)
+
+
+def _command(module: str, function: str):
+    """Command that imports its module only when it is executed.
+
+    Avoids loading the agents' framework when parsing the arguments.
+    """
+
+    def command(*args, **kargs):
+        return getattr(importlib.import_module(module), function)(*args, **kargs)
+
+    return command
+
+
 def main(args=None):
     try:
         configure_cli_logger()
@@ -56,7 +77,7 @@ def _main(args=None):
         default="10000",
         help="REST API port (default: 10000)",
     )
-    df_parser.set_defaults(func=df.exec)
+    df_parser.set_defaults(func=_command("peak.cli.df", "exec"))
 
     # parser for the "run" command
     run_parser = subparsers.add_parser(
@@ -68,9 +89,7 @@ def _main(args=None):
         type=Path,
         help="Python file containing the class of the agent to be executed (the same name must be used in the class and in the file) ",
     )
-    run_parser.add_argument(
-        "-jid", type=JID.fromstr, help="agent XMPP ID", required=True
-    )
+    run_parser.add_argument("-jid", type=jid, help="agent XMPP ID", required=True)
     run_parser.add_argument(
         "-clones",
         type=int,
@@ -112,7 +131,87 @@ def _main(args=None):
     run_parser.add_argument(
         "--verify_security", action="store_true", help="verify SLL certificates"
     )
-    run_parser.set_defaults(func=run.execute_agent)
+    run_parser.add_argument(
+        "-hosting",
+        type=str,
+        choices=["process", "shared", "pool"],
+        default="process",
+        help="run each clone in its own process, all clones in the same process or split them across a pool of processes (default: process)",
+    )
+    run_parser.add_argument(
+        "-workers",
+        type=int,
+        help="number of worker processes in pool mode (default: number of CPU cores)",
+    )
+    run_parser.add_argument(
+        "-sharding",
+        type=str,
+        choices=["round-robin", "group", "clone"],
+        default="round-robin",
+        help="how the clones are split across the workers in pool mode (default: round-robin)",
+    )
+    run_parser.add_argument(
+        "-launcher",
+        type=str,
+        choices=["fork", "spawn", "forkserver"],
+        help="how the processes are started, forkserver preloads the framework and the agent's module (default: platform's default)",
+    )
+    run_parser.add_argument(
+        "-max_connections",
+        type=int,
+        help="maximum number of clones connecting to the server at the same time (default: no limit)",
+    )
+    run_parser.add_argument(
+        "-connection_rate",
+        type=float,
+        help="maximum number of new connections per second (default: no limit)",
+    )
+    run_parser.add_argument(
+        "-connection_retries",
+        type=int,
+        default=0,
+        help="number of retries when a clone fails to connect (default: 0)",
+    )
+    run_parser.add_argument(
+        "-retry_backoff",
+        type=float,
+        default=1.0,
+        help="base delay in seconds between retries, doubled at each retry (default: 1.0)",
+    )
+    run_parser.add_argument(
+        "-restart",
+        choices=["never", "on-failure", "always"],
+        default="never",
+        help="restart policy of the agents' processes (default: never)",
+    )
+    run_parser.add_argument(
+        "-max_restarts",
+        type=int,
+        help="maximum number of restarts of each process (default: no limit)",
+    )
+    run_parser.add_argument(
+        "-restart_backoff",
+        type=float,
+        default=1.0,
+        help="base delay in seconds before restarting a process, doubled at each consecutive restart (default: 1.0)",
+    )
+    run_parser.add_argument(
+        "-transport",
+        choices=["xmpp", "memory"],
+        default="xmpp",
+        help="transport used by the agents; 'memory' runs all the clones in this process without an XMPP server (default: xmpp)",
+    )
+    run_parser.add_argument(
+        "-df_port",
+        type=int,
+        help="REST API port of the Directory Facilitator hosted with the memory transport (default: no REST API)",
+    )
+    run_parser.add_argument(
+        "-record",
+        type=str,
+        help="log where the messages received by the agents are recorded, to be replayed with 'peak replay' (default: no recording)",
+    )
+    run_parser.set_defaults(func=_command("peak.cli.run", "execute_agent"))
 
     # parser for the "start" command
     start_parser = subparsers.add_parser(
@@ -124,7 +223,117 @@ def _main(args=None):
         type=Path,
         help="YAML configuration file",
     )
-    start_parser.set_defaults(func=start.execute_config_file)
+    start_parser.add_argument(
+        "-hosting",
+        type=str,
+        choices=["process", "shared", "pool"],
+        help="run each agent in its own process, all agents in the same process or split them across a pool of processes (overrides the YAML configuration)",
+    )
+    start_parser.add_argument(
+        "-workers",
+        type=int,
+        help="number of worker processes in pool mode (overrides the YAML configuration)",
+    )
+    start_parser.add_argument(
+        "-sharding",
+        type=str,
+        choices=["round-robin", "group", "clone"],
+        help="how the agents are split across the workers in pool mode (overrides the YAML configuration)",
+    )
+    start_parser.add_argument(
+        "-launcher",
+        type=str,
+        choices=["fork", "spawn", "forkserver"],
+        help="how the processes are started, forkserver preloads the framework and the agents' modules (overrides the YAML configuration)",
+    )
+    start_parser.add_argument(
+        "-max_connections",
+        type=int,
+        help="maximum number of agents connecting to the server at the same time (overrides the YAML configuration)",
+    )
+    start_parser.add_argument(
+        "-connection_rate",
+        type=float,
+        help="maximum number of new connections per second (overrides the YAML configuration)",
+    )
+    start_parser.add_argument(
+        "-connection_retries",
+        type=int,
+        help="number of retries when an agent fails to connect (overrides the YAML configuration)",
+    )
+    start_parser.add_argument(
+        "-retry_backoff",
+        type=float,
+        help="base delay in seconds between retries (overrides the YAML configuration)",
+    )
+    start_parser.add_argument(
+        "-restart",
+        choices=["never", "on-failure", "always"],
+        help="restart policy of the agents' processes (overrides the YAML configuration)",
+    )
+    start_parser.add_argument(
+        "-max_restarts",
+        type=int,
+        help="maximum number of restarts of each process (overrides the YAML configuration)",
+    )
+    start_parser.add_argument(
+        "-restart_backoff",
+        type=float,
+        help="base delay in seconds before restarting a process (overrides the YAML configuration)",
+    )
+    start_parser.add_argument(
+        "-transport",
+        choices=["xmpp", "memory"],
+        help="transport used by the agents (overrides the YAML configuration)",
+    )
+    start_parser.add_argument(
+        "-df_port",
+        type=int,
+        help="REST API port of the Directory Facilitator hosted with the memory transport (overrides the YAML configuration)",
+    )
+    start_parser.add_argument(
+        "-record",
+        type=str,
+        help="log where the messages received by the agents are recorded (overrides the YAML configuration)",
+    )
+    start_parser.set_defaults(func=_command("peak.cli.start", "execute_config_file"))
+
+    # parser for the "replay" command
+    replay_parser = subparsers.add_parser(
+        name="replay",
+        help="replay the messages received by an agent in a recorded run, without an XMPP server",
+    )
+    replay_parser.add_argument("log", type=Path, help="log of the recorded run")
+    replay_parser.add_argument(
+        "file",
+        type=Path,
+        help="Python file containing the class of the agent (the same name must be used in the class and in the file)",
+    )
+    replay_parser.add_argument(
+        "-jid",
+        type=jid,
+        nargs="+",
+        help="XMPP IDs of the agents in the recorded run",
+        required=True,
+    )
+    replay_parser.add_argument(
+        "-cid",
+        type=int,
+        nargs="+",
+        help="clone IDs of the agents, in the same order (default: 0)",
+    )
+    replay_parser.add_argument(
+        "-speed",
+        type=float,
+        help="speed of the replay relative to the recorded run (default: as fast as possible)",
+    )
+    replay_parser.add_argument(
+        "-log_level",
+        type=str.upper,
+        default="INFO",
+        help="PEAK logging level (default: INFO)",
+    )
+    replay_parser.set_defaults(func=_command("peak.cli.replay", "replay_agents"))
 
     # parser for the "send" command
     send_parser = subparsers.add_parser(
@@ -132,10 +341,10 @@ def _main(args=None):
         help="sends a message to an agent",
     )
     send_parser.add_argument(
-        "-to", type=JID.fromstr, help="Jabber ID of the receiver agent", required=True
+        "-to", type=jid, help="Jabber ID of the receiver agent", required=True
     )
     send_parser.add_argument(
-        "-sender", type=JID.fromstr, help="Jabber ID of the sender agent (optional)"
+        "-sender", type=jid, help="Jabber ID of the sender agent (optional)"
     )
     send_parser.add_argument("-body", type=str, help="message body (optional)")
     send_parser.add_argument(
@@ -146,7 +355,7 @@ def _main(args=None):
         type=dict,
         help="message's metadata (optional)",
     )
-    send_parser.set_defaults(func=send.send_message)
+    send_parser.set_defaults(func=_command("peak.cli.send", "send_message"))
 
     if len(sys.argv) == 1:
         parser.print_help(sys.stderr)
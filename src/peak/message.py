@@ -1,4 +1,4 @@
-from typing import Union
+from typing import Any, List, Union
 
 import aioxmpp
 import aioxmpp.forms.xso as forms_xso
@@ -7,12 +7,22 @@ from spade.message import SPADE_X_METADATA
 from spade.message import Message as _Message
 from spade.message import MessageBase as _MessageBase
 
+from peak import compression, rpc
+from peak.codecs import CODEC_METADATA, Codec, get_codec
+from peak.jid_cache import parse_jid
 from peak.logging import getLogger
 
 logger = getLogger(__name__)
 
+_NO_PAYLOAD = object()
+
+ENVELOPE_METADATA = "peak:envelope"
+
 
 class MessageBase(_MessageBase):
+    _codec: Codec = None
+    _payload: Any = _NO_PAYLOAD
+
     @property
     def to(self) -> aioxmpp.JID:
         """
@@ -37,7 +47,7 @@ class MessageBase(_MessageBase):
             self._to = jid
             return
         if isinstance(jid, str):
-            self._to = JID.fromstr(jid)
+            self._to = parse_jid(jid)
         if jid is not None and not isinstance(jid, str) and not isinstance(jid, JID):
             raise TypeError("'to' MUST be a string or a JID")
 
@@ -65,12 +75,146 @@ class MessageBase(_MessageBase):
             self._sender = jid
             return
         if isinstance(jid, str):
-            self._sender = JID.fromstr(jid)
+            self._sender = parse_jid(jid)
         if jid is not None and not isinstance(jid, str) and not isinstance(jid, JID):
             raise TypeError("'sender' MUST be a string or a JID")
 
+    @property
+    def body(self) -> str:
+        """
+        Get the body of the message. If the message has a payload, the body is
+        the encoded payload, encoded when first accessed.
+
+        Returns:
+          str: the body of the message
+
+        """
+        if self._body is None and self._payload is not _NO_PAYLOAD:
+            self._body = self._codec.encode(self._payload)
+        return self._body
+
+    @body.setter
+    def body(self, body: str) -> None:
+        """
+        Set the body of the message. Discards the payload, if any.
+
+        Args:
+          body (str): the body of the message
+
+        """
+        _MessageBase.body.fset(self, body)
+        self._payload = _NO_PAYLOAD
+
+    @property
+    def payload(self) -> Any:
+        """
+        Get the payload of the message.
+
+        The body is decoded with the codec named in the 'peak:codec' metadata field
+        the first time the payload is accessed. If the message has no codec, the
+        payload is the body itself. Messages sent by agents in the same process
+        carry the sender's object, which must not be modified (see
+        :meth:`set_payload`).
+
+        Returns:
+          the payload of the message
+
+        """
+        if self._payload is _NO_PAYLOAD:
+            codec = self.get_metadata(CODEC_METADATA)
+            if codec is None or self._body is None:
+                return self._body
+            self._codec = get_codec(codec)
+            self._payload = self._codec.decode(self._body)
+        return self._payload
+
+    def set_payload(self, payload: Any, codec: str = "json") -> None:
+        """
+        Set the payload of the message.
+
+        The payload is encoded into the body only when the message is sent to
+        another process (or the body is accessed), so messages delivered to
+        agents hosted in the same process carry the object itself. Payloads are
+        therefore read-only: the sender must not modify the object once the
+        message is sent, and the receivers must copy it before modifying it.
+
+        Args:
+          payload: the object to send
+          codec (str): name of the codec (see :mod:`peak.codecs`)
+
+        """
+        self._codec = get_codec(codec)
+        self._payload = payload
+        self._body = None
+        self.set_metadata(CODEC_METADATA, codec)
+
 
 class Message(MessageBase, _Message):
+    @classmethod
+    def from_node(cls, node: aioxmpp.Message) -> "Message":
+        """
+        Creates a new Message from an aioxmpp.stanza.Message, decompressing its
+        fields if they were compressed (see :mod:`peak.compression`).
+
+        Args:
+          node (aioxmpp.stanza.Message): an aioxmpp Message
+
+        Returns:
+          Message: a new Message
+
+        """
+        msg = super().from_node(node)
+        if compression.COMPRESSION_METADATA in msg.metadata:
+            compression.decompress(msg)
+        return msg
+
+    def make_reply(self) -> "Message":
+        """
+        Creates a copy of the message, exchanging sender and receiver. The
+        payload is not copied. If the message is a request (see :mod:`peak.rpc`),
+        the reply is bound to it.
+
+        Returns:
+          Message: a new message with exchanged sender and receiver
+
+        """
+        metadata = dict(self.metadata)
+        codec = metadata.pop(CODEC_METADATA, None)
+        request = metadata.pop(rpc.REQUEST_METADATA, None)
+        if request is not None:
+            metadata[rpc.REPLY_METADATA] = request
+        return Message(
+            to=self.sender,
+            sender=self.to,
+            body=None if codec else self.body,
+            thread=self.thread,
+            metadata=metadata,
+        )
+
+    def copy(self, to: Union[str, JID] = None, sender: Union[str, JID] = None):
+        """
+        Creates a copy of the message, optionally changing its receiver and
+        sender. The payload, if any, is shared with the copy.
+
+        Args:
+          to (str): the jid of the receiver of the copy
+          sender (str): the jid of the sender of the copy
+
+        Returns:
+          Message: a new message
+
+        """
+        msg = Message(
+            to=self.to if to is None else to,
+            sender=self.sender if sender is None else sender,
+            thread=self.thread,
+            metadata=dict(self.metadata),
+        )
+        msg._body = self._body
+        msg._codec = self._codec
+        msg._payload = self._payload
+        return msg
+
     def prepare(self) -> aioxmpp.Message:
         """
         Returns an aioxmpp.stanza.Message built from the Message and prepared to be sent.
@@ -85,13 +229,18 @@ class Message(MessageBase, _Message):
             type_=MessageType.CHAT,
         )
 
-        msg.body[None] = self.body
+        body, metadata = self.body, self.metadata
+        compressor = compression.get_compressor()
+        if compressor is not None:
+            body, metadata = compressor.compress(body, metadata)
+
+        msg.body[None] = body
 
         # Send metadata using xep-0004: Data Forms (https://xmpp.org/extensions/xep-0004.html)
-        if len(self.metadata) or self.thread:
+        if len(metadata) or self.thread:
             data = forms_xso.Data(type_=forms_xso.DataType.FORM)
 
-            for name, value in self.metadata.items():
+            for name, value in metadata.items():
                 data.fields.append(
                     forms_xso.Field(
                         var=name,
@@ -113,3 +262,181 @@ class Message(MessageBase, _Message):
             msg.xep0004_data = [data]
 
         return msg
+
+
+def _text_field(name: str, value: str) -> forms_xso.Field:
+    return forms_xso.Field(
+        var=name,
+        type_=forms_xso.FieldType.TEXT_SINGLE,
+        values=[value],
+    )
+
+
+class MessagePrototype:
+    """Prepared message used to send messages with the same shape many times.
+
+    :meth:`Message.prepare` parses the JIDs and builds every XEP-0004 field of
+    the metadata each time a message is sent. The prototype does it once and,
+    for each message, only builds the fields whose value changed (e.g. the
+    period of a clock), reusing the others.
+
+    Example:
+        >>> step = MessagePrototype(to=group_jid, metadata={"sync": "step"})
+        >>> msg = step.message(body="Period 1", period="1")
+        >>> await self.send_to_community(msg)
+
+    Attributes:
+        to (:obj:`JID`): Default receiver of the messages.
+        sender (:obj:`JID`): Default sender of the messages.
+        body (str): Default body of the messages.
+        thread (str): Thread of the messages.
+        metadata (dict): Default metadata of the messages.
+    """
+
+    def __init__(
+        self,
+        to: Union[str, JID] = None,
+        sender: Union[str, JID] = None,
+        body: str = None,
+        thread: str = None,
+        metadata: dict = None,
+    ):
+        self.to = parse_jid(to) if isinstance(to, str) else to
+        self.sender = parse_jid(sender) if isinstance(sender, str) else sender
+        self.body = body
+        self.thread = thread
+        self.metadata = dict(metadata or {})
+        self._fields = {
+            name: (value, _text_field(name, value))
+            for name, value in self.metadata.items()
+        }
+        self._thread_field = _text_field("_thread_node", thread) if thread else None
+
+    def message(
+        self, to: Union[str, JID] = None, body: str = None, **metadata: str
+    ) -> "PreparedMessage":
+        """Creates a message from the prototype.
+
+        Args:
+            to: Receiver of the message. Defaults to the prototype's receiver.
+            body: Body of the message. Defaults to the prototype's body.
+            metadata: Metadata added to or replaced in the prototype's metadata.
+
+        Returns:
+            A :class:`Message` prepared by the prototype when it is sent.
+        """
+        return PreparedMessage(
+            self,
+            to=self.to if to is None else to,
+            sender=self.sender,
+            body=self.body if body is None else body,
+            thread=self.thread,
+            metadata=self.metadata | metadata if metadata else dict(self.metadata),
+        )
+
+    def prepare(
+        self,
+        to: JID,
+        sender: JID,
+        body: str,
+        thread: str,
+        metadata: dict,
+    ) -> aioxmpp.Message:
+        """Builds the aioxmpp message, reusing the fields that did not change.
+
+        Returns:
+            aioxmpp.stanza.Message: the message prepared to be sent
+        """
+        msg = aioxmpp.stanza.Message(to=to, from_=sender, type_=MessageType.CHAT)
+        msg.body[None] = body
+
+        if len(metadata) or thread:
+            data = forms_xso.Data(type_=forms_xso.DataType.FORM)
+            for name, value in metadata.items():
+                prepared = self._fields.get(name)
+                if prepared is not None and prepared[0] == value:
+                    data.fields.append(prepared[1])
+                else:
+                    data.fields.append(_text_field(name, value))
+            if thread:
+                if thread == self.thread:
+                    data.fields.append(self._thread_field)
+                else:
+                    data.fields.append(_text_field("_thread_node", thread))
+            data.title = SPADE_X_METADATA
+            msg.xep0004_data = [data]
+
+        return msg
+
+
+class PreparedMessage(Message):
+    """Message created by a :class:`MessagePrototype`.
+
+    It behaves like any other message and can still be modified before being
+    sent. The prototype builds it when it is sent.
+    """
+
+    def __init__(self, prototype: MessagePrototype, *args, **kargs):
+        super().__init__(*args, **kargs)
+        self.prototype = prototype
+
+    def prepare(self) -> aioxmpp.Message:
+        body, metadata = self.body, self.metadata
+        compressor = compression.get_compressor()
+        if compressor is not None:
+            body, metadata = compressor.compress(body, metadata)
+        return self.prototype.prepare(self.to, self.sender, body, self.thread, metadata)
+
+
+def pack_envelope(messages: List[Message]) -> Message:
+    """Packs several messages to the same receiver into one envelope message.
+
+    The envelope has the receiver and sender of the first message. Its payload
+    holds the body, thread and metadata of each message, and its sender if it
+    is not the sender of the envelope.
+
+    Args:
+        messages: Messages to pack.
+
+    Returns:
+        The envelope.
+    """
+    sender = messages[0].sender
+    envelope = Message(
+        to=messages[0].to,
+        sender=sender,
+        metadata={ENVELOPE_METADATA: str(len(messages))},
+    )
+    envelope.set_payload(
+        [
+            [
+                msg.body,
+                msg.thread,
+                msg.metadata,
+                None if msg.sender in (None, sender) else str(msg.sender),
+            ]
+            for msg in messages
+        ]
+    )
+    return envelope
+
+
+def unpack_envelope(envelope: Message) -> List[Message]:
+    """Unpacks the messages of an envelope.
+
+    Args:
+        envelope: Envelope created by :func:`pack_envelope`.
+
+    Returns:
+        The messages, with the receiver of the envelope and their own sender.
+    """
+    return [
+        Message(
+            to=envelope.to,
+            sender=sender if sender is not None else envelope.sender,
+            body=body,
+            thread=thread,
+            metadata=metadata,
+        )
+        for body, thread, metadata, sender in envelope.payload
+    ]
@@ -0,0 +1,127 @@
+import asyncio
+from typing import Dict, List, Tuple
+
+from peak.logging import getLogger
+from peak.message import Message, pack_envelope
+
+logger = getLogger(__name__)
+
+
+class Outbox:
+    """Coalesces the outgoing messages of an agent.
+
+    Messages sent to the same receiver (or community) within a time window are
+    sent together in a single envelope stanza, which the receiving agent unpacks
+    and dispatches as if the messages had been sent one by one. A batch is sent
+    when the window ends or when it reaches the maximum number of messages.
+    Batches that the transport fails to send are put back in front of the
+    receiver's pending messages and retried every `retry_delay` seconds, up to
+    `max_retries` times, after which their messages are discarded.
+
+    The outbox is used by the agent's behaviours once it is enabled with
+    :meth:`peak.Agent.enable_outbox`. Messages delivered to agents in the same
+    process do not go through the outbox.
+
+    Attributes:
+        window (float): Seconds a message waits for others to the same receiver.
+        max_messages (int): Maximum number of messages in an envelope.
+        max_retries (int): Maximum number of retries of a batch.
+        retry_delay (float): Seconds to wait before retrying a batch.
+        messages_sent (int): Number of messages sent.
+        stanzas_sent (int): Number of stanzas sent.
+        send_failures (int): Number of stanzas the transport failed to send.
+        messages_failed (int): Number of messages discarded after the retries.
+    """
+
+    def __init__(
+        self,
+        agent,
+        window: float = 0.01,
+        max_messages: int = 64,
+        max_retries: int = 3,
+        retry_delay: float = 1.0,
+    ):
+        self.agent = agent
+        self.window = window
+        self.max_messages = max_messages
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.messages_sent = 0
+        self.stanzas_sent = 0
+        self.send_failures = 0
+        self.messages_failed = 0
+        self._batches: Dict[Tuple[str, bool], List[Message]] = {}
+        self._timers: Dict[Tuple[str, bool], asyncio.TimerHandle] = {}
+        self._retries: Dict[Tuple[str, bool], int] = {}
+
+    async def send(self, msg: Message, community: bool = False):
+        """Adds a message to the batch of its receiver.
+
+        Args:
+            msg: Message to send.
+            community: If True, the message is sent to the community it is
+                addressed to. The agent must be a member of the community.
+        """
+        key = (str(msg.to), community)
+        batch = self._batches.setdefault(key, [])
+        batch.append(msg)
+        if len(batch) >= self.max_messages:
+            await self._flush(key)
+        else:
+            self._schedule(key, self.window)
+
+    async def flush(self):
+        """Sends all the pending messages."""
+        await asyncio.gather(*[self._flush(key) for key in list(self._batches)])
+
+    def _schedule(self, key: Tuple[str, bool], delay: float):
+        if key not in self._timers:
+            self._timers[key] = asyncio.get_running_loop().call_later(
+                delay, self._flush_later, key
+            )
+
+    def _flush_later(self, key: Tuple[str, bool]):
+        self._timers.pop(key, None)
+        asyncio.ensure_future(self._flush(key))
+
+    async def _flush(self, key: Tuple[str, bool]):
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._batches.pop(key, None)
+        if not batch:
+            return
+        if len(batch) > self.max_messages:
+            # a failed batch was put back in front of the new messages
+            self._batches[key] = batch[self.max_messages :]
+            batch = batch[: self.max_messages]
+            self._schedule(key, self.window)
+        to, community = key
+        msg = batch[0] if len(batch) == 1 else pack_envelope(batch)
+        transport = self.agent.transport
+        try:
+            if community:
+                await transport.send_to_community(self.agent.communities[to], msg)
+            else:
+                await transport.send(self.agent, msg)
+        except Exception as error:
+            self.send_failures += 1
+            retries = self._retries.get(key, 0)
+            if retries >= self.max_retries:
+                self._retries.pop(key, None)
+                self.messages_failed += len(batch)
+                logger.error(f"could not send {len(batch)} messages to {to}: {error}")
+                return
+            self._retries[key] = retries + 1
+            logger.warning(
+                f"could not send {len(batch)} messages to {to}, retrying: {error}"
+            )
+            self._batches[key] = batch + self._batches.get(key, [])
+            timer = self._timers.pop(key, None)
+            if timer is not None:
+                timer.cancel()
+            self._schedule(key, self.retry_delay)
+            return
+        self._retries.pop(key, None)
+        self.messages_sent += len(batch)
+        self.stanzas_sent += 1
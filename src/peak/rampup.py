@@ -0,0 +1,186 @@
+import asyncio
+import logging
+import math
+import random
+import time
+from contextlib import nullcontext
+from typing import Tuple
+
+_logger = logging.getLogger(__name__)
+
+
+def retry_delay(attempt: int, backoff: float) -> float:
+    """Exponential backoff with jitter.
+
+    Args:
+        attempt: Number of the failed attempt, starting at 1.
+        backoff: Base delay in seconds.
+
+    Returns:
+        Seconds to wait before the next attempt.
+    """
+    return backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+
+
+class RampUp:
+    """Controls the pace at which the agents of a process connect to the server.
+
+    Limits the number of agents connecting (and running their setup, where they
+    usually join their communities) at the same time and the number of new
+    connections per second. Failed connections are retried after a jittered
+    exponential backoff. Used when the agents share the same event loop.
+
+    Attributes:
+        max_connections (int): Maximum number of agents connecting at the same time.
+            None means no limit.
+        rate (float): Maximum number of new connections per second. None means
+            no limit.
+        retries (int): Number of retries after a failed connection.
+        backoff (float): Base delay in seconds between retries.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = None,
+        rate: float = None,
+        retries: int = 0,
+        backoff: float = 1.0,
+    ):
+        self.max_connections = max_connections
+        self.rate = rate
+        self.retries = retries
+        self.backoff = backoff
+        self._slots = None
+        self._next_connection = 0.0
+
+    def for_processes(self, context) -> "ProcessRampUp":
+        """Creates a controller with the same limits shared by several processes.
+
+        Args:
+            context: Multiprocessing context used to start the processes.
+        """
+        return ProcessRampUp(
+            context, self.max_connections, self.rate, self.retries, self.backoff
+        )
+
+    def split(self, parts: int) -> "RampUp":
+        """Splits the limits between several processes.
+
+        Args:
+            parts: Number of processes.
+
+        Returns:
+            The ramp-up controller of each process.
+        """
+        return RampUp(
+            math.ceil(self.max_connections / parts) if self.max_connections else None,
+            self.rate / parts if self.rate else None,
+            self.retries,
+            self.backoff,
+        )
+
+    async def start(self, agent) -> Tuple[float, int]:
+        """Starts the agent respecting the limits.
+
+        Args:
+            agent: Agent to start.
+
+        Returns:
+            Seconds until the agent was online and number of attempts.
+
+        Raises:
+            The error of the last attempt if the agent could not connect.
+        """
+        if self._slots is None and self.max_connections:
+            self._slots = asyncio.Semaphore(self.max_connections)
+        started_at = time.time()
+        attempt = 1
+        while True:
+            if self._slots is not None:
+                await self._slots.acquire()
+            try:
+                await asyncio.sleep(self._rate_delay())
+                await agent.start()
+                return time.time() - started_at, attempt
+            except Exception as error:
+                if attempt > self.retries:
+                    raise
+                _logger.warning(
+                    f"agent {agent.jid.localpart} failed to connect (attempt {attempt}): {error}"
+                )
+            finally:
+                if self._slots is not None:
+                    self._slots.release()
+            await asyncio.sleep(retry_delay(attempt, self.backoff))
+            attempt += 1
+
+    def _rate_delay(self) -> float:
+        if not self.rate:
+            return 0
+        now = time.monotonic()
+        connection = max(now, self._next_connection)
+        self._next_connection = connection + 1 / self.rate
+        return connection - now
+
+
+class ProcessRampUp:
+    """Same as :class:`RampUp`, shared by agents running in different processes.
+
+    The limits are enforced with multiprocessing primitives, so the agent's
+    process blocks while it waits for its turn.
+    """
+
+    def __init__(
+        self,
+        context,
+        max_connections: int = None,
+        rate: float = None,
+        retries: int = 0,
+        backoff: float = 1.0,
+    ):
+        self.max_connections = max_connections
+        self.rate = rate
+        self.retries = retries
+        self.backoff = backoff
+        self._slots = None
+        if max_connections:
+            self._slots = context.BoundedSemaphore(max_connections)
+        self._next_connection = context.Value("d", 0.0)
+
+    def start(self, agent) -> Tuple[float, int]:
+        """Starts the agent respecting the limits. Blocks until it is online.
+
+        Args:
+            agent: Agent to start.
+
+        Returns:
+            Seconds until the agent was online and number of attempts.
+
+        Raises:
+            The error of the last attempt if the agent could not connect.
+        """
+        started_at = time.time()
+        attempt = 1
+        while True:
+            with self._slots if self._slots is not None else nullcontext():
+                time.sleep(self._rate_delay())
+                try:
+                    agent.start().result()
+                    return time.time() - started_at, attempt
+                except Exception as error:
+                    if attempt > self.retries:
+                        raise
+                    _logger.warning(
+                        f"agent {agent.jid.localpart} failed to connect (attempt {attempt}): {error}"
+                    )
+            time.sleep(retry_delay(attempt, self.backoff))
+            attempt += 1
+
+    def _rate_delay(self) -> float:
+        if not self.rate:
+            return 0
+        with self._next_connection.get_lock():
+            now = time.time()
+            connection = max(now, self._next_connection.value)
+            self._next_connection.value = connection + 1 / self.rate
+        return connection - now
@@ -0,0 +1,291 @@
+"""Recording and replay of the messages received by the agents.
+
+A :class:`Recorder` appends every message delivered to the agents (the clock
+ticks of the Synchronizer included) to a log, one JSON object per line:
+
+    {"t":1718000000.123456,"a":"agent0@localhost/main","s":"sim@conference.localhost/sync","r":"agent0@localhost/main","m":{"sync":"step","period":"3"},"b":"Period 3"}
+
+where `t` is the time of the delivery, `a` the agent that received the
+message, `s` and `r` its sender and receiver, `th` its thread, `m` its metadata
+and `b` its body. The agents of all the processes of a run can append to the
+same log. The recording is enabled with the `record` option of the bootloader.
+
+A :class:`Replayer` feeds one agent, or a subset of the agents, with the
+messages they received in the log, without an XMPP server nor the other agents.
+The agents run with the memory transport and the messages they send are kept
+in :attr:`Replayer.sent` instead of being delivered. Replies to the requests of
+the replayed agents (see :mod:`peak.rpc`) do not match the new requests, since
+each request gets a new identifier.
+"""
+
+import asyncio
+import atexit
+import json
+import os
+import time
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+from peak.agents.synchronizer.telemetry import STEP_TIME_METADATA
+from peak.logging import getLogger
+from peak.message import Message
+from peak.transport import MemoryBroker, MemoryOccupant, MemoryTransport, _Community
+
+logger = getLogger(__name__)
+
+
+class Record(NamedTuple):
+    """Message received by an agent in a recorded run."""
+
+    time: float
+    agent: str
+    message: Message
+
+
+class Recorder:
+    """Appends the messages received by the agents to a log.
+
+    The records are buffered and written at once, in a single append, so that
+    several processes can share the same log. The buffer is written at each
+    clock tick, when it is full, when a record comes `flush_interval` seconds
+    after the last write and when an agent that records to the log stops.
+
+    Attributes:
+        path (str): Path of the log.
+        records (int): Number of messages recorded.
+    """
+
+    def __init__(
+        self, path: str, buffer_size: int = 1 << 16, flush_interval: float = 1.0
+    ):
+        """Opens the log, creating it if needed.
+
+        Args:
+            path: Path of the log.
+            buffer_size: Bytes buffered before they are written.
+            flush_interval: Seconds the records wait in the buffer, at most,
+                while more messages arrive.
+        """
+        self.path = path
+        self.records = 0
+        self._buffer_size = buffer_size
+        self._flush_interval = flush_interval
+        self._flushed = time.monotonic()
+        self._buffer: List[str] = []
+        self._buffered = 0
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def record(self, agent, msg: Message):
+        """Records a message received by an agent."""
+        record = {
+            "t": round(time.time(), 6),
+            "a": str(agent.jid),
+            "s": str(msg.sender) if msg.sender is not None else None,
+            "r": str(msg.to) if msg.to is not None else None,
+        }
+        if msg.thread:
+            record["th"] = msg.thread
+        if msg.metadata:
+            record["m"] = msg.metadata
+        if msg.body is not None:
+            record["b"] = msg.body
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        self._buffer.append(line)
+        self._buffered += len(line)
+        self.records += 1
+        if (
+            self._buffered >= self._buffer_size
+            or "sync" in msg.metadata
+            or time.monotonic() - self._flushed >= self._flush_interval
+        ):
+            self.flush()
+
+    def flush(self):
+        """Writes the buffered records to the log."""
+        if self._buffer and self._fd is not None:
+            os.write(self._fd, "".join(self._buffer).encode())
+        self._buffer.clear()
+        self._buffered = 0
+        self._flushed = time.monotonic()
+
+    def close(self):
+        """Writes the buffered records and closes the log."""
+        self.flush()
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+_recorders: Dict[str, Recorder] = {}
+
+
+def get_recorder(path: str) -> Recorder:
+    """Gets the recorder of a log.
+
+    The agents of a process that record to the same log share the same
+    recorder, which is closed when the process exits.
+    """
+    path = os.path.abspath(path)
+    recorder = _recorders.get(path)
+    if recorder is None:
+        recorder = _recorders[path] = Recorder(path)
+        atexit.register(recorder.close)
+    return recorder
+
+
+def read_records(path: str, agents: Optional[List[str]] = None) -> Iterator[Record]:
+    """Reads the records of a log.
+
+    Args:
+        path: Path of the log.
+        agents: JIDs of the agents whose records are read, full or bare. All the
+            records are read by default.
+    """
+    with open(path) as log:
+        for line in log:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            agent = record["a"]
+            if agents is not None and agent not in agents:
+                if agent.split("/", 1)[0] not in agents:
+                    continue
+            yield Record(
+                record["t"],
+                agent,
+                Message(
+                    to=record.get("r"),
+                    sender=record.get("s"),
+                    body=record.get("b"),
+                    thread=record.get("th"),
+                    metadata=record.get("m"),
+                ),
+            )
+
+
+class _ReplayCommunity(_Community):
+    def deliver(self, sender: MemoryOccupant, msg: Message):
+        self.broker.sent.append(msg.copy(sender=sender.conversation_jid))
+
+
+class _ReplayContainer:
+    """Container of a replayed agent, which sends every message to the broker."""
+
+    def __init__(self, container):
+        self._container = container
+
+    def __getattr__(self, name: str):
+        return getattr(self._container, name)
+
+    async def send(self, msg: Message, behaviour):
+        await behaviour._xmpp_send(msg)
+
+
+class ReplayBroker(MemoryBroker):
+    """Memory broker that keeps the messages sent by the replayed agents.
+
+    Attributes:
+        sent (list of :obj:`Message`): Messages sent by the agents, directly or
+            to their communities.
+    """
+
+    community_class = _ReplayCommunity
+
+    def __init__(self):
+        super().__init__()
+        self.sent: List[Message] = []
+
+    def deliver(self, msg: Message) -> bool:
+        self.sent.append(msg.copy())
+        return True
+
+
+class Replayer:
+    """Feeds agents with the messages they received in a recorded run.
+
+    Example:
+        >>> replayer = Replayer("run.log")
+        >>> await replayer.replay([agent0])
+        >>> replayer.sent  # messages sent by agent0
+
+    Attributes:
+        path (str): Path of the log.
+        speed (float): Speed of the replay relative to the recorded run. None
+            replays the messages as fast as the agents handle them.
+        broker (:obj:`ReplayBroker`): Broker of the replayed agents.
+        fed (int): Number of messages delivered to the agents.
+        ticks (int): Number of clock ticks among them.
+    """
+
+    def __init__(self, path: str, speed: Optional[float] = None):
+        self.path = path
+        self.speed = speed
+        self.broker = ReplayBroker()
+        self.fed = 0
+        self.ticks = 0
+
+    @property
+    def sent(self) -> List[Message]:
+        return self.broker.sent
+
+    def step_times(self) -> List[float]:
+        """Duration of the steps of the agents, from their acknowledgements."""
+        return [
+            float(msg.get_metadata(STEP_TIME_METADATA))
+            for msg in self.sent
+            if msg.get_metadata("sync") == "ack"
+            and msg.get_metadata(STEP_TIME_METADATA)
+        ]
+
+    async def replay(self, agents: list, timeout: float = 10):
+        """Starts the agents, feeds them and waits for them to stop.
+
+        The agents must not be started. They are stopped if they do not stop by
+        themselves (e.g. at the end of the simulation) within `timeout` seconds
+        after the last message.
+
+        Args:
+            agents: Agents to feed, with the JIDs they had in the recorded run.
+            timeout: Seconds to wait for the agents to stop.
+        """
+        transport = MemoryTransport(self.broker)
+        by_jid = {}
+        for agent in agents:
+            agent.transport = transport
+            # the agents of a process send messages to each other through their
+            # container, the replayed agents must only get the recorded ones and
+            # their messages must not reach the other agents
+            agent.container.unregister(agent.jid)
+            agent.set_container(_ReplayContainer(agent.container))
+            by_jid[str(agent.jid)] = by_jid[str(agent.jid.bare())] = agent
+        for agent in agents:
+            await agent.start()
+        started = time.monotonic()
+        first = None
+        for record in read_records(self.path, list(by_jid)):
+            agent = by_jid.get(record.agent) or by_jid[record.agent.split("/", 1)[0]]
+            if self.speed is not None:
+                if first is None:
+                    first = record.time
+                delay = (record.time - first) / self.speed
+                delay -= time.monotonic() - started
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            if not agent.is_alive():
+                continue
+            agent._deliver(record.message)
+            self.fed += 1
+            if record.message.get_metadata("sync") == "step":
+                self.ticks += 1
+            await asyncio.sleep(0)
+        running = [agent for agent in agents if agent.is_alive()]
+        if running:
+            await asyncio.wait(
+                [asyncio.ensure_future(agent.wait_stopped()) for agent in running],
+                timeout=timeout,
+            )
+        for agent in agents:
+            if agent.is_alive():
+                await agent.stop()
+        logger.info(
+            f"Replayed {self.fed} messages ({self.ticks} ticks) in {time.monotonic() - started:.3f}s, {len(self.sent)} messages sent"
+        )
@@ -0,0 +1,86 @@
+"""Request/response messaging between agents.
+
+A request carries a unique identifier in the 'peak:request-id' metadata field. The
+reply created with :meth:`peak.Message.make_reply` carries the same identifier in
+the 'peak:in-reply-to' field, which the requesting agent uses to resolve the request,
+so several requests can be waiting for their replies at the same time.
+"""
+
+import asyncio
+import uuid
+from typing import Dict, Tuple
+
+from peak.logging import getLogger
+
+logger = getLogger(__name__)
+
+REQUEST_METADATA = "peak:request-id"
+REPLY_METADATA = "peak:in-reply-to"
+
+
+class PendingRequests:
+    """Requests of an agent waiting for their replies.
+
+    Attributes:
+        sent (int): Number of requests sent.
+        replied (int): Number of requests replied.
+        timed_out (int): Number of requests that timed out.
+    """
+
+    def __init__(self):
+        self.sent = 0
+        self.replied = 0
+        self.timed_out = 0
+        self._futures: Dict[str, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._futures)
+
+    def create(self) -> Tuple[str, asyncio.Future]:
+        """Registers a new request.
+
+        Returns:
+            The identifier of the request and the future of its reply.
+        """
+        id = uuid.uuid4().hex
+        future = asyncio.get_running_loop().create_future()
+        self._futures[id] = future
+        self.sent += 1
+        return id, future
+
+    def discard(self, id: str):
+        """Unregisters a request that could not be sent."""
+        future = self._futures.pop(id, None)
+        if future is not None:
+            future.cancel()
+            self.sent -= 1
+
+    async def wait(self, id: str, future: asyncio.Future, timeout: float = None):
+        """Waits for the reply of a request.
+
+        Raises:
+            asyncio.TimeoutError: If the reply did not arrive in time.
+        """
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise
+        finally:
+            self._futures.pop(id, None)
+
+    def resolve(self, msg) -> bool:
+        """Resolves the request replied by the message.
+
+        Args:
+            msg: Message with the 'peak:in-reply-to' metadata field.
+
+        Returns:
+            False if there is no request waiting for the reply.
+        """
+        future = self._futures.pop(msg.metadata[REPLY_METADATA], None)
+        if future is None or future.done():
+            return False
+        future.set_result(msg)
+        self.replied += 1
+        return True
@@ -0,0 +1,252 @@
+import asyncio
+import base64
+import time
+import uuid
+from typing import Callable, Dict, Optional, Union
+
+from peak.logging import getLogger
+from peak.message import Message
+
+logger = getLogger(__name__)
+
+STREAM_METADATA = "peak:stream"
+SEQ_METADATA = "peak:stream-seq"
+LAST_METADATA = "peak:stream-last"
+ACK_METADATA = "peak:stream-ack"
+WINDOW_METADATA = "peak:stream-window"
+ENCODING_METADATA = "peak:stream-encoding"
+
+
+class OutgoingStream:
+    """Sends data to an agent in chunks.
+
+    At most `window` chunks can be waiting to be consumed by the receiver. The
+    receiver acknowledges the chunks as it consumes them, so a slow receiver
+    slows down the sender instead of filling its mailbox.
+
+    Attributes:
+        id (str): Identifier of the transfer.
+        to (str): Receiver of the data.
+        chunk_size (int): Maximum number of characters (or bytes) of each chunk.
+        window (int): Maximum number of unacknowledged chunks.
+        timeout (float): Seconds to wait for an acknowledgement.
+    """
+
+    def __init__(
+        self,
+        to: str,
+        chunk_size: int = 32768,
+        window: int = 8,
+        timeout: float = 60,
+    ):
+        self.id = uuid.uuid4().hex
+        self.to = to
+        self.chunk_size = chunk_size
+        self.window = window
+        self.timeout = timeout
+        self.acked = -1
+        self._ack = asyncio.Event()
+
+    async def send(self, behaviour, data: Union[str, bytes], metadata: dict = None):
+        """Sends the data through the behaviour.
+
+        Args:
+            behaviour: Behaviour used to send the chunks.
+            data: Data to send.
+            metadata: Metadata of the first chunk, used by the receiver to match
+                the transfer with its templates.
+
+        Raises:
+            asyncio.TimeoutError: If the receiver stops acknowledging the chunks.
+        """
+        binary = isinstance(data, bytes)
+        chunks = [
+            data[start : start + self.chunk_size]
+            for start in range(0, len(data), self.chunk_size)
+        ] or [data]
+        for seq, chunk in enumerate(chunks):
+            while seq - self.acked > self.window:
+                self._ack.clear()
+                await asyncio.wait_for(self._ack.wait(), self.timeout)
+            chunk_metadata = {STREAM_METADATA: self.id, SEQ_METADATA: str(seq)}
+            if seq == 0:
+                chunk_metadata |= (metadata or {}) | {WINDOW_METADATA: str(self.window)}
+                if binary:
+                    chunk_metadata[ENCODING_METADATA] = "base64"
+            if seq == len(chunks) - 1:
+                chunk_metadata[LAST_METADATA] = "true"
+            body = base64.b64encode(chunk).decode("ascii") if binary else chunk
+            await behaviour.send(
+                Message(to=self.to, body=body, metadata=chunk_metadata)
+            )
+
+    def _acknowledged(self, seq: int):
+        self.acked = max(self.acked, seq)
+        self._ack.set()
+
+
+class IncomingStream:
+    """Data received in chunks from another agent.
+
+    The chunks are reassembled in order and can be consumed as they arrive:
+
+        >>> async for chunk in stream:
+        ...     process(chunk)
+
+    or all at once with :meth:`read`.
+
+    Attributes:
+        id (str): Identifier of the transfer.
+        sender (:obj:`JID`): Sender of the data.
+        metadata (dict): Metadata of the first chunk.
+        timeout (float): Seconds to wait for the next chunk.
+    """
+
+    def __init__(self, id: str, on_close: Callable[[], None], timeout: float = 60):
+        self.id = id
+        self.sender = None
+        self.metadata = {}
+        self.timeout = timeout
+        self.behaviour = None
+        self._window = 1
+        self._binary = False
+        self._chunks: Dict[int, str] = {}
+        self._next = 0
+        self._last: Optional[int] = None
+        self._arrived = asyncio.Event()
+        self._on_close = on_close
+        self._active = time.monotonic()
+
+    def _add(self, msg: Message, seq: int):
+        if seq == 0:
+            self.sender = msg.sender
+            self.metadata = msg.metadata
+            self._window = _get_int(msg, WINDOW_METADATA) or 1
+            self._binary = msg.metadata.get(ENCODING_METADATA) == "base64"
+        if LAST_METADATA in msg.metadata:
+            self._last = seq
+        self._chunks[seq] = msg.body or ""
+        self._active = time.monotonic()
+        self._arrived.set()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Union[str, bytes]:
+        if self._last is not None and self._next > self._last:
+            self._on_close()
+            raise StopAsyncIteration
+        while self._next not in self._chunks:
+            self._arrived.clear()
+            try:
+                await asyncio.wait_for(self._arrived.wait(), self.timeout)
+            except asyncio.TimeoutError:
+                self._on_close()
+                raise
+        chunk = self._chunks.pop(self._next)
+        self._active = time.monotonic()
+        if (
+            self._next == self._last
+            or (self._next + 1) % max(1, self._window // 2) == 0
+        ):
+            await self._acknowledge(self._next)
+        self._next += 1
+        return base64.b64decode(chunk) if self._binary else chunk
+
+    async def read(self) -> Union[str, bytes]:
+        """Waits for all the chunks and returns the data."""
+        chunks = [chunk async for chunk in self]
+        return (b"" if self._binary else "").join(chunks)
+
+    async def _acknowledge(self, seq: int):
+        ack = Message(
+            to=self.sender,
+            metadata={STREAM_METADATA: self.id, ACK_METADATA: str(seq)},
+        )
+        await self.behaviour.send(ack)
+
+
+class StreamManager:
+    """Routes the chunks and acknowledgements of the agent's transfers.
+
+    Incoming transfers that neither receive nor deliver a chunk for
+    `idle_timeout` seconds (e.g. transfers never opened by a behaviour, or
+    whose sender stopped) are discarded when the next transfer starts.
+
+    Attributes:
+        outgoing (dict of :obj:`OutgoingStream`): Transfers being sent, by id.
+        incoming (dict of :obj:`IncomingStream`): Transfers being received, by
+            id.
+        idle_timeout (float): Seconds after which an idle incoming transfer is
+            discarded.
+    """
+
+    def __init__(self, idle_timeout: float = 300):
+        self.outgoing: Dict[str, OutgoingStream] = {}
+        self.incoming: Dict[str, IncomingStream] = {}
+        self.idle_timeout = idle_timeout
+
+    def receive(self, msg: Message) -> bool:
+        """Handles a message of a transfer.
+
+        Args:
+            msg: Message with the 'peak:stream' metadata field.
+
+        Returns:
+            True if the message was consumed. The first chunk of a transfer is
+            not consumed, so it can be dispatched to the behaviours. Neither are
+            messages without a valid sequence number or acknowledgement, which
+            are not chunks of a transfer.
+        """
+        id = msg.metadata[STREAM_METADATA]
+        if ACK_METADATA in msg.metadata:
+            ack = _get_int(msg, ACK_METADATA)
+            if ack is None:
+                logger.warning(f"Ignoring invalid acknowledgement of transfer {id}")
+                return False
+            stream = self.outgoing.get(id)
+            if stream is not None:
+                stream._acknowledged(ack)
+            return True
+        seq = _get_int(msg, SEQ_METADATA)
+        if seq is None:
+            logger.warning(f"Ignoring invalid chunk of transfer {id}")
+            return False
+        if id not in self.incoming:
+            self._discard_idle()
+            self.incoming[id] = IncomingStream(id, lambda: self.incoming.pop(id, None))
+        self.incoming[id]._add(msg, seq)
+        return seq != 0
+
+    def open(self, msg: Message, behaviour, timeout: float = 60) -> IncomingStream:
+        """Gets the transfer started by a message.
+
+        Args:
+            msg: First chunk of the transfer.
+            behaviour: Behaviour used to acknowledge the chunks.
+            timeout: Seconds to wait for each chunk.
+
+        Raises:
+            KeyError: If the transfer ended or was discarded.
+        """
+        stream = self.incoming[msg.metadata[STREAM_METADATA]]
+        stream.behaviour = behaviour
+        stream.timeout = timeout
+        return stream
+
+    def _discard_idle(self):
+        idle_since = time.monotonic() - self.idle_timeout
+        for id, stream in list(self.incoming.items()):
+            if stream._active < idle_since:
+                del self.incoming[id]
+                logger.warning(
+                    f"Transfer {id} from {stream.sender} discarded after {self.idle_timeout}s idle"
+                )
+
+
+def _get_int(msg: Message, key: str) -> Optional[int]:
+    """Gets a non-negative integer metadata field, None if missing or invalid."""
+    value = msg.get_metadata(key)
+    if value is None or not value.isdecimal():
+        return None
+    return int(value)
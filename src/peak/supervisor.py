@@ -0,0 +1,192 @@
+import logging
+import time
+from multiprocessing.connection import wait
+from typing import Callable, Dict, List, Optional
+
+from peak.rampup import retry_delay
+
+_logger = logging.getLogger(__name__)
+
+RESTART_POLICIES = ("never", "on-failure", "always")
+
+
+class _Child:
+    """A supervised process and its history."""
+
+    def __init__(self, name: str, target: Callable, args: tuple, kwargs: dict):
+        self.name = name
+        self.target = target
+        self.args = args
+        self.kwargs = kwargs
+        self.process = None
+        self.started_at = None
+        self.uptime = 0.0
+        self.exitcode = None
+        self.restarts = 0
+        self.failures = 0
+        self.restart_at = None
+
+
+class Supervisor:
+    """Starts processes and supervises them from a single loop.
+
+    The supervisor waits on the sentinels of all the processes at the same time,
+    so each exit is handled as soon as it happens. Depending on the restart policy
+    a process that exits is started again after a jittered exponential backoff:
+
+        'never': processes are never restarted.
+        'on-failure': processes are restarted if they exit with a non-zero code.
+        'always': processes are always restarted.
+
+    The backoff grows with each consecutive restart and is reset when a process
+    stays up for longer than `reset_after` seconds.
+
+    The supervisor can also receive the reports sent by the processes through a
+    report channel (see :class:`peak.bootloader._ReportChannel`).
+    """
+
+    def __init__(
+        self,
+        context,
+        restart: str = "never",
+        max_restarts: Optional[int] = None,
+        backoff: float = 1.0,
+        reset_after: float = 60.0,
+        reports=None,
+        on_report: Callable = None,
+        on_exit: Callable[[str, int], None] = None,
+    ):
+        """Inits the supervisor.
+
+        Args:
+            context: Multiprocessing context used to start the processes.
+            restart: Restart policy.
+            max_restarts: Maximum number of restarts of each process. None means
+                no limit.
+            backoff: Base delay in seconds before restarting a process.
+            reset_after: Uptime in seconds after which the backoff is reset.
+            reports: Channel through which the processes report.
+            on_report: Called with the items of each report received.
+            on_exit: Called with the name and exit code of a process every time
+                it exits.
+        """
+        if restart not in RESTART_POLICIES:
+            raise ValueError(
+                f"restart policy must be one of {RESTART_POLICIES}, not '{restart}'"
+            )
+        self.context = context
+        self.restart = restart
+        self.max_restarts = max_restarts
+        self.backoff = backoff
+        self.reset_after = reset_after
+        self.reports = reports
+        self.on_report = on_report
+        self.on_exit = on_exit
+        self.children: List[_Child] = []
+
+    def start(self, name: str, target: Callable, args: tuple = (), kwargs: dict = None):
+        """Starts a supervised process.
+
+        The target is called with the keyword argument `launched_at`, the time at
+        which the process was launched.
+
+        Args:
+            name: Name of the process.
+            target: Function executed by the process.
+            args: Positional arguments of the target.
+            kwargs: Keyword arguments of the target.
+        """
+        child = _Child(name, target, args, kwargs or {})
+        self.children.append(child)
+        self._launch(child)
+
+    def _launch(self, child: _Child):
+        child.started_at = time.time()
+        child.restart_at = None
+        child.process = self.context.Process(
+            target=child.target,
+            args=child.args,
+            kwargs=child.kwargs | {"launched_at": child.started_at},
+            daemon=False,
+            name=child.name,
+        )
+        child.process.start()
+
+    def run(self):
+        """Supervises the processes until all of them have ended for good.
+
+        Logs the exit code and uptime of every process at the end.
+        """
+        try:
+            self._supervise()
+        except KeyboardInterrupt:
+            for child in self.children:
+                if child.process.is_alive():
+                    child.process.join()
+                    self._exited(child)
+            self._log_summary()
+            raise
+        self._log_summary()
+
+    def _supervise(self):
+        running: Dict[int, _Child] = {
+            child.process.sentinel: child
+            for child in self.children
+            if child.exitcode is None
+        }
+        waiting: List[_Child] = []
+        while running or waiting:
+            timeout = None
+            if waiting:
+                timeout = max(0, min(c.restart_at for c in waiting) - time.time())
+            objects = list(running)
+            if self.reports is not None:
+                objects.append(self.reports.reader)
+            for ready in wait(objects, timeout):
+                if self.reports is not None and ready is self.reports.reader:
+                    report = self.reports.recv()
+                    if self.on_report is not None:
+                        self.on_report(*report)
+                    continue
+                child = running.pop(ready)
+                self._exited(child)
+                if self._should_restart(child):
+                    delay = retry_delay(child.failures, self.backoff)
+                    child.restart_at = time.time() + delay
+                    waiting.append(child)
+                    _logger.info(f"restarting {child.name} in {delay:.1f}s")
+            for child in [c for c in waiting if c.restart_at <= time.time()]:
+                waiting.remove(child)
+                child.restarts += 1
+                self._launch(child)
+                running[child.process.sentinel] = child
+
+    def _exited(self, child: _Child):
+        child.process.join()
+        child.exitcode = child.process.exitcode
+        uptime = time.time() - child.started_at
+        child.uptime += uptime
+        child.failures = 1 if uptime >= self.reset_after else child.failures + 1
+        if child.exitcode != 0:
+            _logger.error(
+                f"{child.name}'s process ended with exitcode {child.exitcode} (uptime {uptime:.1f}s)"
+            )
+        else:
+            _logger.info(f"{child.name}'s process ended (uptime {uptime:.1f}s)")
+        if self.on_exit is not None:
+            self.on_exit(child.name, child.exitcode)
+
+    def _should_restart(self, child: _Child) -> bool:
+        if self.max_restarts is not None and child.restarts >= self.max_restarts:
+            return False
+        if self.restart == "always":
+            return True
+        return self.restart == "on-failure" and child.exitcode != 0
+
+    def _log_summary(self):
+        failed = [child for child in self.children if child.exitcode != 0]
+        _logger.info(f"{len(self.children)} processes ended, {len(failed)} with errors")
+        for child in self.children:
+            _logger.info(
+                f"{child.name}: exitcode {child.exitcode}, uptime {child.uptime:.1f}s, {child.restarts} restarts"
+            )
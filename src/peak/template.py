@@ -1,6 +1,11 @@
-from typing import Type
+import logging
+import weakref
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple, Type
 
+from spade.template import ANDTemplate, NOTTemplate, ORTemplate
 from spade.template import Template as _Template
+from spade.template import XORTemplate
 
 from peak.logging import getLogger
 from peak.message import MessageBase
@@ -9,7 +14,15 @@ logger = getLogger(__name__)
 
 
 class Template(MessageBase, _Template):
-    """PEAK's template for matching messages."""
+    """PEAK's template for matching messages.
+
+    Changing the template (its fields, or its metadata with :meth:`set_metadata`)
+    marks the :class:`TemplateIndex` it was compiled into as stale.
+    """
+
+    def __setattr__(self, name: str, value) -> None:
+        super().__setattr__(name, value)
+        self._changed()
 
     def set_metadata(self, key: str, value: str = None) -> None:
         """
@@ -25,6 +38,7 @@ class Template(MessageBase, _Template):
         if value is not None and not isinstance(value, str):
             raise TypeError("'value' of metadata MUST be string or None")
         self.metadata[key] = value
+        self._changed()
 
     def match(self, message: Type["MessageBase"]) -> bool:
         """
@@ -70,5 +84,181 @@ class Template(MessageBase, _Template):
             if value is not None and message.get_metadata(key) != value:
                 return False
 
-        logger.debug(f"message matched {self} == {message}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"message matched {self} == {message}")
         return True
+
+    def _watch(self, index: "TemplateIndex"):
+        self.__dict__.setdefault("_indexes", weakref.WeakSet()).add(index)
+
+    def _changed(self):
+        for index in self.__dict__.get("_indexes", ()):
+            index.stale = True
+
+    def compile(self) -> Callable[[MessageBase], bool]:
+        """
+        Compiles the template into a predicate equivalent to :meth:`match`.
+
+        The predicate only checks the fields set in the template. Changes made to
+        the template afterwards are not reflected in the predicate.
+
+        Returns:
+          a function that returns wether a message matches the template
+
+        """
+        to = _jid_predicate(self.to, "to")
+        sender = _jid_predicate(self.sender, "sender")
+        body = self.body
+        thread = self.thread
+        exact = tuple((k, v) for k, v in self.metadata.items() if v is not None)
+        present = tuple(k for k, v in self.metadata.items() if v is None)
+
+        def predicate(message: MessageBase) -> bool:
+            metadata = message.metadata
+            for key, value in exact:
+                if metadata.get(key) != value:
+                    return False
+            for key in present:
+                if key not in metadata:
+                    return False
+            if body and message.body != body:
+                return False
+            if thread and message.thread != thread:
+                return False
+            if to is not None and not to(message):
+                return False
+            if sender is not None and not sender(message):
+                return False
+            return True
+
+        return predicate
+
+
+def _jid_predicate(jid, field: str) -> Optional[Callable[[MessageBase], bool]]:
+    if not jid:
+        return None
+    domain, localpart, resource = jid.domain, jid.localpart, jid.resource
+
+    def predicate(message: MessageBase) -> bool:
+        other = getattr(message, field)
+        return (
+            other is not None
+            and other.domain == domain
+            and (not localpart or other.localpart == localpart)
+            and (not resource or other.resource == resource)
+        )
+
+    return predicate
+
+
+def compile_template(template) -> Callable[[MessageBase], bool]:
+    """Compiles a template, including `&`, `|`, `^` and `~` composites, into a predicate.
+
+    Templates other than PEAK's are matched with their own `match` method.
+
+    Args:
+        template: Template to compile. None matches every message.
+
+    Returns:
+        A function that returns wether a message matches the template.
+    """
+    if template is None:
+        return lambda message: True
+    if isinstance(template, Template):
+        return template.compile()
+    if isinstance(template, NOTTemplate):
+        expr = compile_template(template.expr)
+        return lambda message: not expr(message)
+    if isinstance(template, (ANDTemplate, ORTemplate, XORTemplate)):
+        expr1 = compile_template(template.expr1)
+        expr2 = compile_template(template.expr2)
+        if isinstance(template, ANDTemplate):
+            return lambda message: expr1(message) and expr2(message)
+        if isinstance(template, ORTemplate):
+            return lambda message: expr1(message) or expr2(message)
+        return lambda message: expr1(message) != expr2(message)
+    return template.match
+
+
+def _watch_template(template, index: "TemplateIndex"):
+    """Marks the index as stale when PEAK's templates in the template change."""
+    if isinstance(template, Template):
+        template._watch(index)
+    elif isinstance(template, NOTTemplate):
+        _watch_template(template.expr, index)
+    elif isinstance(template, (ANDTemplate, ORTemplate, XORTemplate)):
+        _watch_template(template.expr1, index)
+        _watch_template(template.expr2, index)
+
+
+def _overrides_match(behaviour) -> bool:
+    """Whether the behaviour's class overrides SPADE's `match`."""
+    for cls in type(behaviour).__mro__:
+        if "match" in vars(cls):
+            return not cls.__module__.startswith("spade.")
+    return False
+
+
+def _exact_metadata(template) -> Dict[str, str]:
+    """Metadata values that every message matched by the template must have."""
+    if isinstance(template, _Template):
+        return {k: v for k, v in template.metadata.items() if v is not None}
+    if isinstance(template, ANDTemplate):
+        return _exact_metadata(template.expr1) | _exact_metadata(template.expr2)
+    return {}
+
+
+class TemplateIndex:
+    """Finds the behaviours whose template matches a message.
+
+    The templates are compiled (see :func:`compile_template`) and the behaviours
+    are indexed by one of the metadata values their templates require, such as
+    'resource' or 'sync'. Only the behaviours indexed under the values of the
+    message, and the ones that could not be indexed, are matched against it.
+
+    Behaviours that override `match` are not indexed and their own `match` is
+    used instead of their template.
+
+    The templates are compiled when the index is built, so the index must be
+    built again when a template changes. The agents do it when a behaviour is
+    added or removed, when the template of a behaviour is set and when the index
+    is stale, i.e. one of PEAK's templates it compiled was changed.
+
+    Attributes:
+        stale (bool): Whether a template changed since the index was built.
+    """
+
+    def __init__(self, behaviours: list):
+        self.stale = False
+        custom = [_overrides_match(behaviour) for behaviour in behaviours]
+        exact = [
+            {} if overridden else _exact_metadata(behaviour.template)
+            for behaviour, overridden in zip(behaviours, custom)
+        ]
+        frequency = Counter(key for metadata in exact for key in metadata)
+        self.unindexed: List[Tuple[int, object, Callable]] = []
+        self.index: Dict[str, Dict[str, List[Tuple[int, object, Callable]]]] = {}
+        for position, (behaviour, metadata) in enumerate(zip(behaviours, exact)):
+            _watch_template(behaviour.template, self)
+            if custom[position]:
+                match = behaviour.match
+            else:
+                match = compile_template(behaviour.template)
+            entry = (position, behaviour, match)
+            if not metadata:
+                self.unindexed.append(entry)
+                continue
+            key = max(metadata, key=lambda key: frequency[key])
+            self.index.setdefault(key, {}).setdefault(metadata[key], []).append(entry)
+
+    def match(self, message: MessageBase) -> list:
+        """Returns the behaviours whose template matches the message, in order."""
+        candidates = list(self.unindexed)
+        metadata = message.metadata
+        for key, values in self.index.items():
+            value = metadata.get(key)
+            if value is not None:
+                candidates.extend(values.get(value, ()))
+        if len(candidates) > 1:
+            candidates.sort(key=lambda entry: entry[0])
+        return [behaviour for _, behaviour, match in candidates if match(message)]
@@ -0,0 +1,347 @@
+"""Transports used by the agents to exchange messages.
+
+By default the agents connect to an XMPP server, which routes their messages and
+hosts their communities ('xmpp' transport). Simulations where all the agents run
+in the same process can use the 'memory' transport instead: the agents do not
+connect to any server and an in-process :class:`MemoryBroker` delivers the
+direct messages, hosts the communities and keeps their members, so messages are
+delivered without being serialized.
+
+The transport of an agent is set before it starts:
+
+    >>> agent.transport = get_transport("memory")
+
+or for all the agents with the `transport` option of the bootloader.
+"""
+
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+import aioxmpp
+import spade
+from aioxmpp import JID
+from aioxmpp.callbacks import AdHocSignal, first_signal
+from aioxmpp.disco.xso import Item
+
+from peak.jid_cache import parse_jid
+from peak.logging import getLogger
+from peak.message import Message
+
+logger = getLogger(__name__)
+
+TRANSPORTS = ("xmpp", "memory")
+
+
+class Transport(ABC):
+    """Base class of the transports.
+
+    Attributes:
+        name (str): Name of the transport.
+    """
+
+    name: str
+
+    @abstractmethod
+    async def start(self, agent, auto_register: bool = True):
+        """Connects the agent and starts its behaviours."""
+
+    @abstractmethod
+    async def stop(self, agent):
+        """Kills the behaviours of the agent and disconnects it."""
+
+    @abstractmethod
+    async def send(self, agent, msg: Message):
+        """Sends a message to an agent."""
+
+    @abstractmethod
+    async def join(self, agent, jid: str):
+        """Joins a community and returns its room.
+
+        Raises:
+            Exception if the agent could not join the community.
+        """
+
+    @abstractmethod
+    async def send_to_community(self, room, msg: Message):
+        """Sends a message to a community the agent is a member of."""
+
+    @abstractmethod
+    async def list_communities(self, agent, node_jid: str) -> list:
+        """Lists the communities hosted in a domain."""
+
+
+class XMPPTransport(Transport):
+    """Exchanges the messages through an XMPP server."""
+
+    name = "xmpp"
+
+    async def start(self, agent, auto_register: bool = True):
+        await spade.agent.Agent._async_start(agent, auto_register)
+
+    async def stop(self, agent):
+        await spade.agent.Agent._async_stop(agent)
+
+    async def send(self, agent, msg: Message):
+        await agent.client.send(msg.prepare())
+
+    async def join(self, agent, jid: str) -> aioxmpp.muc.Room:
+        room, _ = agent._muc_client.join(parse_jid(jid), agent.name)
+        await first_signal(room.on_enter, room.on_failure)
+        return room
+
+    async def send_to_community(self, room: aioxmpp.muc.Room, msg: Message):
+        await room.send_message(msg.prepare())
+
+    async def list_communities(self, agent, node_jid: str) -> List[Item]:
+        info = await agent._disco.query_items(parse_jid(node_jid), require_fresh=True)
+        return info.items
+
+
+class MemoryOccupant:
+    """Member of a :class:`MemoryRoom`, like :class:`aioxmpp.muc.Occupant`.
+
+    Attributes:
+        nick (str): Nickname of the member in the community.
+        conversation_jid (:obj:`JID`): JID of the member in the community.
+        direct_jid (:obj:`JID`): JID of the member's agent.
+        is_self (bool): Whether the member is the agent that owns the room.
+    """
+
+    def __init__(self, room_jid: JID, nick: str, agent, is_self: bool = False):
+        self.nick = nick
+        self.direct_jid = agent.jid
+        self.is_self = is_self
+        self.agent = agent
+        self._room_jid = room_jid
+        self._conversation_jid = None
+
+    @property
+    def conversation_jid(self) -> JID:
+        if self._conversation_jid is None:
+            self._conversation_jid = self._room_jid.replace(resource=self.nick)
+        return self._conversation_jid
+
+    def __repr__(self):
+        return f"<MemoryOccupant {self.conversation_jid}>"
+
+
+class MemoryRoom:
+    """Community hosted by a :class:`MemoryBroker`, as seen by one of its members.
+
+    Like :class:`aioxmpp.muc.Room`, the room signals the members that join
+    (`on_join`) and leave (`on_leave`) the community, and the messages sent to
+    the community are delivered to all its members, the sender included.
+
+    Attributes:
+        jid (:obj:`JID`): JID of the community.
+        me (:obj:`MemoryOccupant`): The agent's membership.
+    """
+
+    def __init__(self, community: "_Community", me: MemoryOccupant):
+        self.jid = community.jid
+        self.me = me
+        self.on_join = AdHocSignal()
+        self.on_leave = AdHocSignal()
+        self.on_exit = AdHocSignal()
+        self._community = community
+
+    @property
+    def members(self) -> List[MemoryOccupant]:
+        """Members of the community. The agent is the first item in the list."""
+        return [self.me] + [
+            MemoryOccupant(self.jid, room.me.nick, room.me.agent)
+            for room in self._community.rooms.values()
+            if room is not self
+        ]
+
+    async def send_message(self, msg: Message):
+        """Sends a message to all the members of the community."""
+        self._community.deliver(self.me, msg)
+
+    async def leave(self):
+        """Leaves the community."""
+        self._community.leave(self)
+        self.on_exit()
+
+
+class _Community:
+    """Community of a :class:`MemoryBroker` and the rooms of its members."""
+
+    def __init__(self, broker: "MemoryBroker", jid: JID):
+        self.broker = broker
+        self.jid = jid
+        self.rooms: Dict[str, MemoryRoom] = {}
+
+    def join(self, agent, nick: str) -> MemoryRoom:
+        if nick in self.rooms:
+            raise ValueError(f"nickname '{nick}' is already in use in {self.jid}")
+        room = MemoryRoom(self, MemoryOccupant(self.jid, nick, agent, True))
+        others = list(self.rooms.values())
+        self.rooms[nick] = room
+        for other in others:
+            other.on_join(MemoryOccupant(self.jid, nick, agent))
+        return room
+
+    def leave(self, room: MemoryRoom):
+        if self.rooms.get(room.me.nick) is not room:
+            return
+        del self.rooms[room.me.nick]
+        self.broker._left(room)
+        for other in list(self.rooms.values()):
+            other.on_leave(room.me)
+        if not self.rooms:
+            self.broker.communities.pop(str(self.jid), None)
+
+    def deliver(self, sender: MemoryOccupant, msg: Message):
+        for room in list(self.rooms.values()):
+            room.me.agent._deliver(
+                msg.copy(to=room.me.direct_jid, sender=sender.conversation_jid)
+            )
+
+
+class MemoryBroker:
+    """Routes the messages of the agents of a process without an XMPP server.
+
+    Attributes:
+        agents (dict of Agent): Running agents by full JID.
+        communities (dict): Communities by JID.
+        undelivered (int): Number of messages addressed to unknown agents.
+    """
+
+    community_class = _Community
+
+    def __init__(self):
+        self.agents: Dict[str, object] = {}
+        self.communities: Dict[str, _Community] = {}
+        self.undelivered = 0
+        self._bare: Dict[str, List[object]] = {}
+        self._rooms: Dict[str, List[MemoryRoom]] = {}
+
+    def register(self, agent):
+        self.agents[str(agent.jid)] = agent
+        self._bare.setdefault(str(agent.jid.bare()), []).append(agent)
+
+    def unregister(self, agent):
+        self.agents.pop(str(agent.jid), None)
+        bare = str(agent.jid.bare())
+        agents = self._bare.get(bare, [])
+        if agent in agents:
+            agents.remove(agent)
+        if not agents:
+            self._bare.pop(bare, None)
+        for room in list(self._rooms.get(str(agent.jid), [])):
+            room._community.leave(room)
+
+    def deliver(self, msg: Message) -> bool:
+        """Delivers a message to the agent it is addressed to.
+
+        Messages addressed to a bare JID are delivered to one of the agents with
+        that JID.
+
+        Returns:
+            False if there is no such agent.
+        """
+        to = str(msg.to)
+        agent = self.agents.get(to)
+        if agent is None and to in self._bare:
+            agent = self._bare[to][0]
+        if agent is None:
+            self.undelivered += 1
+            logger.warning(f"No agent {to} in this process, message discarded")
+            return False
+        agent._deliver(msg.copy())
+        return True
+
+    def join(self, agent, jid: str, nick: str) -> MemoryRoom:
+        room_jid = parse_jid(jid).bare()
+        community = self.communities.get(str(room_jid))
+        if community is None:
+            community = self.communities[str(room_jid)] = self.community_class(
+                self, room_jid
+            )
+        room = community.join(agent, nick)
+        self._rooms.setdefault(str(agent.jid), []).append(room)
+        return room
+
+    def _left(self, room: MemoryRoom):
+        rooms = self._rooms.get(str(room.me.direct_jid), [])
+        if room in rooms:
+            rooms.remove(room)
+        if not rooms:
+            self._rooms.pop(str(room.me.direct_jid), None)
+
+
+class MemoryTransport(Transport):
+    """Exchanges the messages through a :class:`MemoryBroker`.
+
+    All the agents that talk to each other must run in the same process and use
+    the same broker.
+    """
+
+    name = "memory"
+
+    def __init__(self, broker: MemoryBroker):
+        self.broker = broker
+
+    async def start(self, agent, auto_register: bool = True):
+        self.broker.register(agent)
+        await agent.setup()
+        agent._alive.set()
+        for behaviour in agent.behaviours:
+            if not behaviour.is_running:
+                behaviour.set_agent(agent)
+                if isinstance(behaviour, spade.behaviour.FSMBehaviour):
+                    for state in behaviour.get_states().values():
+                        state.set_agent(agent)
+                behaviour.start()
+
+    async def stop(self, agent):
+        for behaviour in agent.behaviours:
+            behaviour.kill()
+        if agent.web.is_started():
+            await agent.web.runner.cleanup()
+        self.broker.unregister(agent)
+        agent.communities.clear()
+        agent._alive.clear()
+
+    async def send(self, agent, msg: Message):
+        self.broker.deliver(msg)
+
+    async def join(self, agent, jid: str) -> MemoryRoom:
+        return self.broker.join(agent, jid, agent.name)
+
+    async def send_to_community(self, room: MemoryRoom, msg: Message):
+        await room.send_message(msg)
+
+    async def list_communities(self, agent, node_jid: str) -> List[Item]:
+        domain = parse_jid(node_jid).domain
+        return [
+            Item(community.jid)
+            for community in self.broker.communities.values()
+            if community.jid.domain == domain
+        ]
+
+
+_xmpp_transport = XMPPTransport()
+_memory_broker: Optional[MemoryBroker] = None
+
+
+def get_transport(name: str = "xmpp") -> Transport:
+    """Gets a transport by name.
+
+    The 'memory' transports of a process share the same broker.
+
+    Args:
+        name: 'xmpp' or 'memory'.
+
+    Raises:
+        ValueError: If there is no transport with that name.
+    """
+    global _memory_broker
+    if name == "xmpp":
+        return _xmpp_transport
+    if name == "memory":
+        if _memory_broker is None:
+            _memory_broker = MemoryBroker()
+        return MemoryTransport(_memory_broker)
+    raise ValueError(f"transport must be one of {TRANSPORTS}, not '{name}'")
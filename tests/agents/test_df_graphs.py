@@ -0,0 +1,40 @@
+import asyncio
+import copy
+
+from peak import DF, JID, Agent, CreateGraph, OneShotBehaviour, UpdateGraph
+from peak.transport import MemoryBroker, MemoryTransport
+
+transport = MemoryTransport(MemoryBroker())
+GRAPH = {"title": {"text": "load"}, "series": [{"name": "a", "data": [[0, 1]]}]}
+graph = copy.deepcopy(GRAPH)
+points = {"a": [[1, 2]], "b": [[1, 3]]}
+
+
+class Plotter(Agent):
+    class Plot(OneShotBehaviour):
+        async def run(self):
+            for behaviour in (CreateGraph("load", graph), UpdateGraph("load", points)):
+                self.agent.add_behaviour(behaviour)
+                await behaviour.join()
+            await asyncio.sleep(0.2)
+            await self.agent.stop()
+
+    async def setup(self):
+        self.add_behaviour(self.Plot())
+
+
+df = DF("host", False, None)
+plotter = Plotter(JID("plotter", "host", "main"))
+for agent in (df, plotter):
+    agent.transport = transport
+    agent.start().result()
+assert plotter.join(5)
+df.stop().result()
+
+# the DF updates its own copy of the graph, not the plotter's
+assert df.dataanalysis_data["load"]["series"] == [
+    {"name": "a", "data": [[0, 1], [1, 2]]},
+    {"name": "b", "data": [[1, 3]]},
+]
+assert graph == GRAPH
+assert points == {"a": [[1, 2]], "b": [[1, 3]]}
@@ -0,0 +1,45 @@
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+# the launcher runs in its own interpreter, started outside of the agent's
+# folder, since the forkserver processes import the main module again
+SCRIPT = """
+import sys
+from pathlib import Path
+
+from peak.bootloader import get_launcher
+
+context = get_launcher("forkserver", [{"file": Path(sys.argv[1])}])
+names = ("fsagent", "spade", "aioxmpp", "peak.core")
+probe = f"import sys; open({sys.argv[2]!r}, 'w').write(' '.join(n for n in {names!r} if n in sys.modules))"
+process = context.Process(target=exec, args=(probe,))
+process.start()
+process.join(30)
+sys.exit(process.exitcode)
+"""
+
+folder = tempfile.mkdtemp()
+agent = Path(folder, "fsagent.py")
+agent.write_text("from peak import Agent\n\n\nclass fsagent(Agent):\n    pass\n")
+result = Path(folder, "modules.txt")
+src = Path(__file__).absolute().parents[2] / "src"
+env = dict(os.environ)
+env["PYTHONPATH"] = os.pathsep.join(
+    [str(src)] + [path for path in env.get("PYTHONPATH", "").split(os.pathsep) if path]
+)
+process = subprocess.run(
+    [sys.executable, "-c", SCRIPT, str(agent), str(result)],
+    cwd=tempfile.gettempdir(),
+    env=env,
+    timeout=60,
+)
+assert process.returncode == 0
+
+# the framework and the agent's module are already loaded in the new processes
+assert result.read_text().split() == ["fsagent", "spade", "aioxmpp", "peak.core"]
+os.remove(agent)
+os.remove(result)
+os.rmdir(folder)
@@ -0,0 +1,126 @@
+import asyncio
+import concurrent.futures
+import multiprocessing
+import random
+import time
+
+from peak import JID
+from peak.rampup import RampUp, retry_delay
+
+context = multiprocessing.get_context("fork")
+
+# jittered exponential backoff
+random.seed(0)
+for attempt in range(1, 6):
+    for _ in range(100):
+        delay = retry_delay(attempt, 2.0)
+        assert 2.0 * 2 ** (attempt - 1) * 0.5 <= delay <= 2.0 * 2 ** (attempt - 1) * 1.5
+random.seed(1)
+first = [retry_delay(attempt, 1.0) for attempt in range(1, 4)]
+random.seed(1)
+assert [retry_delay(attempt, 1.0) for attempt in range(1, 4)] == first
+
+# the limits are split between processes
+ramp = RampUp(10, 100.0, 2, 0.5).split(3)
+assert (ramp.max_connections, ramp.rate, ramp.retries, ramp.backoff) == (
+    4,
+    100 / 3,
+    2,
+    0.5,
+)
+assert RampUp().split(3).max_connections is None
+
+
+class FakeAgent:
+    """Agent whose connection takes some time and fails the first attempts."""
+
+    in_flight = 0
+    max_in_flight = 0
+
+    def __init__(self, name: str, failures: int = 0):
+        self.jid = JID(name, "host", "main")
+        self.failures = failures
+        self.attempts = 0
+
+    async def start(self):
+        FakeAgent.in_flight += 1
+        FakeAgent.max_in_flight = max(FakeAgent.max_in_flight, FakeAgent.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            self.attempts += 1
+            if self.attempts <= self.failures:
+                raise ConnectionError("refused")
+        finally:
+            FakeAgent.in_flight -= 1
+
+
+async def start_all(ramp: RampUp, agents: list):
+    return await asyncio.gather(
+        *[ramp.start(agent) for agent in agents], return_exceptions=True
+    )
+
+
+# no more than max_connections agents connect at the same time
+agents = [FakeAgent(f"agent{i}", failures=i % 2) for i in range(12)]
+results = asyncio.run(start_all(RampUp(3, retries=1, backoff=0.001), agents))
+assert FakeAgent.max_in_flight == 3
+assert [attempts for _, attempts in results] == [1, 2] * 6
+
+# agents that fail more than the retries are not started
+results = asyncio.run(start_all(RampUp(retries=1, backoff=0.001), [FakeAgent("a", 2)]))
+assert isinstance(results[0], ConnectionError)
+
+# no more than rate new connections per second
+started = time.monotonic()
+asyncio.run(start_all(RampUp(rate=50), [FakeAgent(f"agent{i}") for i in range(6)]))
+assert time.monotonic() - started >= 5 / 50
+
+
+class ProcessAgent:
+    """Agent of a process that records the connections in flight."""
+
+    def __init__(self, in_flight, max_in_flight, failures: int = 0):
+        self.jid = JID("agent", "host", "main")
+        self.in_flight = in_flight
+        self.max_in_flight = max_in_flight
+        self.failures = failures
+
+    def start(self):
+        with self.in_flight.get_lock():
+            self.in_flight.value += 1
+            with self.max_in_flight.get_lock():
+                self.max_in_flight.value = max(
+                    self.max_in_flight.value, self.in_flight.value
+                )
+        time.sleep(0.05)
+        with self.in_flight.get_lock():
+            self.in_flight.value -= 1
+        future = concurrent.futures.Future()
+        if self.failures:
+            self.failures -= 1
+            future.set_exception(ConnectionError("refused"))
+        else:
+            future.set_result(None)
+        return future
+
+
+def connect(ramp, in_flight, max_in_flight, attempts):
+    _, attempt = ramp.start(ProcessAgent(in_flight, max_in_flight, failures=1))
+    with attempts.get_lock():
+        attempts.value += attempt
+
+
+# the limits are shared by the processes
+ramp = RampUp(2, retries=1, backoff=0.001).for_processes(context)
+in_flight, max_in_flight, attempts = (context.Value("i", 0) for _ in range(3))
+processes = [
+    context.Process(target=connect, args=(ramp, in_flight, max_in_flight, attempts))
+    for _ in range(6)
+]
+for process in processes:
+    process.start()
+for process in processes:
+    process.join(10)
+    assert process.exitcode == 0
+assert max_in_flight.value == 2
+assert attempts.value == 12
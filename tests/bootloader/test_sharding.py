@@ -0,0 +1,38 @@
+from peak import JID
+from peak.bootloader import shard_agents
+
+
+def agents(group, clones):
+    return [
+        {"jid": JID(f"{group}{cid}", "host", "main"), "cid": cid, "group": group}
+        for cid in range(clones)
+    ]
+
+
+def names(shards):
+    return [[agent["jid"].localpart for agent in shard] for shard in shards]
+
+
+shards = shard_agents(agents("a", 5), 2, "round-robin")
+assert names(shards) == [["a0", "a2", "a4"], ["a1", "a3"]]
+
+shards = shard_agents(agents("a", 2), 4, "round-robin")
+assert names(shards) == [["a0"], ["a1"]]
+
+shards = shard_agents(agents("a", 3) + agents("b", 1) + agents("c", 2), 2, "group")
+assert names(shards) == [["a0", "a1", "a2"], ["c0", "c1", "b0"]]
+
+shards = shard_agents(agents("a", 2) + agents("b", 2), 3, "group")
+assert names(shards) == [["a0", "a1"], ["b0", "b1"]]
+
+shards = shard_agents(agents("a", 6), 3, "clone")
+assert names(shards) == [["a0", "a1"], ["a2", "a3"], ["a4", "a5"]]
+
+shards = shard_agents(agents("a", 4) + agents("b", 2), 2, "clone")
+assert names(shards) == [["a0", "a1", "b0", "b1"], ["a2", "a3"]]
+
+try:
+    shard_agents(agents("a", 2), 2, "random")
+    assert False
+except ValueError:
+    pass
@@ -0,0 +1,70 @@
+import multiprocessing
+import sys
+
+from peak.bootloader import bootloader
+from peak.supervisor import Supervisor
+
+context = multiprocessing.get_context("fork")
+
+
+def exit_with(code: int, launched_at: float = None):
+    sys.exit(code)
+
+
+def supervise(restart: str, codes: dict, **options):
+    exits = []
+    supervisor = Supervisor(
+        context,
+        restart,
+        backoff=0.01,
+        on_exit=lambda name, code: exits.append((name, code)),
+        **options,
+    )
+    for name, code in codes.items():
+        supervisor.start(name, exit_with, (code,))
+    supervisor.run()
+    children = {child.name: child for child in supervisor.children}
+    return children, sorted(exits)
+
+
+# processes are never restarted
+children, exits = supervise("never", {"ok": 0, "failed": 1})
+assert exits == [("failed", 1), ("ok", 0)]
+assert children["failed"].restarts == 0 and children["failed"].exitcode == 1
+
+# only the processes that fail are restarted, up to max_restarts times
+children, exits = supervise("on-failure", {"ok": 0, "failed": 3}, max_restarts=2)
+assert exits == [("failed", 3)] * 3 + [("ok", 0)]
+assert children["ok"].restarts == 0
+assert children["failed"].restarts == 2 and children["failed"].exitcode == 3
+# the backoff grows with each consecutive failure
+assert children["failed"].failures == 3
+
+# all the processes are restarted
+children, exits = supervise("always", {"ok": 0, "failed": 1}, max_restarts=1)
+assert exits == [("failed", 1)] * 2 + [("ok", 0)] * 2
+assert children["ok"].restarts == 1 and children["failed"].restarts == 1
+
+# the backoff is reset when a process stays up long enough
+children, _ = supervise("on-failure", {"failed": 1}, max_restarts=2, reset_after=0)
+assert children["failed"].failures == 1
+
+try:
+    Supervisor(context, "sometimes")
+    assert False
+except ValueError:
+    pass
+
+# the agents hosted in the bootloader's process cannot be restarted
+
+for options in (
+    {"transport": "memory"},
+    {"hosting": "shared"},
+    {"hosting": "process", "agents": [{"file": "agent.py"}]},
+):
+    options = {"agents": [{"file": "a.py"}, {"file": "b.py"}]} | options
+    try:
+        bootloader(restart="on-failure", **options)
+        assert False
+    except ValueError:
+        pass
@@ -0,0 +1,84 @@
+import asyncio
+import os
+import threading
+import time
+
+from peak import blocking, configure_executors
+from peak.executors import run_blocking, shutdown_executors
+
+
+def where(delay: float = 0):
+    time.sleep(delay)
+    return threading.current_thread().name
+
+
+@blocking(timeout=0.1)
+def slow():
+    time.sleep(0.3)
+
+
+@blocking(executor="process")
+def pid():
+    return os.getpid()
+
+
+class Model:
+    def __init__(self):
+        self.steps = 0
+
+    @blocking
+    def step(self, n: int):
+        self.steps += n
+        return threading.current_thread().name
+
+
+async def main():
+    results = {}
+    loop_thread = threading.current_thread().name
+
+    # the calls run out of the event loop, which keeps running meanwhile
+    ticks = 0
+
+    async def tick():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    ticker = asyncio.ensure_future(tick())
+    thread = await run_blocking(where, 0.2)
+    ticker.cancel()
+    assert thread != loop_thread and thread.startswith("peak")
+    assert ticks >= 5
+
+    model = Model()
+    assert (await model.step(2)).startswith("peak") and model.steps == 2
+    assert await pid() != os.getpid()
+
+    # timeouts
+    for call in (run_blocking(where, 0.3, timeout=0.1), slow()):
+        try:
+            await call
+            assert False
+        except asyncio.TimeoutError:
+            pass
+
+    # calls queued when the pools are reconfigured still run
+    configure_executors(threads=1)
+    calls = [asyncio.ensure_future(run_blocking(where, 0.1)) for _ in range(3)]
+    await asyncio.sleep(0.05)
+    configure_executors(threads=2)
+    results["queued"] = await asyncio.gather(*calls)
+    results["after"] = await run_blocking(where)
+    return results
+
+
+results = asyncio.run(main())
+assert len(results["queued"]) == 3
+assert results["after"].startswith("peak")
+try:
+    asyncio.run(run_blocking(where, executor="gpu"))
+    assert False
+except ValueError:
+    pass
+shutdown_executors()
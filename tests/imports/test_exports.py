@@ -0,0 +1,125 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# the names exported by the packages before they were loaded lazily, checked in
+# a new interpreter so that no submodule is imported beforehand
+EXPORTS = {
+    "peak": [
+        "agents",
+        "aioxmpp",
+        "asyncio",
+        "behaviours",
+        "core",
+        "create_graph",
+        "directory_facilitator",
+        "dummy_agent",
+        "forms_xso",
+        "join_community",
+        "leave_community",
+        "message",
+        "search_community",
+        "sync_agent",
+        "synchronizer",
+        "template",
+        "Agent",
+        "CreateGraph",
+        "CyclicBehaviour",
+        "DF",
+        "Dict",
+        "DummyAgent",
+        "FORMATTER",
+        "FSMBehaviour",
+        "JID",
+        "JoinCommunity",
+        "LeaveCommunity",
+        "List",
+        "Message",
+        "MessageBase",
+        "MessageType",
+        "OneShotBehaviour",
+        "Optional",
+        "PathLike",
+        "PeriodicBehaviour",
+        "SPADE_X_METADATA",
+        "SearchCommunity",
+        "SyncAgent",
+        "Synchronizer",
+        "Template",
+        "Type",
+        "Union",
+        "configure_cli_logger",
+        "configure_debug_mode",
+        "configure_multiple_agent_logging",
+        "configure_single_agent_logging",
+        "debug",
+        "first_signal",
+        "getFileLogger",
+        "getLogger",
+        "getMainLogger",
+        "log",
+        "logger",
+        "logging",
+        "sys",
+    ],
+    "peak.agents": [
+        "directory_facilitator",
+        "dummy_agent",
+        "sync_agent",
+        "synchronizer",
+        "DF",
+        "DummyAgent",
+        "SyncAgent",
+        "Synchronizer",
+    ],
+    "peak.behaviours": [
+        "create_graph",
+        "join_community",
+        "leave_community",
+        "search_community",
+        "CreateGraph",
+        "JoinCommunity",
+        "LeaveCommunity",
+        "SearchCommunity",
+    ],
+}
+
+SCRIPT = """
+import importlib
+import sys
+
+package, names = sys.argv[1], sys.argv[2:]
+module = importlib.import_module(package)
+assert "spade" not in sys.modules
+missing = [name for name in names if name not in dir(module) or name not in module.__all__]
+assert not missing, missing
+for name in names:
+    getattr(module, name)
+"""
+
+src = Path(__file__).absolute().parents[2] / "src"
+env = dict(os.environ)
+env["PYTHONPATH"] = os.pathsep.join(
+    [str(src)] + [path for path in env.get("PYTHONPATH", "").split(os.pathsep) if path]
+)
+for package, names in EXPORTS.items():
+    process = subprocess.run(
+        [sys.executable, "-c", SCRIPT, package, *names], env=env, timeout=60
+    )
+    assert process.returncode == 0, package
+
+# the lazy names are the same objects as the ones in their modules
+import peak
+import peak.core
+import peak.message
+
+assert peak.core is sys.modules["peak.core"]
+assert peak.MessageType is peak.message.MessageType
+assert peak.agents.synchronizer is sys.modules["peak.agents.synchronizer"]
+
+try:
+    peak.NotAName
+    assert False
+except AttributeError:
+    pass
@@ -0,0 +1,74 @@
+import logging
+import os
+import shutil
+import tempfile
+
+from peak import JID, Agent, CyclicBehaviour, Message, OneShotBehaviour, getLogger
+from peak.logging import AgentLogRouter, agent_context
+from peak.transport import MemoryBroker, MemoryTransport
+
+folder = tempfile.mkdtemp()
+logger = getLogger("test_agent_context")
+router = AgentLogRouter()
+for name in ("sender", "receiver"):
+    router.add_agent(
+        f"{name}@host/main", logging.INFO, os.path.join(folder, f"{name}.log"), "w"
+    )
+peak_logger = logging.getLogger("peak")
+peak_logger.addHandler(router)
+peak_logger.setLevel(logging.INFO)
+
+
+class Receiver(Agent):
+    class Receive(CyclicBehaviour):
+        async def run(self):
+            msg = await self.receive(5)
+            logger.info(f"received {msg.body if msg else None}")
+            await self.agent.stop()
+
+    async def setup(self):
+        self.add_behaviour(self.Receive())
+
+
+class Sender(Agent):
+    class Send(OneShotBehaviour):
+        async def run(self):
+            logger.info("sending")
+            # code run by the sender on behalf of the receiver
+            receiver.add_behaviour(Started())
+            await self.send(Message(to="receiver@host/main", body="hello"))
+            await self.agent.stop()
+
+    async def setup(self):
+        self.add_behaviour(self.Send())
+
+
+class Started(OneShotBehaviour):
+    async def run(self):
+        logger.info("started")
+
+
+transport = MemoryTransport(MemoryBroker())
+receiver = Receiver(JID("receiver", "host", "main"))
+sender = Sender(JID("sender", "host", "main"))
+for agent in (receiver, sender):
+    agent.transport = transport
+    agent.start().result()
+assert sender.join(5)
+assert receiver.join(5)
+with agent_context("sender@host/main"):
+    logger.info("done")
+logger.info("outside of the agents")
+router.close()
+peak_logger.removeHandler(router)
+
+
+def messages(name: str) -> list:
+    with open(os.path.join(folder, f"{name}.log")) as file:
+        return [line.rsplit(" - ", 1)[1].strip() for line in file]
+
+
+# the records of each agent are written to its file, whichever agent ran the code
+assert messages("sender") == ["sending", "done"]
+assert sorted(messages("receiver")) == ["received hello", "started"]
+shutil.rmtree(folder)
@@ -0,0 +1,138 @@
+import asyncio
+
+from peak import JID, Agent, CyclicBehaviour, Message, OneShotBehaviour, Template
+from peak.mailbox import ERROR_METADATA, Mailbox
+from peak.transport import MemoryBroker, MemoryTransport
+
+
+def message(body):
+    return Message(to="b@host/main", sender="a@host/main", body=body)
+
+
+def fill(mailbox, n):
+    return [mailbox.deliver(message(str(i))) for i in range(n)]
+
+
+def bodies(mailbox):
+    return [mailbox.get_nowait().body for _ in range(mailbox.qsize())]
+
+
+mailbox = Mailbox(2, "drop-oldest")
+assert fill(mailbox, 4) == [True, True, True, True]
+assert mailbox.metrics() == {
+    "depth": 2,
+    "max_depth": 2,
+    "received": 4,
+    "dropped": 2,
+    "rejected": 0,
+}
+assert bodies(mailbox) == ["2", "3"]
+
+mailbox = Mailbox(2, "drop-newest")
+assert fill(mailbox, 4) == [True, True, False, False]
+assert mailbox.metrics()["dropped"] == 2
+assert bodies(mailbox) == ["0", "1"]
+
+mailbox = Mailbox(2, "reject")
+assert fill(mailbox, 3) == [True, True, False]
+assert mailbox.metrics()["rejected"] == 1
+assert mailbox.metrics()["dropped"] == 0
+
+
+# the mailbox has the default policy unless configured otherwise
+mailbox = Mailbox(1)
+assert fill(mailbox, 2) == [True, False]
+assert mailbox.overflow == "drop-newest"
+
+for policy in ("random", "block"):
+    try:
+        Mailbox(2, policy)
+        assert False
+    except ValueError:
+        pass
+
+# the senders of the rejected messages get a 'mailbox-full' reply
+broker = MemoryBroker()
+replies = []
+
+
+class Receiver(Agent):
+    class Busy(CyclicBehaviour):
+        mailbox_capacity = 2
+        mailbox_overflow = "reject"
+
+        async def run(self):
+            await asyncio.sleep(1)
+
+    async def setup(self):
+        self.busy = self.Busy()
+        self.add_behaviour(self.busy)
+
+
+class Sender(Agent):
+    class Send(OneShotBehaviour):
+        async def run(self):
+            for i in range(6):
+                await self.send(Message(to="b@host/main", body=str(i)))
+            while len(replies) < 4:
+                reply = await self.receive(1)
+                if reply is None:
+                    break
+                replies.append(reply.get_metadata(ERROR_METADATA))
+            await self.agent.stop()
+
+    async def setup(self):
+        self.add_behaviour(self.Send())
+
+
+receiver = Receiver(JID("b", "host", "main"))
+sender = Sender(JID("a", "host", "main"))
+for agent in (receiver, sender):
+    agent.transport = MemoryTransport(broker)
+    agent.start().result()
+sender.join(5)
+assert replies == ["mailbox-full"] * 4
+assert receiver.busy.mailbox_metrics()["rejected"] == 4
+receiver.stop().result()
+
+
+# the messages dispatched to full mailboxes are handled right away, following
+# the policy of each behaviour
+class Flooded(Agent):
+    class Busy(CyclicBehaviour):
+        mailbox_capacity = 2
+
+        async def run(self):
+            await asyncio.sleep(10)
+
+    async def setup(self):
+        self.busy = {}
+        for policy in ("drop-oldest", "drop-newest", "reject"):
+            behaviour = self.Busy()
+            behaviour.set_mailbox(2, policy)
+            template = Template()
+            template.set_metadata("policy", policy)
+            self.add_behaviour(behaviour, template)
+            self.busy[policy] = behaviour
+
+
+flooded = Flooded(JID("c", "host", "main"))
+flooded.transport = MemoryTransport(broker)
+flooded.start().result()
+for policy in flooded.busy:
+    for i in range(5):
+        msg = Message(to="c@host/main", sender="d@host/main", body=str(i))
+        msg.set_metadata("policy", policy)
+        for future in flooded.dispatch(msg):
+            assert future.result(1) is None
+assert {policy: bodies(b.queue) for policy, b in flooded.busy.items()} == {
+    "drop-oldest": ["3", "4"],
+    "drop-newest": ["0", "1"],
+    "reject": ["0", "1"],
+}
+assert flooded.busy["drop-oldest"].mailbox_metrics()["dropped"] == 3
+assert flooded.busy["drop-newest"].mailbox_metrics()["dropped"] == 3
+assert flooded.busy["reject"].mailbox_metrics()["rejected"] == 3
+# the replies were sent to the unknown sender
+assert broker.undelivered == 3
+flooded.stop().result()
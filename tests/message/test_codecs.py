@@ -0,0 +1,27 @@
+from peak import Message
+from peak.codecs import CODEC_METADATA, Codec, JSONCodec, get_codec
+
+# user metadata is not mistaken for the codec of the payload
+msg = Message(body="frame", metadata={"codec": "h264"})
+assert msg.payload == "frame"
+
+msg = Message()
+msg.set_payload([1, 2], codec="json")
+assert msg.get_metadata(CODEC_METADATA) == "json"
+assert CODEC_METADATA.startswith("peak:")
+assert Message(body=msg.body, metadata=msg.metadata).payload == [1, 2]
+assert isinstance(get_codec("json"), JSONCodec)
+
+# the codecs must implement both directions
+try:
+
+    class EncodeOnly(Codec):
+        name = "encode-only"
+
+        def encode(self, payload):
+            return str(payload)
+
+    EncodeOnly()
+    assert False
+except TypeError:
+    pass
@@ -0,0 +1,55 @@
+from peak import Message, MessagePrototype
+from peak.compression import (
+    ALGORITHMS,
+    COMPRESSED_METADATA,
+    COMPRESSION_METADATA,
+    Compressor,
+    disable_compression,
+    enable_compression,
+)
+
+BODY = "step " * 500
+STATE = "0123456789" * 200
+
+for algorithm in ALGORITHMS:
+    compressor = enable_compression(algorithm, threshold=1024)
+    msg = Message(to="recv@host/main", sender="agent@host/main", body=BODY)
+    msg.set_metadata("state", STATE)
+    msg.set_metadata("small", "x")
+    stanza = msg.prepare()
+    # only the large fields are compressed
+    assert len(stanza.body.any()) < len(BODY)
+    assert compressor.fields_compressed == 2
+    assert compressor.bytes_saved > 0
+
+    received = Message.from_node(stanza)
+    assert received.body == BODY
+    assert received.metadata == {"state": STATE, "small": "x"}
+    assert msg.metadata == {"state": STATE, "small": "x"}
+
+    prototype = MessagePrototype(to="recv@host/main", metadata={"state": STATE})
+    received = Message.from_node(prototype.message(body=BODY).prepare())
+    assert received.body == BODY and received.metadata == {"state": STATE}
+
+# small messages are not compressed
+compressor = enable_compression(threshold=1024)
+stanza = Message(to="recv@host/main", body="small").prepare()
+assert compressor.fields_compressed == 0
+assert Message.from_node(stanza).body == "small"
+
+# the receivers decompress the messages even if compression is disabled here
+stanza = Message(to="recv@host/main", body=BODY).prepare()
+disable_compression()
+assert Message.from_node(stanza).body == BODY
+
+# the metadata keys are namespaced, so user metadata with the same names is kept
+assert COMPRESSION_METADATA.startswith("peak:")
+assert COMPRESSED_METADATA.startswith("peak:")
+msg = Message(to="recv@host/main", body="x", metadata={"compression": "lzma"})
+assert Message.from_node(msg.prepare()).metadata == {"compression": "lzma"}
+
+try:
+    Compressor("gzip")
+    assert False
+except ValueError:
+    pass
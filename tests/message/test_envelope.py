@@ -0,0 +1,102 @@
+import asyncio
+
+from peak import JID, Message
+from peak.message import ENVELOPE_METADATA, pack_envelope, unpack_envelope
+from peak.outbox import Outbox
+
+first = Message(to="recv@host/main", sender="agent@host/main", body="1")
+first.set_metadata("performative", "inform")
+with_payload = Message(to="recv@host/main", sender="agent@host/main", thread="t")
+with_payload.set_payload({"values": [1, 2]})
+other_sender = Message(to="recv@host/main", sender="agent@host/other", body="3")
+no_sender = Message(to="recv@host/main", body="4")
+messages = [first, with_payload, other_sender, no_sender]
+
+envelope = pack_envelope(messages)
+assert envelope.get_metadata(ENVELOPE_METADATA) == "4"
+assert ENVELOPE_METADATA.startswith("peak:")
+assert envelope.to == JID.fromstr("recv@host/main")
+assert envelope.sender == JID.fromstr("agent@host/main")
+
+# the envelope goes through the wire as a regular message
+envelope = Message.from_node(envelope.prepare())
+unpacked = unpack_envelope(envelope)
+assert [str(msg.sender) for msg in unpacked] == [
+    "agent@host/main",
+    "agent@host/main",
+    "agent@host/other",
+    "agent@host/main",
+]
+assert all(str(msg.to) == "recv@host/main" for msg in unpacked)
+assert [msg.body for msg in unpacked] == ["1", with_payload.body, "3", "4"]
+assert [msg.thread for msg in unpacked] == [None, "t", None, None]
+assert unpacked[0].metadata == {"performative": "inform"}
+assert unpacked[1].payload == {"values": [1, 2]}
+
+
+class Transport:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, agent, msg):
+        self.sent.append(msg)
+
+
+class Agent:
+    transport = Transport()
+
+
+async def main():
+    outbox = Outbox(Agent(), window=0.05, max_messages=3)
+    for i in range(4):
+        await outbox.send(Message(to="a@host", sender="agent@host/main", body=str(i)))
+    await outbox.send(Message(to="b@host", sender="agent@host/main", body="b"))
+    # the first batch is full, the others wait for the window
+    assert len(Agent.transport.sent) == 1
+    await asyncio.sleep(0.1)
+    return outbox
+
+
+outbox = asyncio.run(main())
+assert outbox.messages_sent == 5 and outbox.stanzas_sent == 3
+full, rest, single = Agent.transport.sent
+assert [msg.body for msg in unpack_envelope(full)] == ["0", "1", "2"]
+assert ENVELOPE_METADATA not in rest.metadata and rest.body == "3"
+assert single.body == "b"
+
+
+# the batches that fail are retried, and discarded after the retries
+class FailingTransport:
+    def __init__(self, failures):
+        self.failures = failures
+        self.sent = []
+
+    async def send(self, agent, msg):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("disconnected")
+        self.sent.append(msg)
+
+
+async def failing(failures):
+    agent = Agent()
+    agent.transport = FailingTransport(failures)
+    outbox = Outbox(agent, window=0.01, max_messages=2, max_retries=2, retry_delay=0.02)
+    for i in range(3):
+        await outbox.send(Message(to="a@host", sender="agent@host/main", body=str(i)))
+    await asyncio.sleep(0.2)
+    return outbox, agent.transport.sent
+
+
+outbox, sent = asyncio.run(failing(2))
+assert outbox.send_failures == 2 and outbox.messages_failed == 0
+assert outbox.messages_sent == 3 and outbox._batches == {}
+# the failed messages are sent before the newer ones
+full, rest = sent
+assert [msg.body for msg in unpack_envelope(full)] == ["0", "1"]
+assert rest.body == "2"
+
+outbox, sent = asyncio.run(failing(10))
+assert outbox.send_failures == 6
+assert outbox.messages_failed == 3 and outbox.messages_sent == 0
+assert sent == [] and outbox._batches == {}
@@ -0,0 +1,110 @@
+import asyncio
+import os
+import shutil
+import tempfile
+
+from peak import (
+    JID,
+    Agent,
+    CyclicBehaviour,
+    Message,
+    OneShotBehaviour,
+    SyncAgent,
+    Synchronizer,
+)
+from peak.recording import Recorder, Replayer, read_records
+from peak.transport import MemoryBroker, MemoryTransport
+
+GROUP = "sim@conference.host"
+PERIODS = 4
+folder = tempfile.mkdtemp()
+log = os.path.join(folder, "run.log")
+
+
+class Counter(SyncAgent):
+    class Join(OneShotBehaviour):
+        async def run(self):
+            await self.join_community(GROUP)
+
+    async def setup(self):
+        self.periods = []
+        self.add_behaviour(self.Join())
+
+    async def step(self, period, time=None):
+        self.periods.append(period)
+
+
+# record a simulation
+transport = MemoryTransport(MemoryBroker())
+recorder = Recorder(log)
+synchronizer = Synchronizer(JID("sync", "host", "main"))
+synchronizer.transport = transport
+synchronizer.start().result()
+asyncio.run_coroutine_threadsafe(
+    synchronizer.sync_group_period(GROUP, 3, 0, PERIODS, barrier=True, start_timeout=5),
+    synchronizer.loop,
+).result()
+agents = [Counter(JID(f"agent{i}", "host", "main")) for i in range(2)]
+for agent in agents:
+    agent.transport = transport
+    agent.recorder = recorder
+    agent.start().result()
+assert synchronizer.join(10)
+for agent in agents:
+    assert agent.join(5)
+    assert agent.periods == list(range(PERIODS))
+
+records = list(read_records(log, ["agent0@host"]))
+assert {record.agent for record in records} == {"agent0@host/main"}
+assert [record.message.get_metadata("sync") for record in records] == [
+    "step"
+] * PERIODS + ["stop"]
+assert [record.message.get_metadata("period") for record in records[:PERIODS]] == [
+    str(period) for period in range(PERIODS)
+]
+assert str(records[0].message.sender) == f"{GROUP}/sync"
+assert all(a.time <= b.time for a, b in zip(records, records[1:]))
+assert len(list(read_records(log))) == recorder.records == 2 * (PERIODS + 1)
+
+# replay one of the agents alone
+agent = Counter(JID("agent1", "host", "main"))
+replayer = Replayer(log)
+asyncio.run_coroutine_threadsafe(replayer.replay([agent]), agent.loop).result()
+assert agent.periods == list(range(PERIODS))
+assert replayer.fed == PERIODS + 1 and replayer.ticks == PERIODS
+acks = [msg for msg in replayer.sent if msg.get_metadata("sync") == "ack"]
+assert [msg.get_metadata("period") for msg in acks] == [str(p) for p in range(PERIODS)]
+assert all(str(msg.to) == "sync@host/main" for msg in acks)
+assert len(replayer.step_times()) == PERIODS
+assert not agent.is_alive()
+
+# the records are written when the agents stop, even without clock ticks
+log = os.path.join(folder, "messages.log")
+recorder = Recorder(log, flush_interval=60)
+
+
+class Receiver(Agent):
+    class Receive(CyclicBehaviour):
+        async def run(self):
+            if await self.receive(5) is not None:
+                await self.agent.stop()
+
+    async def setup(self):
+        self.add_behaviour(self.Receive())
+
+
+receiver = Receiver(JID("receiver", "host", "main"))
+receiver.transport = transport
+receiver.recorder = recorder
+receiver.start().result()
+receiver.dispatch(Message(to="receiver@host/main", body="hello"))
+assert receiver.join(5)
+assert [record.message.body for record in read_records(log)] == ["hello"]
+
+# and when a record comes after the flush interval
+recorder = Recorder(os.path.join(folder, "interval.log"), flush_interval=0)
+recorder.record(receiver, Message(to="receiver@host/main", body="now"))
+assert [record.message.body for record in read_records(recorder.path)] == ["now"]
+recorder.close()
+
+shutil.rmtree(folder)
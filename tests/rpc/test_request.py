@@ -0,0 +1,105 @@
+import asyncio
+
+from peak import JID, Agent, CyclicBehaviour, Message, OneShotBehaviour
+from peak.rpc import REPLY_METADATA, REQUEST_METADATA
+from peak.transport import MemoryBroker, MemoryTransport
+
+transport = MemoryTransport(MemoryBroker())
+results = {}
+
+
+class Server(Agent):
+    class Reply(CyclicBehaviour):
+        async def run(self):
+            msg = await self.receive(5)
+            if msg is None or msg.body == "stop":
+                await self.agent.stop()
+            elif msg.body != "ignore":
+                self.agent.submit(self.reply(msg))
+
+        async def reply(self, msg):
+            await asyncio.sleep(float(msg.body))
+            reply = msg.make_reply()
+            reply.body = f"done {msg.body}"
+            await self.send(reply)
+
+    async def setup(self):
+        self.add_behaviour(self.Reply())
+
+
+class Client(Agent):
+    class Request(OneShotBehaviour):
+        async def run(self):
+            pending = self.agent.pending_requests
+            requests = [
+                self.request(Message(to="server@host/main", body=delay), 5)
+                for delay in ("0.3", "0.1", "0.2")
+            ]
+            replies = await asyncio.gather(*requests)
+            results["bodies"] = [reply.body for reply in replies]
+
+            try:
+                await self.request(Message(to="server@host/main", body="ignore"), 0.1)
+                results["timeout"] = False
+            except asyncio.TimeoutError:
+                results["timeout"] = True
+            results["timed_out"] = pending.timed_out
+
+            # a reply that arrives after its request timed out goes to the behaviours
+            try:
+                await self.request(Message(to="server@host/main", body="0.3"), 0.1)
+            except asyncio.TimeoutError:
+                pass
+            await asyncio.sleep(0.5)
+
+            # user metadata is not mistaken for a reply
+            await self.send(
+                Message(
+                    to="client@host/main", body="user", metadata={"in-reply-to": "x"}
+                )
+            )
+            await asyncio.sleep(0.1)
+
+            async def fail(msg):
+                raise ConnectionError()
+
+            self.send = fail
+            try:
+                await self.request(Message(to="server@host/main", body="0"))
+                results["failed"] = False
+            except ConnectionError:
+                results["failed"] = True
+            del self.send
+
+            results["pending"] = len(pending)
+            results["counts"] = pending.sent, pending.replied, pending.timed_out
+            await self.send(Message(to="server@host/main", body="stop"))
+            await self.agent.stop()
+
+    class Late(CyclicBehaviour):
+        async def run(self):
+            msg = await self.receive(5)
+            if msg is not None:
+                results.setdefault("late", []).append(msg.body)
+
+    async def setup(self):
+        self.add_behaviour(self.Late())
+        self.add_behaviour(self.Request())
+
+
+server = Server(JID("server", "host", "main"))
+client = Client(JID("client", "host", "main"))
+for agent in (server, client):
+    agent.transport = transport
+    agent.start().result()
+assert client.join(10)
+assert server.join(5)
+
+assert results["bodies"] == ["done 0.3", "done 0.1", "done 0.2"]
+assert results["timeout"] and results["timed_out"] == 1
+assert results["late"] == ["done 0.3", "user"]
+assert results["failed"]
+assert results["pending"] == 0
+assert results["counts"] == (5, 3, 2)
+assert not client.pending_requests.resolve(Message(metadata={REPLY_METADATA: "x"}))
+assert REQUEST_METADATA.startswith("peak:") and REPLY_METADATA.startswith("peak:")
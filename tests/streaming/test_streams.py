@@ -0,0 +1,156 @@
+import asyncio
+import time
+
+from peak import JID, Agent, CyclicBehaviour, Message, OneShotBehaviour
+from peak.streaming import (
+    ACK_METADATA,
+    LAST_METADATA,
+    SEQ_METADATA,
+    STREAM_METADATA,
+    WINDOW_METADATA,
+    OutgoingStream,
+    StreamManager,
+)
+from peak.transport import MemoryBroker, MemoryTransport
+
+
+class Behaviour:
+    """Collects the messages sent through it."""
+
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, msg):
+        self.sent.append(msg)
+
+
+def chunk(id: str, seq: int, body: str, last: bool = False, **metadata) -> Message:
+    msg = Message(sender="agent@host/main", body=body)
+    msg.metadata = {STREAM_METADATA: id, SEQ_METADATA: str(seq)} | metadata
+    if last:
+        msg.set_metadata(LAST_METADATA, "true")
+    return msg
+
+
+async def out_of_order():
+    manager = StreamManager()
+    behaviour = Behaviour()
+    first = chunk("a", 0, "ab", **{WINDOW_METADATA: "4", "kind": "text"})
+    later = [chunk("a", 4, "ij", last=True), chunk("a", 2, "ef"), chunk("a", 1, "cd")]
+    # only the first chunk is dispatched to the behaviours
+    assert [manager.receive(msg) for msg in later[:1] + [first]] == [True, False]
+    stream = manager.open(first, behaviour, timeout=1)
+    assert stream.metadata["kind"] == "text"
+    for msg in later[1:]:
+        manager.receive(msg)
+    reader = asyncio.ensure_future(stream.read())
+    await asyncio.sleep(0.01)
+    assert not reader.done()
+    manager.receive(chunk("a", 3, "gh"))
+    assert await reader == "abcdefghij"
+    # the chunks are acknowledged every window / 2 chunks and at the end
+    acks = [msg.get_metadata(ACK_METADATA) for msg in behaviour.sent]
+    assert acks == ["1", "3", "4"]
+    assert manager.incoming == {}
+
+    # acknowledgements release the sender
+    stream = OutgoingStream("agent@host/main", chunk_size=2, window=2, timeout=1)
+    manager.outgoing[stream.id] = stream
+    sent = Behaviour()
+    sending = asyncio.ensure_future(stream.send(sent, "abcdefgh"))
+    await asyncio.sleep(0.01)
+    assert [msg.get_metadata(SEQ_METADATA) for msg in sent.sent] == ["0", "1"]
+    assert manager.receive(
+        Message(metadata={STREAM_METADATA: stream.id, ACK_METADATA: "1"})
+    )
+    await asyncio.wait_for(sending, 1)
+    assert len(sent.sent) == 4
+    assert sent.sent[0].get_metadata(WINDOW_METADATA) == "2"
+    assert LAST_METADATA in sent.sent[3].metadata
+
+    # the sender stops if the receiver does not consume the chunks
+    stream = OutgoingStream("agent@host/main", chunk_size=2, window=2, timeout=0.05)
+    sent = Behaviour()
+    try:
+        await stream.send(sent, "abcdefgh")
+        assert False
+    except asyncio.TimeoutError:
+        pass
+    assert len(sent.sent) == 2
+
+    # idle transfers are discarded when the next one starts
+    manager = StreamManager(idle_timeout=0.05)
+    manager.receive(chunk("never-opened", 0, "x"))
+    manager.receive(chunk("sender-stopped", 1, "y"))
+    manager.receive(chunk("active", 0, "z"))
+    time.sleep(0.1)
+    manager.receive(chunk("active", 1, "z"))
+    manager.receive(chunk("new", 0, "z"))
+    assert sorted(manager.incoming) == ["active", "new"]
+
+    # invalid chunks and acknowledgements are not consumed
+    manager = StreamManager()
+    assert not manager.receive(chunk("a", 0, "x", **{SEQ_METADATA: "first"}))
+    assert not manager.receive(Message(metadata={STREAM_METADATA: "a"}))
+    assert not manager.receive(
+        Message(metadata={STREAM_METADATA: "a", ACK_METADATA: "-1"})
+    )
+    assert manager.incoming == {}
+
+
+asyncio.run(out_of_order())
+
+# transfers between agents
+transport = MemoryTransport(MemoryBroker())
+TEXT = "".join(str(i % 10) for i in range(10000))
+DATA = bytes(range(256)) * 40
+received = []
+
+
+class Receiver(Agent):
+    class Read(CyclicBehaviour):
+        async def run(self):
+            msg = await self.receive(5)
+            if msg is None or msg.body == "stop":
+                await self.agent.stop()
+                return
+            if msg.get_metadata("stream") is not None:
+                received.append(("plain", msg.get_metadata("stream")))
+                return
+            received.append(
+                (msg.get_metadata("kind"), await self.open_stream(msg).read())
+            )
+
+    async def setup(self):
+        self.add_behaviour(self.Read())
+
+
+class Sender(Agent):
+    class Send(OneShotBehaviour):
+        async def run(self):
+            # user metadata is not mistaken for a transfer
+            await self.send(
+                Message(to="receiver@host/main", metadata={"stream": "video"})
+            )
+            await self.send_stream(
+                "receiver@host/main", TEXT, {"kind": "text"}, chunk_size=512, window=4
+            )
+            await self.send_stream(
+                "receiver@host/main", DATA, {"kind": "data"}, chunk_size=1000
+            )
+            await self.send(Message(to="receiver@host/main", body="stop"))
+            await self.agent.stop()
+
+    async def setup(self):
+        self.add_behaviour(self.Send())
+
+
+receiver = Receiver(JID("receiver", "host", "main"))
+sender = Sender(JID("sender", "host", "main"))
+for agent in (receiver, sender):
+    agent.transport = transport
+    agent.start().result()
+assert sender.join(10)
+assert receiver.join(5)
+assert received == [("plain", "video"), ("text", TEXT), ("data", DATA)]
+assert sender.streams.outgoing == {} and receiver.streams.incoming == {}
@@ -0,0 +1,126 @@
+import asyncio
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+
+from peak import JID, OneShotBehaviour, SyncAgent, Synchronizer
+from peak.agents.synchronizer.behaviors import DateTimeClock
+from peak.agents.synchronizer.checkpoint import (
+    checkpoint_path,
+    load_checkpoint,
+    save_checkpoint,
+)
+from peak.transport import MemoryBroker, MemoryTransport
+
+GROUP = "sim@conference.host"
+N_AGENTS = 3
+PERIODS = 6
+
+folder = tempfile.mkdtemp()
+
+
+class Counter(SyncAgent):
+    class Join(OneShotBehaviour):
+        async def run(self):
+            await self.join_community(GROUP)
+
+    async def setup(self):
+        self.periods = []
+        self.add_behaviour(self.Join())
+
+    async def step(self, period, time=None):
+        self.periods.append(period)
+
+    async def checkpoint(self):
+        return {"periods": self.periods}
+
+    async def restore(self, state):
+        self.periods = state["periods"]
+
+
+class NickTransport(MemoryTransport):
+    """Joins the communities with nicknames that are not the agents' names."""
+
+    async def join(self, agent, jid):
+        return self.broker.join(agent, jid, f"{agent.name}-nick")
+
+
+def simulate(resume: bool):
+    transport = NickTransport(MemoryBroker())
+    synchronizer = Synchronizer(JID("sync", "host", "main"))
+    synchronizer.transport = transport
+    synchronizer.start().result()
+    asyncio.run_coroutine_threadsafe(
+        synchronizer.sync_group_period(
+            GROUP,
+            N_AGENTS + 1,
+            0,
+            PERIODS,
+            barrier=True,
+            start_timeout=5,
+            straggler_timeout=5,
+            checkpoint_every=2,
+            checkpoint_folder=folder,
+            resume=resume,
+        ),
+        synchronizer.loop,
+    ).result()
+    agents = [Counter(JID(f"agent{i}", "host", "main")) for i in range(N_AGENTS)]
+    for agent in agents:
+        agent.transport = transport
+        agent.start().result()
+    assert synchronizer.join(20)
+    for agent in agents:
+        assert agent.join(5)
+    return agents
+
+
+# checkpoints are taken every 2 periods, named by period
+assert checkpoint_path(folder, GROUP, 2) == os.path.join(folder, GROUP, "00000002.json")
+agents = simulate(resume=False)
+assert all(agent.periods == list(range(PERIODS)) for agent in agents)
+assert sorted(os.listdir(os.path.join(folder, GROUP))) == [
+    "00000002.json",
+    "00000004.json",
+    "00000006.json",
+]
+checkpoint = load_checkpoint(folder, GROUP)
+assert checkpoint["clock"] == {"period": 6}
+assert checkpoint["agents"]["agent0@host"] == {
+    "codec": "json",
+    "state": '{"periods":[0,1,2,3,4,5]}',
+}
+
+# resume from the latest checkpoint, corrupt checkpoints are skipped
+os.remove(checkpoint_path(folder, GROUP, 6))
+with open(checkpoint_path(folder, GROUP, 8), "w") as file:
+    file.write('{"clock":')
+assert load_checkpoint(folder, GROUP)["clock"] == {"period": 4}
+agents = simulate(resume=True)
+assert all(agent.periods == list(range(PERIODS)) for agent in agents)
+
+# only the last checkpoints are kept
+for period in (10, 12, 14):
+    save_checkpoint(folder, GROUP, {"period": period}, {}, keep=2)
+assert sorted(os.listdir(os.path.join(folder, GROUP))) == [
+    "00000012.json",
+    "00000014.json",
+]
+assert load_checkpoint(folder, "empty@conference.host") is None
+
+# state of the clocks
+clock = DateTimeClock(
+    GROUP, N_AGENTS, datetime(2024, 1, 1), datetime(2024, 2, 1), timedelta(days=1), 1
+)
+for _ in range(3):
+    clock.advance()
+state = clock.state()
+assert state == {"period": 3, "time": "2024-01-04 00:00:00"}
+resumed = DateTimeClock(
+    GROUP, N_AGENTS, datetime(2024, 1, 1), datetime(2024, 2, 1), timedelta(days=1), 1
+)
+resumed.restore(state)
+assert resumed.current_period == 3 and resumed.time == clock.time
+
+shutil.rmtree(folder)
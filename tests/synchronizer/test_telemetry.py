@@ -0,0 +1,77 @@
+from peak import Message
+from peak.agents.synchronizer.telemetry import (
+    LATENCY_METADATA,
+    STEP_TIME_METADATA,
+    STRAGGLERS_METADATA,
+    StepSamples,
+    StepTelemetry,
+    distribution,
+)
+
+# nearest-rank percentiles
+assert distribution([]) is None
+assert distribution([2.0]) == {"p50": 2.0, "p95": 2.0, "max": 2.0}
+assert distribution(range(100, 0, -1)) == {"p50": 50, "p95": 95, "max": 100}
+assert distribution([1, 2, 3, 4]) == {"p50": 2, "p95": 4, "max": 4}
+
+MEMBERS = {f"a{i}": f"agent{i}@host" for i in range(4)}
+
+
+def ack(i: int, period: int, step_time: float, **metadata) -> Message:
+    return Message(
+        sender=f"agent{i}@host/main",
+        metadata={
+            "sync": "ack",
+            "period": str(period),
+            STEP_TIME_METADATA: str(step_time),
+            LATENCY_METADATA: "0.001",
+        }
+        | metadata,
+    )
+
+
+def samples(period: int, step_times: dict) -> StepSamples:
+    samples = StepSamples(period, MEMBERS)
+    for i, step_time in step_times.items():
+        assert samples.add(ack(i, period, step_time))
+    return samples
+
+
+# acknowledgements are matched to the members by JID
+period = samples(0, {0: 1.0, 1: 2.0, 2: 3.0})
+assert period.missing == {"a3"}
+assert period.step_times == {f"agent{i}@host": float(i + 1) for i in range(3)}
+assert not period.add(ack(3, 1, 1.0))
+assert period.missing == {"a3"}
+assert period.add(ack(3, 0, 1.0, **{STRAGGLERS_METADATA: "2"}))
+assert period.summary() == {
+    STRAGGLERS_METADATA: "2",
+    STEP_TIME_METADATA: "3.000000",
+    LATENCY_METADATA: "0.001000",
+}
+assert STEP_TIME_METADATA.startswith("peak:")
+
+telemetry = StepTelemetry(max_history=2)
+# members much slower than the median and missing members straggle
+stats = telemetry.record(samples(0, {0: 1.0, 1: 1.0, 2: 4.0}))
+assert stats.agents == 3
+assert stats.step_time == {"p50": 1.0, "p95": 4.0, "max": 4.0}
+assert stats.stragglers == ["agent2@host", "agent3@host"]
+assert stats.as_dict()["stragglers"] == stats.stragglers
+# the jitter of very short steps is not straggling
+stats = telemetry.record(samples(1, {0: 0.001, 1: 0.001, 2: 0.05, 3: 0.001}))
+assert stats.stragglers == []
+telemetry.min_straggler_time = 0
+stats = telemetry.record(samples(2, {0: 0.001, 1: 0.001, 2: 0.05, 3: 0.001}))
+assert stats.stragglers == ["agent2@host"]
+
+# stragglers are flagged after 3 periods
+assert telemetry.repeat_stragglers == []
+telemetry.record(samples(3, {0: 1.0, 1: 1.0, 2: 5.0, 3: 1.0}))
+assert telemetry.repeat_stragglers == ["agent2@host"]
+assert telemetry.straggler_counts == {"agent2@host": 3, "agent3@host": 1}
+
+# only the last periods are kept
+assert [stats.period for stats in telemetry.query()] == [2, 3]
+assert [stats.period for stats in telemetry.query(first=3)] == [3]
+assert [stats.period for stats in telemetry.query(last=2)] == [2]
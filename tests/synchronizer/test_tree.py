@@ -0,0 +1,72 @@
+import asyncio
+
+from peak import JID, OneShotBehaviour, SyncAgent, Synchronizer
+from peak.transport import MemoryBroker, MemoryTransport
+
+GROUP = "sim@conference.host"
+N_AGENTS = 10
+FANOUT = 4
+PERIODS = 5
+
+transport = MemoryTransport(MemoryBroker())
+
+
+class Leaf(SyncAgent):
+    class Join(OneShotBehaviour):
+        async def run(self):
+            await self.join_community(
+                Synchronizer.leaf_group(GROUP, self.agent.cid, FANOUT)
+            )
+
+    async def setup(self):
+        self.periods = []
+        self.add_behaviour(self.Join())
+
+    async def step(self, period, time=None):
+        self.periods.append(period)
+
+
+synchronizer = Synchronizer(JID("sync", "host", "main"))
+synchronizer.transport = transport
+synchronizer.start().result()
+asyncio.run_coroutine_threadsafe(
+    synchronizer.sync_group_period(
+        GROUP, N_AGENTS, 0, PERIODS, barrier=True, start_timeout=5, fanout=FANOUT
+    ),
+    synchronizer.loop,
+).result()
+leaves = [Leaf(JID(f"agent{i}", "host", "main"), i) for i in range(N_AGENTS)]
+for leaf in leaves:
+    leaf.transport = transport
+    leaf.start().result()
+assert synchronizer.join(20)
+for leaf in leaves:
+    assert leaf.join(5)
+
+# 10 agents with a fan-out of 4: 3 relays at level 1 under the top clock
+assert [relay.name for relay in synchronizer.relays] == [
+    "sync-1-0",
+    "sync-1-1",
+    "sync-1-2",
+]
+for leaf in leaves:
+    assert leaf.periods == list(range(PERIODS)), (leaf.name, leaf.periods)
+telemetry = synchronizer.telemetry[GROUP]
+assert len(telemetry.query()) == PERIODS
+assert all(stats.agents == len(synchronizer.relays) for stats in telemetry.query())
+assert not any(relay.is_alive() for relay in synchronizer.relays)
+
+# checkpoints are not supported with a fanout
+other = Synchronizer(JID("other", "host", "main"))
+for options in ({"checkpoint_every": 2}, {"resume": True}):
+    try:
+        asyncio.run_coroutine_threadsafe(
+            other.sync_group_period(
+                GROUP, N_AGENTS, 0, PERIODS, barrier=True, fanout=FANOUT, **options
+            ),
+            other.loop,
+        ).result()
+        assert False
+    except ValueError:
+        pass
+assert other.relays == []
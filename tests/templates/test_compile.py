@@ -0,0 +1,114 @@
+from peak import JID, Agent, CyclicBehaviour, Message, Template
+from peak.template import TemplateIndex, compile_template
+
+
+def template(**metadata) -> Template:
+    template = Template()
+    for key, value in metadata.items():
+        template.set_metadata(key, value)
+    return template
+
+
+step = Message(sender="sync@host/main", to="agent@host/main", body="Period 1")
+step.set_metadata("sync", "step")
+step.set_metadata("period", "1")
+stop = Message(sender="sync@host/main", to="agent@host/main")
+stop.set_metadata("sync", "stop")
+other = Message(sender="other@host/main", to="agent@host/main", body="Period 1")
+
+is_step = template(sync="step")
+has_period = template(period=None)
+from_sync = Template(sender="sync@host")
+messages = (step, stop, other)
+
+# compiled templates match the same messages as the templates
+full = Template(sender="sync@host", to="agent@host/main", body="Period 1")
+full.set_metadata("sync", None)
+for t in (is_step, has_period, from_sync, full, Template(to="agent@other")):
+    for msg in messages:
+        assert t.compile()(msg) == t.match(msg), (t, msg)
+
+cases = {
+    "&": (is_step & from_sync, [True, False, False]),
+    "|": (is_step | has_period | template(sync="stop"), [True, True, False]),
+    "^": (from_sync ^ has_period, [False, True, False]),
+    "~": (~is_step, [False, True, True]),
+    "~&|": (
+        ~(is_step | template(sync="stop")) & Template(body="Period 1"),
+        [False, False, True],
+    ),
+}
+for name, (t, expected) in cases.items():
+    predicate = compile_template(t)
+    assert [predicate(msg) for msg in messages] == expected, name
+    assert [bool(t.match(msg)) for msg in messages] == expected, name
+assert all(compile_template(None)(msg) for msg in messages)
+
+# compiled templates are snapshots of the templates
+t = template(sync="step")
+predicate = t.compile()
+t.set_metadata("sync", "stop")
+assert predicate(step) and not predicate(stop)
+
+
+class Behaviour(CyclicBehaviour):
+    async def run(self):
+        pass
+
+
+# the agent's index is built again when its behaviours or templates change
+agent = Agent(JID("agent", "host", "main"))
+steps, stops, every = Behaviour(), Behaviour(), Behaviour()
+agent.add_behaviour(steps, template(sync="step"))
+agent.add_behaviour(stops, template(sync="stop"))
+agent._template_index = TemplateIndex(agent.behaviours)
+assert agent._template_index.match(step) == [steps]
+
+agent.add_behaviour(every)
+assert agent._template_index is None
+agent._template_index = TemplateIndex(agent.behaviours)
+assert agent._template_index.match(step) == [steps, every]
+assert agent._template_index.match(stop) == [stops, every]
+
+agent.remove_behaviour(every)
+assert agent._template_index is None
+agent._template_index = TemplateIndex(agent.behaviours)
+assert agent._template_index.match(step) == [steps]
+
+stops.set_template(template(sync="step"))
+assert agent._template_index is None
+agent._template_index = TemplateIndex(agent.behaviours)
+assert agent._template_index.match(step) == [steps, stops]
+assert agent._template_index.match(stop) == []
+
+# changing a template in place marks the index as stale
+index = TemplateIndex(agent.behaviours)
+assert not index.stale
+stops.template.set_metadata("sync", "stop")
+assert index.stale
+assert TemplateIndex(agent.behaviours).match(stop) == [stops]
+index = TemplateIndex(agent.behaviours)
+steps.template.sender = "sync@host"
+assert index.stale
+leaf = template(sync="other")
+composite = Agent(JID("composite", "host", "main"))
+composite.add_behaviour(Behaviour(), ~leaf | template(sync="stop"))
+index = TemplateIndex(composite.behaviours)
+leaf.set_metadata("sync", "step")
+assert index.stale
+
+
+# behaviours that override match are matched with it
+class Odd(CyclicBehaviour):
+    def match(self, message):
+        return message.body is not None and int(message.body[-1]) % 2 == 1
+
+    async def run(self):
+        pass
+
+
+odd = Odd()
+agent.add_behaviour(odd, template(sync="never"))
+index = TemplateIndex(agent.behaviours)
+assert index.match(step) == [steps, odd]
+assert index.match(stop) == [stops]
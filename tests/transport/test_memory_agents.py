@@ -0,0 +1,59 @@
+from peak import JID, Agent, CyclicBehaviour, Message, OneShotBehaviour
+from peak.transport import MemoryBroker, MemoryTransport
+
+broker = MemoryBroker()
+ROOM = "room@conference.host"
+received = []
+
+
+class Receiver(Agent):
+    class Receive(CyclicBehaviour):
+        async def run(self):
+            if ROOM not in self.agent.communities:
+                await self.join_community(ROOM)
+                return
+            msg = await self.receive(5)
+            if msg is None or msg.body == "stop":
+                await self.agent.stop()
+                return
+            received.append((str(msg.sender), msg.body, msg.payload))
+
+    async def setup(self):
+        self.add_behaviour(self.Receive())
+
+
+class Sender(Agent):
+    class Send(OneShotBehaviour):
+        async def run(self):
+            await self.join_community(ROOM)
+            self.agent.members = [
+                member.nick for member in await self.community_members(ROOM)
+            ]
+            msg = Message(to="receiver@host/main")
+            msg.set_payload({"x": 1})
+            await self.send(msg)
+            await self.send(Message(to="receiver@host", body="bare"))
+            await self.send_to_community(Message(to=ROOM, body="everyone"))
+            await self.send(Message(to="receiver@host/main", body="stop"))
+            await self.agent.stop()
+
+    async def setup(self):
+        self.add_behaviour(self.Send())
+
+
+receiver = Receiver(JID("receiver", "host", "main"))
+sender = Sender(JID("sender", "host", "main"))
+for agent in (receiver, sender):
+    agent.transport = MemoryTransport(broker)
+    agent.start().result()
+assert sender.join(5)
+assert receiver.join(5)
+
+assert sender.members == ["sender", "receiver"]
+assert received == [
+    ("sender@host/main", '{"x":1}', {"x": 1}),
+    ("sender@host/main", "bare", "bare"),
+    (f"{ROOM}/sender", "everyone", "everyone"),
+]
+assert broker.agents == {} and broker.communities == {}
+assert broker.undelivered == 0
@@ -0,0 +1,109 @@
+from peak import JID, Message
+from peak.transport import TRANSPORTS, MemoryBroker, Transport, get_transport
+
+
+class FakeAgent:
+    """Records the messages the broker delivers to it."""
+
+    def __init__(self, jid):
+        self.jid = JID.fromstr(jid)
+        self.name = self.jid.localpart
+        self.received = []
+
+    def _deliver(self, msg):
+        self.received.append(msg)
+
+
+broker = MemoryBroker()
+a_main = FakeAgent("a@host/main")
+a_other = FakeAgent("a@host/other")
+b = FakeAgent("b@host/main")
+for agent in (a_main, a_other, b):
+    broker.register(agent)
+assert set(broker.agents) == {"a@host/main", "a@host/other", "b@host/main"}
+
+# full JIDs reach that agent only, bare JIDs one of the agents with that JID
+assert broker.deliver(Message(to="a@host/other", sender="b@host/main", body="1"))
+assert [msg.body for msg in a_other.received] == ["1"]
+assert not a_main.received
+assert broker.deliver(Message(to="a@host", sender="b@host/main", body="2"))
+assert [msg.body for msg in a_main.received] == ["2"]
+assert str(a_main.received[0].sender) == "b@host/main"
+
+# the receivers get copies of the message
+msg = Message(to="b@host/main", body="3")
+broker.deliver(msg)
+assert b.received[0] is not msg and b.received[0].body == "3"
+
+# messages to unknown agents are counted and discarded
+assert broker.undelivered == 0
+assert not broker.deliver(Message(to="c@host/main", body="4"))
+assert not broker.deliver(Message(to="c@host", body="5"))
+assert broker.undelivered == 2
+
+broker.unregister(a_main)
+assert "a@host/main" not in broker.agents
+assert broker.deliver(Message(to="a@host", body="6"))
+assert [msg.body for msg in a_other.received] == ["1", "6"]
+broker.unregister(a_other)
+assert not broker.deliver(Message(to="a@host", body="7"))
+assert not broker.deliver(Message(to="a@host/other", body="8"))
+assert broker.undelivered == 4
+
+# communities
+c = FakeAgent("c@host/main")
+broker.register(c)
+joined, left = [], []
+room_b = broker.join(b, "room@conference.host", b.name)
+room_b.on_join.connect(lambda member, **kwargs: joined.append(member.nick))
+room_b.on_leave.connect(lambda member, **kwargs: left.append(member.nick))
+room_c = broker.join(c, "room@conference.host/ignored", c.name)
+assert str(room_c.jid) == "room@conference.host"
+assert joined == ["c"]
+assert [member.nick for member in room_b.members] == ["b", "c"]
+assert [member.nick for member in room_c.members] == ["c", "b"]
+assert room_b.members[0].is_self and not room_b.members[1].is_self
+assert room_b.members[1].direct_jid == c.jid
+assert list(broker.communities) == ["room@conference.host"]
+
+try:
+    broker.join(FakeAgent("c@host/other"), "room@conference.host", "c")
+    assert False
+except ValueError:
+    pass
+
+# messages to a community reach all its members, the sender included
+b.received.clear()
+room_c._community.deliver(room_c.me, Message(body="hello"))
+for agent in (b, c):
+    assert [msg.body for msg in agent.received] == ["hello"]
+    assert str(agent.received[0].sender) == "room@conference.host/c"
+    assert agent.received[0].to == agent.jid
+
+# unregistering an agent leaves its communities, empty communities are removed
+broker.unregister(c)
+assert left == ["c"]
+assert [member.nick for member in room_b.members] == ["b"]
+room_b._community.leave(room_b)
+assert broker.communities == {}
+
+assert TRANSPORTS == ("xmpp", "memory")
+assert get_transport("memory").broker is get_transport("memory").broker
+assert get_transport("xmpp") is get_transport()
+try:
+    get_transport("carrier-pigeon")
+    assert False
+except ValueError:
+    pass
+
+# transports implement all the operations
+try:
+
+    class SendOnly(Transport):
+        async def send(self, agent, msg):
+            pass
+
+    SendOnly()
+    assert False
+except TypeError:
+    pass